@@ -5,3 +5,6 @@ class AccountConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "account"
     label = "foodinfo_account"
+
+    def ready(self):
+        from account import signals
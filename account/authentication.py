@@ -0,0 +1,100 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    Bounded LRU of token key -> (user, token), each entry kept for
+    TOKEN_CACHE_TTL seconds at most.
+
+    Entries are dropped by account.signals when their token is deleted
+    or the user's is_active or is_staff changes in this process; the TTL
+    bounds how long changes made elsewhere go unnoticed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            # key -> (user, token, expires at)
+            self._entries = OrderedDict()
+            # user id -> keys
+            self._keys = {}
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._drop(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, user, token):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            expires = time.monotonic() + settings.TOKEN_CACHE_TTL
+            self._entries[key] = (user, token, expires)
+            self._keys.setdefault(user.pk, set()).add(key)
+
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        user, _, _ = self._entries.pop(key)
+        keys = self._keys.get(user.pk, set())
+        keys.discard(key)
+        if not keys:
+            self._keys.pop(user.pk, None)
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def discard_user(self, user, fields=("is_active", "is_staff")):
+        """Drop the user's entries cached with different `fields` values"""
+        with self._lock:
+            for key in list(self._keys.get(user.pk, ())):
+                cached = self._entries[key][0]
+                if any(getattr(cached, f) != getattr(user, f) for f in fields):
+                    self._drop(key)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication answering repeated tokens from token_cache
+    instead of the Token and User tables"""
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token)
+        else:
+            user, token = cached
+
+        # requests get their own copy, so changes made while handling one
+        # don't leak into the cache
+        return copy.copy(user), token
@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from account.authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def drop_cached_token(sender, instance, **kwargs):
+    key = instance.key
+    # again after commit, in case a concurrent request cached it meanwhile
+    token_cache.discard(key)
+    transaction.on_commit(lambda: token_cache.discard(key))
+
+
+@receiver(post_save, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    user = instance
+    token_cache.discard_user(user)
+    transaction.on_commit(lambda: token_cache.discard_user(user))
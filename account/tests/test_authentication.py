@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from account.authentication import CachedTokenAuthentication, token_cache
+from test.base_test import TestUsers
+
+USER1_KEY = TestUsers.get_user1_token().split()[1]
+
+
+class TestTokenCache(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        token_cache.clear()
+        self.url = reverse("shelfs-detail", kwargs={"pk": 2})
+
+    def get(self, token=TestUsers.get_user1_token()):
+        return self.client.get(self.url, HTTP_AUTHORIZATION=token)
+
+    def test_repeated_token_skips_queries(self):
+        self.assertEqual(self.get().status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            CachedTokenAuthentication().authenticate_credentials(USER1_KEY)
+        self.assertEqual(token_cache.stats(), {"hits": 1, "misses": 1, "size": 1})
+
+    def test_returns_copies(self):
+        first, _ = CachedTokenAuthentication().authenticate_credentials(USER1_KEY)
+        first.first_name = "changed"
+        second, _ = CachedTokenAuthentication().authenticate_credentials(USER1_KEY)
+        self.assertIsNot(first, second)
+        self.assertNotEqual(second.first_name, "changed")
+
+    @override_settings(TOKEN_CACHE_TTL=-1)
+    def test_expired_entries_reload(self):
+        self.get()
+        self.get()
+        self.assertEqual(token_cache.stats(), {"hits": 0, "misses": 2, "size": 1})
+
+    @override_settings(TOKEN_CACHE_SIZE=2)
+    def test_least_recently_used_evicted(self):
+        self.get(TestUsers.get_staff_token())
+        self.get(TestUsers.get_user1_token())
+        self.get(TestUsers.get_staff_token())
+        self.get(TestUsers.get_user2_token())
+
+        self.assertEqual(token_cache.stats()["size"], 2)
+        self.assertIsNone(token_cache.get(USER1_KEY))
+
+    def test_deleted_token_rejected(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.filter(key=USER1_KEY).get().delete()
+
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        self.get()
+        user = User.objects.get(auth_token__key=USER1_KEY)
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unrelated_user_change_kept(self):
+        self.get()
+        user = User.objects.get(auth_token__key=USER1_KEY)
+        user.first_name = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+        self.assertIsNotNone(token_cache.get(USER1_KEY))
+
+    def test_staff_change_applies(self):
+        self.get()
+        user = User.objects.get(auth_token__key=USER1_KEY)
+        user.is_staff = True
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+        cached, _ = CachedTokenAuthentication().authenticate_credentials(USER1_KEY)
+        self.assertTrue(cached.is_staff)
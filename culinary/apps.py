@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CulinaryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "culinary"
+
+    def ready(self):
+        from culinary import signals
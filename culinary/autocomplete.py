@@ -0,0 +1,159 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models import Count
+
+from culinary.models import Ingredient, IngredientUsage, Measure
+
+# match tiers, best first
+NAME_PREFIX, WORD_PREFIX, SUBSTRING = range(3)
+
+
+class _Snapshot:
+    def __init__(self, rows, popularity, staff_ids):
+        # id -> (name, owner id)
+        self.names = {}
+        self.popularity = popularity
+        self.staff_ids = staff_ids
+        # sorted (word suffix, id) for every word start of every name
+        self.suffixes = []
+        # trigram -> ids
+        self.trigrams = defaultdict(set)
+
+        for id, name, owner_id in rows:
+            self.names[id] = (name, owner_id)
+            lowered = name.lower()
+            for match in re.finditer(r"\w+", lowered):
+                self.suffixes.append((lowered[match.start() :], id))
+            for i in range(len(lowered) - 2):
+                self.trigrams[lowered[i : i + 3]].add(id)
+
+        self.suffixes.sort()
+
+
+class NameIndex:
+    """
+    In-process autocomplete index over the `name` of a model.
+
+    Names are indexed by the suffix starting at each word, so a binary
+    search finds every name with a word starting with the query, and by
+    trigrams for matches inside words. Results are ranked by how the
+    name matches (whole name prefix, word prefix, substring) and then by
+    how many ingredient usages reference the row.
+
+    The index is rebuilt lazily when invalidated by culinary.signals or
+    when older than `max_age` seconds, which keeps popularity and staff
+    status reasonably fresh without tracking every usage write.
+    """
+
+    max_age = 300
+    # single characters match a large share of the catalogue
+    min_length = 2
+    owner_field = None
+
+    def __init__(self, model, usage_field):
+        self.model = model
+        self.usage_field = usage_field
+        self._snapshot = None
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def build(self):
+        if self.owner_field:
+            rows = self.model.objects.values_list("id", "name", self.owner_field)
+            staff_ids = set(
+                User.objects.filter(is_staff=True).values_list("id", flat=True)
+            )
+        else:
+            rows = (
+                (id, name, None)
+                for id, name in self.model.objects.values_list("id", "name")
+            )
+            staff_ids = set()
+
+        popularity = dict(
+            IngredientUsage.objects.values_list(self.usage_field)
+            .annotate(count=Count("id"))
+            .values_list(self.usage_field, "count")
+        )
+        snapshot = _Snapshot(rows, popularity, staff_ids)
+        self._snapshot, self._built_at = snapshot, time.monotonic()
+        return snapshot
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._built_at > self.max_age:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or time.monotonic() - self._built_at > self.max_age:
+                    snapshot = self.build()
+        return snapshot
+
+    def is_visible(self, snapshot, id, user):
+        return True
+
+    def search(self, query, limit=10, user=None):
+        """Return up to `limit` (id, name) pairs matching `query`, best first"""
+        query = query.strip().lower()
+        if len(query) < self.min_length:
+            return []
+
+        snapshot = self.snapshot()
+        tiers = {}
+
+        suffixes = snapshot.suffixes
+        for i in range(bisect_left(suffixes, (query,)), len(suffixes)):
+            suffix, id = suffixes[i]
+            if not suffix.startswith(query):
+                break
+            name = snapshot.names[id][0].lower()
+            tier = NAME_PREFIX if name.startswith(query) else WORD_PREFIX
+            tiers[id] = min(tier, tiers.get(id, SUBSTRING))
+
+        if len(query) >= 3:
+            grams = [query[i : i + 3] for i in range(len(query) - 2)]
+            postings = sorted(
+                (snapshot.trigrams.get(gram, set()) for gram in grams), key=len
+            )
+            for id in set.intersection(*postings) - tiers.keys():
+                if query in snapshot.names[id][0].lower():
+                    tiers[id] = SUBSTRING
+
+        matches = (id for id in tiers if self.is_visible(snapshot, id, user))
+        best = heapq.nsmallest(
+            limit,
+            matches,
+            key=lambda id: (
+                tiers[id],
+                -snapshot.popularity.get(id, 0),
+                snapshot.names[id][0],
+            ),
+        )
+        return [(id, snapshot.names[id][0]) for id in best]
+
+
+class IngredientNameIndex(NameIndex):
+    """Applies the IngredientList visibility rule: own ingredients plus
+    the ones created by staff"""
+
+    owner_field = "user_id"
+
+    def is_visible(self, snapshot, id, user):
+        if user is not None and user.is_staff:
+            return True
+        owner_id = snapshot.names[id][1]
+        return owner_id in snapshot.staff_ids or (
+            user is not None and owner_id == user.id
+        )
+
+
+ingredient_names = IngredientNameIndex(Ingredient, "ingredient_id")
+measure_names = NameIndex(Measure, "measure_id")
@@ -0,0 +1,459 @@
+import asyncio
+import importlib
+import json
+import math
+import random
+import time
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connections, transaction
+from django.test import override_settings
+from django.urls import clear_url_caches, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from culinary import generator
+from culinary.models import Fridge, Ingredient, Recipe, UtensilConversion
+from foodinfo.metrics import Sample
+from tags.models import Tag
+
+# users the cases run as, seeded by seed()
+USERNAMES = {"staff": "benchmark staff", "user": "benchmark user"}
+
+# cases of the endpoints ASYNC_READ_VIEWS serves async, for load()
+LOAD_CASES = (
+    "recipe list",
+    "recipe list authenticated",
+    "recipe list tags",
+    "recipe detail",
+    "ingredients list",
+    "tags list",
+    "tags detail",
+)
+
+Case = namedtuple("Case", ["name", "method", "path", "user", "data", "content_type"])
+Case.__new__.__defaults__ = (None, None)
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def seed(recipes, batch_size=5000, seed=0):
+    """
+    Fill the database with `recipes` recipes through culinary.generator,
+    plus the users the cases run as, each with a fridge.
+
+    Ingredients scale with a tenth of the recipes (at least 100) and are
+    owned by staff, each recipe uses about 5 of them.
+    """
+    rng = random.Random(seed)
+
+    user_ids = []
+    for role, username in USERNAMES.items():
+        user = User.objects.create_user(username, is_staff=role == "staff")
+        Token.objects.get_or_create(user=user)
+        user_ids.append(user.pk)
+    staff_ids = user_ids[:1]
+
+    tag_ids = generator.ensure_tags()
+    measure_ids = generator.ensure_measures()
+    ingredient_ids = generator.create_ingredients(
+        max(100, recipes // 10), staff_ids, measure_ids, rng, batch_size
+    )
+    picker = generator.ZipfPicker(ingredient_ids, 1.1, rng)
+    generator.create_fridges(user_ids, picker, rng, shelf_size=20)
+
+    chunks = generator.RecipeChunks(
+        staff_ids, picker, measure_ids, tag_ids, 5, batch_size, seed
+    )
+    chunks.create(recipes)
+
+
+def cases():
+    """A case for every endpoint of culinary.urls and tags.urls, plus the
+    recipe list filter combinations, using rows seed() created"""
+    users = {role: User.objects.get(username=name) for role, name in USERNAMES.items()}
+    recipe = Recipe.objects.filter(author=users["staff"]).order_by("pk").first()
+    ingredient = Ingredient.objects.filter(user=users["staff"]).order_by("pk").first()
+    usage = recipe.ingredientusage_set.order_by("pk").first()
+    conversion = UtensilConversion.objects.order_by("pk").first()
+    fridge = Fridge.objects.get(user=users["user"])
+    shelf = ",".join(str(id) for id in fridge.shelf.values_list("id", flat=True)[:5])
+    tags = Tag.objects.order_by("pk")
+    tag_ids = ",".join(str(tag.pk) for tag in tags[:3])
+    tag, category = tags[0], tags[0].category
+    measure = conversion.utensil
+
+    recipes = reverse("recipe-list")
+    record = {
+        "title": "benchmark import",
+        "portions": 2,
+        "total_time": "0:30:00",
+        "instructions": "Mix everything and cook.",
+        "ingredients": [
+            {
+                "amount": 1,
+                "ingredient": {"id": usage.ingredient_id},
+                "measure": {"id": usage.measure_id},
+            }
+        ],
+        "tags": [tag.pk],
+    }
+
+    return [
+        Case("measures list", "GET", reverse("measures-list"), "anon"),
+        Case(
+            "measures detail",
+            "GET",
+            reverse("measures-detail", args=[measure.pk]),
+            "anon",
+        ),
+        Case(
+            "measures update",
+            "PUT",
+            reverse("measures-detail", args=[measure.pk]),
+            "staff",
+            {"name": measure.name},
+        ),
+        Case("ingredients list", "GET", reverse("ingredients-list"), "user"),
+        Case(
+            "ingredients list by name",
+            "GET",
+            reverse("ingredients-list", args=["ingredient 1"]),
+            "user",
+        ),
+        Case(
+            "ingredients detail",
+            "GET",
+            reverse("ingredients-detail", args=[ingredient.pk]),
+            "staff",
+        ),
+        Case(
+            "ingredients update",
+            "PUT",
+            reverse("ingredients-edit", args=[ingredient.pk]),
+            "staff",
+            {"name": ingredient.name},
+        ),
+        Case(
+            "ingredients autocomplete",
+            "GET",
+            reverse("ingredients-autocomplete") + "?q=ingredient 1",
+            "user",
+        ),
+        Case(
+            "measures autocomplete",
+            "GET",
+            reverse("measures-autocomplete") + "?q=meas",
+            "user",
+        ),
+        Case("fridge list", "GET", reverse("shelfs-list"), "user"),
+        Case(
+            "fridge detail", "GET", reverse("shelfs-detail", args=[fridge.pk]), "user"
+        ),
+        Case(
+            "fridge update",
+            "PUT",
+            reverse("shelfs-edit", args=[fridge.pk]),
+            "user",
+            {"name": fridge.name},
+        ),
+        Case("conversion list", "GET", reverse("conversion-list"), "anon"),
+        Case(
+            "conversion batch",
+            "POST",
+            reverse("conversion-batch"),
+            "anon",
+            [
+                {
+                    "ingredient": conversion.ingredient_id,
+                    "measure": conversion.utensil_id,
+                    "amount": 2,
+                }
+            ]
+            * 50,
+        ),
+        Case(
+            "conversion detail",
+            "GET",
+            reverse(
+                "conversion-detail",
+                args=[conversion.utensil_id, conversion.ingredient_id],
+            ),
+            "anon",
+        ),
+        Case(
+            "conversion update",
+            "PUT",
+            reverse("conversion-edit", args=[conversion.pk]),
+            "staff",
+            {"standard_value": conversion.standard_value},
+        ),
+        Case("recipe list", "GET", recipes, "anon"),
+        Case("recipe list authenticated", "GET", recipes, "user"),
+        Case("recipe list not expanded", "GET", recipes + "?expanded=false", "anon"),
+        Case("recipe list q", "GET", recipes + "?q=curry", "anon"),
+        Case(
+            "recipe list calories",
+            "GET",
+            recipes + "?caloriesAbove=300",
+            "anon",
+        ),
+        Case(
+            "recipe list ingredients", "GET", recipes + f"?ingredients={shelf}", "anon"
+        ),
+        Case("recipe list tags", "GET", recipes + f"?tags={tag_ids}", "anon"),
+        Case("recipe list fridgeId", "GET", recipes + f"?fridgeId={fridge.pk}", "user"),
+        Case(
+            "recipe list absentLimit ingredients",
+            "GET",
+            recipes + f"?ingredients={shelf}&absentLimit=2",
+            "anon",
+        ),
+        Case(
+            "recipe list absentLimit fridgeId",
+            "GET",
+            recipes + f"?fridgeId={fridge.pk}&absentLimit=2",
+            "user",
+        ),
+        Case(
+            "recipe list absentLimit fridgeId tags",
+            "GET",
+            recipes + f"?fridgeId={fridge.pk}&absentLimit=3&tags={tag_ids}",
+            "user",
+        ),
+        Case(
+            "recipe list fridgeId tags",
+            "GET",
+            recipes + f"?fridgeId={fridge.pk}&tags={tag_ids}",
+            "user",
+        ),
+        Case(
+            "recipe create",
+            "POST",
+            recipes,
+            "user",
+            {**record, "author": users["user"].pk},
+        ),
+        Case(
+            "recipe import",
+            "POST",
+            reverse("recipe-import"),
+            "staff",
+            json.dumps(record) + "\n",
+            "application/x-ndjson",
+        ),
+        Case(
+            "recipe detail", "GET", reverse("recipe-detail", args=[recipe.pk]), "anon"
+        ),
+        Case(
+            "recipe detail authenticated",
+            "GET",
+            reverse("recipe-detail", args=[recipe.pk]),
+            "user",
+        ),
+        Case(
+            "recipe update",
+            "PUT",
+            reverse("recipe-edit", args=[recipe.pk]),
+            "staff",
+            {"title": recipe.title},
+        ),
+        Case("tags list", "GET", reverse("tags-list"), "anon"),
+        Case("tags detail", "GET", reverse("tags-detail", args=[tag.pk]), "anon"),
+        Case(
+            "tags update",
+            "PUT",
+            reverse("tags-detail", args=[tag.pk]),
+            "staff",
+            {"label": tag.label, "category": category.pk},
+        ),
+        Case("tag categories list", "GET", reverse("tag-categories-list"), "anon"),
+        Case(
+            "tag categories detail",
+            "GET",
+            reverse("tag-categories-detail", args=[category.pk]),
+            "anon",
+        ),
+    ]
+
+
+def percentile(values, fraction):
+    """Nearest rank percentile of `values`"""
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def _clients():
+    clients = {"anon": APIClient()}
+    for role, username in USERNAMES.items():
+        client = APIClient()
+        token = Token.objects.get(user__username=username)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        clients[role] = client
+    return clients
+
+
+def _request(client, case):
+    sample = Sample()
+    with ExitStack() as stack:
+        # writes are rolled back, every run sees the same data
+        stack.enter_context(transaction.atomic())
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(sample))
+
+        start = time.perf_counter()
+        if case.content_type is None:
+            response = getattr(client, case.method.lower())(
+                case.path, case.data, format="json"
+            )
+        else:
+            response = client.generic(
+                case.method, case.path, case.data, case.content_type
+            )
+        if response.streaming:
+            b"".join(response.streaming_content)
+        seconds = time.perf_counter() - start
+        transaction.set_rollback(True)
+
+    if response.status_code >= 400:
+        raise BenchmarkError(
+            f"{case.name}: {case.method} {case.path} returned {response.status_code}"
+        )
+    return seconds, sample.queries
+
+
+def run(cases, repeat=20, warmup=2):
+    """Time each case `repeat` times after `warmup` runs, returns
+    name -> {p50, p95 (milliseconds), queries}"""
+    clients = _clients()
+    results = {}
+    for case in cases:
+        client = clients[case.user]
+        for _ in range(warmup):
+            _request(client, case)
+
+        timings, queries = [], []
+        for _ in range(repeat):
+            seconds, count = _request(client, case)
+            timings.append(seconds * 1000)
+            queries.append(count)
+
+        results[case.name] = {
+            "p50": round(percentile(timings, 0.5), 3),
+            "p95": round(percentile(timings, 0.95), 3),
+            "queries": max(queries),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Regressions of `results` against `baseline`: a p95 slower by more
+    than `tolerance` or more queries, as messages"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["queries"] > before["queries"]:
+            regressions.append(
+                f"{name}: {result['queries']} queries, was {before['queries']}"
+            )
+        if result["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {result['p95']:.1f}ms, was {before['p95']:.1f}ms"
+            )
+    return regressions
+
+
+def _reload_urls():
+    import culinary.urls
+    import foodinfo.urls
+    import tags.urls
+
+    # foodinfo.urls includes the others as they are when it is loaded
+    for module in (culinary.urls, tags.urls, foodinfo.urls):
+        importlib.reload(module)
+    clear_url_caches()
+
+
+@contextmanager
+def read_views(async_reads):
+    """Serve requests with ASYNC_READ_VIEWS set to `async_reads`, reloading
+    the URLconfs that read it"""
+    try:
+        with override_settings(ASYNC_READ_VIEWS=async_reads):
+            _reload_urls()
+            yield
+    finally:
+        _reload_urls()
+
+
+async def _asgi_get(app, path, headers):
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def load(cases, concurrency, requests=200):
+    """
+    Send `requests` GET requests of `cases`, in turn, to an ASGI handler
+    from `concurrency` concurrent clients on one event loop, as a single
+    server process would take them. Returns {rps, p50, p95 (milliseconds)}.
+    """
+    headers = {"anon": []}
+    for role, username in USERNAMES.items():
+        token = Token.objects.get(user__username=username)
+        headers[role] = [(b"authorization", f"Token {token.key}".encode())]
+
+    async def client(app, queue, timings):
+        while queue:
+            case = queue.pop()
+            start = time.perf_counter()
+            status = await _asgi_get(app, case.path, headers[case.user])
+            timings.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                raise BenchmarkError(f"{case.name}: GET {case.path} returned {status}")
+
+    async def main():
+        app = ASGIHandler()
+        queue = [cases[i % len(cases)] for i in range(requests)]
+        timings = []
+        start = time.perf_counter()
+        await asyncio.gather(*(client(app, queue, timings) for _ in range(concurrency)))
+        return time.perf_counter() - start, timings
+
+    seconds, timings = asyncio.run(main())
+    return {
+        "rps": round(requests / seconds, 1),
+        "p50": round(percentile(timings, 0.5), 3),
+        "p95": round(percentile(timings, 0.95), 3),
+    }
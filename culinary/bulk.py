@@ -0,0 +1,190 @@
+import json
+
+from django.db import transaction
+
+from culinary.models import Ingredient, IngredientUsage, Measure, Recipe
+from culinary.signals import recipes_bulk_created
+from tags.models import Tag
+
+
+def _int_ids(ids):
+    try:
+        return {int(id) for id in ids}
+    except (TypeError, ValueError):
+        return None
+
+
+def _referenced(record):
+    usages = record["ingredients"]
+    return {
+        "ingredients": [
+            u["ingredient"]["id"] for u in usages if u["ingredient"].get("id")
+        ],
+        "measures": [u["measure"]["id"] for u in usages if u["measure"].get("id")],
+        "tags": record["tags"],
+    }
+
+
+def resolve_references(records):
+    """
+    Fetch the ingredients, measures and tags referenced by validated
+    RecipeCreateSerializer data, with one in_bulk query per model for all
+    records. Returns the objects by field and id, and the errors of each
+    record, naming the ids that don't exist.
+    """
+    models = {"ingredients": Ingredient, "measures": Measure, "tags": Tag}
+    referenced = [_referenced(record) for record in records]
+
+    found = {}
+    for field, model in models.items():
+        ids = set()
+        for refs in referenced:
+            ids |= _int_ids(refs[field]) or set()
+        found[field] = model.objects.in_bulk(ids)
+
+    errors = []
+    for refs in referenced:
+        record_errors = {}
+        for field in models:
+            ids = _int_ids(refs[field])
+            if ids is None:
+                record_errors[field] = ["Ids must be integers."]
+                continue
+
+            missing = sorted(id for id in ids if id not in found[field])
+            if missing:
+                record_errors[field] = [
+                    "Objects do not exist: " + ", ".join(map(str, missing))
+                ]
+        errors.append(record_errors)
+    return found, errors
+
+
+def new_ingredient(record, data):
+    # like IngredientList, new ingredients belong to their creator
+    return Ingredient(**{"user": record.get("author"), **data})
+
+
+@transaction.atomic
+def bulk_create_recipes(records, batch_size=500):
+    """
+    Write recipes from validated RecipeCreateSerializer data.
+
+    Referenced ingredients, measures and tags are resolved with
+    resolve_references(), and rows are written with bulk_create, which
+    skips model signals: receivers learn about the rows from
+    recipes_bulk_created instead. New rows get their ids from bulk_create,
+    so the backend must return them (PostgreSQL, SQLite 3.35+, MariaDB
+    10.5+). Returns a (recipe, errors) pair per record; records
+    referencing missing ids are not written and get their errors instead.
+    """
+    found, errors = resolve_references(records)
+    results = [[None, record_errors] for record_errors in errors]
+
+    valid = [
+        (record, result) for record, result in zip(records, results) if not result[1]
+    ]
+
+    new_ingredients, new_measures, recipes = [], [], []
+    for record, result in valid:
+        for usage in record["ingredients"]:
+            if not usage["ingredient"].get("id"):
+                new_ingredients.append(new_ingredient(record, usage["ingredient"]))
+            if not usage["measure"].get("id"):
+                new_measures.append(Measure(**usage["measure"]))
+
+        fields = {
+            key: value
+            for key, value in record.items()
+            if key not in ("ingredients", "tags")
+        }
+        result[0] = Recipe(**fields)
+        recipes.append(result[0])
+
+    Ingredient.objects.bulk_create(new_ingredients, batch_size=batch_size)
+    Measure.objects.bulk_create(new_measures, batch_size=batch_size)
+    Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+
+    next_ingredient, next_measure = iter(new_ingredients), iter(new_measures)
+    usages, tag_links = [], []
+    for record, (recipe, _) in valid:
+        for usage in record["ingredients"]:
+            ingr_id = usage["ingredient"].get("id")
+            mes_id = usage["measure"].get("id")
+
+            usages.append(
+                IngredientUsage(
+                    amount=usage["amount"],
+                    ingredient=(
+                        found["ingredients"][int(ingr_id)]
+                        if ingr_id
+                        else next(next_ingredient)
+                    ),
+                    measure=(
+                        found["measures"][int(mes_id)] if mes_id else next(next_measure)
+                    ),
+                    recipe=recipe,
+                )
+            )
+
+        for tag_id in _int_ids(record["tags"]):
+            tag_links.append(Recipe.tags.through(recipe=recipe, tag_id=tag_id))
+
+    IngredientUsage.objects.bulk_create(usages, batch_size=batch_size)
+    Recipe.tags.through.objects.bulk_create(tag_links, batch_size=batch_size)
+    recipes_bulk_created.send(
+        sender=Recipe,
+        recipes=recipes,
+        usages=usages,
+        ingredients=new_ingredients,
+        measures=new_measures,
+    )
+
+    return [tuple(result) for result in results]
+
+
+def import_recipes(lines, author, chunk_size=500):
+    """
+    Import recipes from newline-delimited JSON in the RecipeCreateSerializer
+    shape, validating and writing them `chunk_size` records at a time.
+
+    Lines are consumed lazily and a result is yielded per record, so the
+    upload never has to be held in memory. Invalid records are reported
+    as soon as they are read, valid ones when their chunk is written.
+    """
+    from culinary.serializers import RecipeImportSerializer
+
+    chunk = []
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield {"line": number, "errors": {"non_field_errors": ["Invalid JSON."]}}
+            continue
+
+        serializer = RecipeImportSerializer(data=data)
+        if not serializer.is_valid():
+            yield {"line": number, "errors": serializer.errors}
+            continue
+
+        chunk.append((number, {**serializer.validated_data, "author": author}))
+        if len(chunk) >= chunk_size:
+            yield from _write_chunk(chunk)
+            chunk = []
+
+    if chunk:
+        yield from _write_chunk(chunk)
+
+
+def _write_chunk(chunk):
+    results = bulk_create_recipes([record for _, record in chunk])
+    for (number, _), (recipe, errors) in zip(chunk, results):
+        if errors:
+            yield {"line": number, "errors": errors}
+        else:
+            yield {"line": number, "id": recipe.id}
@@ -0,0 +1,56 @@
+import threading
+import time
+
+from culinary.models import UtensilConversion
+
+
+class ConversionTable:
+    """
+    Process-wide (utensil id, ingredient id) -> grams lookup over
+    UtensilConversion.
+
+    The table is loaded with one query on first use and dropped by
+    culinary.signals when a conversion changes in this process, or when
+    older than `max_age` seconds, to pick up changes made elsewhere.
+    """
+
+    max_age = 300
+
+    def __init__(self):
+        self._table = None
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._table = None
+
+    def build(self):
+        rows = UtensilConversion.objects.values_list(
+            "utensil_id", "ingredient_id", "standard_value"
+        )
+        table = {
+            (utensil_id, ingredient_id): grams
+            for utensil_id, ingredient_id, grams in rows
+        }
+        self._table, self._built_at = table, time.monotonic()
+        return table
+
+    def table(self):
+        table = self._table
+        if table is None or time.monotonic() - self._built_at > self.max_age:
+            with self._lock:
+                table = self._table
+                if table is None or time.monotonic() - self._built_at > self.max_age:
+                    table = self.build()
+        return table
+
+    def grams(self, utensil_id, ingredient_id, amount):
+        """Weight of `amount` utensils of the ingredient, None without a
+        conversion"""
+        grams = self.table().get((utensil_id, ingredient_id))
+        if grams is None:
+            return None
+        return amount * grams
+
+
+conversion_table = ConversionTable()
@@ -0,0 +1,214 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+
+from culinary.models import Recipe, RecipeDocument
+from culinary.serializers import RecipeSerializer
+from foodinfo.utils import render_json
+
+logger = logging.getLogger(__name__)
+
+# parts of the representation that depend on the request, added on read
+OVERLAID = ("thumbnail", "favorite")
+DOCUMENT_FIELDS = [
+    field for field in RecipeSerializer.Meta.fields if field not in OVERLAID
+]
+
+
+def documents_queryset(queryset, user=None):
+    """Load what assemble() needs along with the recipes"""
+    queryset = queryset.select_related("document")
+    return RecipeSerializer.prefetch_plan(queryset, ["favorite"], user)
+
+
+def _render(recipe_ids):
+    """(recipe, document body) of the given recipes, serialized in one batch"""
+    recipes = RecipeSerializer.prefetch_plan(
+        Recipe.objects.filter(pk__in=recipe_ids), DOCUMENT_FIELDS
+    )
+    return [
+        (recipe, render_json(RecipeSerializer(recipe, fields=DOCUMENT_FIELDS).data))
+        for recipe in recipes
+    ]
+
+
+def render_documents(recipe_ids):
+    """Render and store the documents of the given recipes"""
+    documents = [
+        RecipeDocument(recipe_id=recipe.pk, version=recipe.updated_at, body=body)
+        for recipe, body in _render(recipe_ids)
+    ]
+    RecipeDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["recipe"],
+        update_fields=["version", "body"],
+    )
+
+
+def refresh_documents(recipe_ids, chunk_size=500):
+    """
+    Render and store the documents of the given recipes that are missing
+    or older than their recipe. Run by culinary.signals once writes to
+    recipes, or to what they show, commit, or by document_queue.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    for start in range(0, len(recipe_ids), chunk_size):
+        stale = (
+            Recipe.objects.filter(pk__in=recipe_ids[start : start + chunk_size])
+            .exclude(document__version=F("updated_at"))
+            .values_list("pk", flat=True)
+        )
+        render_documents(list(stale))
+
+
+class DocumentQueue:
+    """
+    Recipes whose documents are stale, rebuilt together in one batch.
+
+    culinary.signals adds the recipes of writes affecting many of them (an
+    ingredient, tag or author shown by every recipe using it) once they are
+    committed, so the write itself doesn't pay for the rebuild. A batch
+    runs when nothing new has arrived for RECIPE_DOCUMENTS_DEBOUNCE
+    seconds, or `max_wait` seconds after its first recipe under a steady
+    stream of edits, like culinary.nutrition's NutritionQueue. Until then
+    reads serialize those recipes instead of serving their documents.
+
+    A batch that fails is logged and kept for the next one, and what is
+    pending when the process exits is rebuilt then.
+    """
+
+    max_wait = 30
+    chunk_size = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timer = None
+        self._reset()
+
+    def _reset(self):
+        self.recipes = set()
+        self._first_added = None
+
+    def add(self, recipes):
+        with self._lock:
+            self.recipes.update(recipes)
+
+            now = time.monotonic()
+            if self._first_added is None:
+                self._first_added = now
+            delay = min(
+                settings.RECIPE_DOCUMENTS_DEBOUNCE,
+                self._first_added + self.max_wait - now,
+            )
+
+            self.cancel()
+            if delay > 0:
+                self._timer = threading.Timer(delay, self._flush_in_thread)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if delay <= 0:
+            self.flush()
+
+    def clear(self):
+        with self._lock:
+            self.cancel()
+            self._reset()
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def pending(self):
+        return bool(self.recipes)
+
+    def flush(self):
+        """Rebuild the documents of the pending recipes now, returns their
+        ids. They stay pending if it fails."""
+        with self._lock:
+            self.cancel()
+            recipes = self.recipes
+            self._reset()
+
+        try:
+            refresh_documents(recipes, self.chunk_size)
+        except Exception:
+            with self._lock:
+                self.recipes |= recipes
+                if self._first_added is None:
+                    self._first_added = time.monotonic()
+            raise
+        return recipes
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception(
+                "Rebuilding recipe documents failed, kept for the next batch"
+            )
+        finally:
+            # the timer thread's own connections
+            connections.close_all()
+
+    def flush_at_exit(self):
+        if not self.pending():
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Rebuilding recipe documents at exit failed")
+
+
+document_queue = DocumentQueue()
+atexit.register(document_queue.flush_at_exit)
+
+
+def document_bodies(recipes):
+    """
+    Document bodies of recipes loaded by documents_queryset(), by recipe id.
+
+    Only reads: documents are rebuilt when writes commit (see
+    refresh_documents), so missing ones, and ones rendered from an older
+    version of the recipe, are serialized for this response instead, in
+    one batch.
+    """
+    bodies, stale = {}, []
+    for recipe in recipes:
+        try:
+            document = recipe.document
+        except RecipeDocument.DoesNotExist:
+            document = None
+
+        if document is not None and document.version == recipe.updated_at:
+            bodies[recipe.pk] = document.body
+        else:
+            stale.append(recipe.pk)
+
+    if stale:
+        bodies.update((recipe.pk, body) for recipe, body in _render(stale))
+    return bodies
+
+
+def assemble(recipe, body, request):
+    """The recipe's JSON representation for `request`: its document with
+    the thumbnail URL and favorite flag added"""
+    thumbnail = None
+    if recipe.thumbnail:
+        thumbnail = request.build_absolute_uri(recipe.thumbnail.url)
+
+    favorite = None
+    if request.user.is_authenticated:
+        favorite = getattr(recipe, "is_favorite", None)
+        if favorite is None:
+            favorite = recipe.favorites.filter(pk=request.user.pk).exists()
+
+    overlay = f'"thumbnail":{render_json(thumbnail)},"favorite":{render_json(favorite)}'
+    return f"{body[:-1]},{overlay}}}"
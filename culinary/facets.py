@@ -0,0 +1,81 @@
+from django.db.models import Count, Q
+
+from culinary.models import IngredientUsage, Recipe
+
+# lower bounds of the calorie buckets, the last one is open ended
+CALORIE_BUCKETS = (0, 200, 400, 600, 800)
+
+
+def calorie_buckets(bounds=CALORIE_BUCKETS):
+    """(from, to) pairs of the buckets starting at `bounds`"""
+    return list(zip(bounds, (*bounds[1:], None)))
+
+
+def recipe_facets(queryset, bounds=CALORIE_BUCKETS):
+    """
+    Facet counts of the recipes `queryset` matches: per tag, per tag
+    category and per ingredient category the recipes having at least one
+    of them, and the recipes per calorie bucket (recipes without calories
+    are only in the total `count`).
+
+    Four aggregate queries, each over the filter set as a subquery, however
+    many values the facets have. Values no recipe has are left out.
+    """
+    ids = queryset.order_by().values("pk")
+    RecipeTag = Recipe.tags.through
+
+    tags = (
+        RecipeTag.objects.filter(recipe_id__in=ids)
+        .values("tag_id", "tag__label")
+        .annotate(count=Count("recipe_id"))
+        .order_by("-count", "tag__label")
+    )
+    tag_categories = (
+        RecipeTag.objects.filter(recipe_id__in=ids)
+        .values("tag__category_id", "tag__category__name")
+        .annotate(count=Count("recipe_id", distinct=True))
+        .order_by("-count", "tag__category__name")
+    )
+    ingredient_categories = (
+        IngredientUsage.objects.filter(recipe_id__in=ids)
+        .values("ingredient__category")
+        .annotate(count=Count("recipe_id", distinct=True))
+        .order_by("-count", "ingredient__category")
+    )
+
+    buckets = calorie_buckets(bounds)
+    counts = Recipe.objects.filter(pk__in=ids).aggregate(
+        count=Count("pk"),
+        **{
+            f"bucket_{i}": Count(
+                "pk",
+                filter=Q(calories__gte=low)
+                & (Q() if high is None else Q(calories__lt=high)),
+            )
+            for i, (low, high) in enumerate(buckets)
+        },
+    )
+
+    return {
+        "count": counts["count"],
+        "tags": [
+            {"id": row["tag_id"], "label": row["tag__label"], "count": row["count"]}
+            for row in tags
+        ],
+        "tag_categories": [
+            {
+                "id": row["tag__category_id"],
+                "name": row["tag__category__name"],
+                "count": row["count"],
+            }
+            for row in tag_categories
+        ],
+        "ingredient_categories": [
+            {"category": row["ingredient__category"], "count": row["count"]}
+            for row in ingredient_categories
+        ],
+        "calories": [
+            {"from": low, "to": high, "count": counts[f"bucket_{i}"]}
+            for i, (low, high) in enumerate(buckets)
+        ],
+    }
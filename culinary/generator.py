@@ -0,0 +1,289 @@
+import itertools
+import multiprocessing
+import random
+from datetime import time as clock_time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+
+from culinary.models import (
+    Fridge,
+    Ingredient,
+    IngredientUsage,
+    Measure,
+    Recipe,
+    UtensilConversion,
+)
+from tags.models import Tag, TagCategory
+
+TITLE_WORDS = ("soup", "salad", "pie", "stew", "cake", "bread", "curry", "pasta")
+INSTRUCTIONS = "Mix everything and cook."
+
+
+# the RecipeChunks worker processes run, inherited when they are forked
+_worker_chunks = None
+
+
+def _chunks(count, size):
+    for start in range(0, count, size):
+        yield start, min(size, count - start)
+
+
+class ZipfPicker:
+    """
+    Picks ids with Zipf distributed popularity: the id of rank r is
+    picked with a weight of 1 / r ** exponent, ranks being assigned in
+    a random order so popularity doesn't follow ids.
+    """
+
+    def __init__(self, ids, exponent, rng):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        weights = (1 / rank**exponent for rank in range(1, len(self.ids) + 1))
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def sample(self, rng, count):
+        """`count` distinct ids, at most as many as there are"""
+        count = min(count, len(self.ids))
+        picked = {}
+        while len(picked) < count:
+            for id in rng.choices(
+                self.ids, cum_weights=self.cum_weights, k=count - len(picked)
+            ):
+                picked[id] = None
+        return list(picked)
+
+
+def create_users(count, staff=1, batch_size=10000):
+    """`count` users with unusable passwords, the first `staff` of them
+    staff, returns their ids"""
+    start = User.objects.count()
+    password = make_password(None)
+    ids = []
+    for offset, size in _chunks(count, batch_size):
+        users = User.objects.bulk_create(
+            User(
+                username=f"generated user {start + offset + i}",
+                email=f"generated{start + offset + i}@example.com",
+                password=password,
+                is_staff=offset + i < staff,
+            )
+            for i in range(size)
+        )
+        ids += [user.pk for user in users]
+    return ids
+
+
+def ensure_tags(categories=3, per_category=5):
+    """Tag ids, creating tags the way load_tags does when there are none"""
+    if not Tag.objects.exists():
+        created = TagCategory.objects.bulk_create(
+            TagCategory(name=f"category {i}") for i in range(categories)
+        )
+        Tag.objects.bulk_create(
+            Tag(label=f"tag {i}", category=created[i % categories])
+            for i in range(categories * per_category)
+        )
+    return list(Tag.objects.order_by("pk").values_list("pk", flat=True))
+
+
+def ensure_measures(count=10):
+    """Measure ids, creating measures up to `count`"""
+    missing = count - Measure.objects.count()
+    if missing > 0:
+        Measure.objects.bulk_create(
+            Measure(name=f"measure {i}") for i in range(count - missing, count)
+        )
+    return list(Measure.objects.order_by("pk").values_list("pk", flat=True))
+
+
+def create_ingredients(count, owner_ids, measure_ids, rng, batch_size=10000):
+    """`count` ingredients owned by `owner_ids`, each with conversions for
+    one to three measures, returns their ids"""
+    start = Ingredient.objects.count()
+    categories = Ingredient.IngredientCategory.values
+    ids = []
+    for offset, size in _chunks(count, batch_size):
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(
+                name=f"ingredient {start + offset + i}",
+                user_id=rng.choice(owner_ids),
+                category=rng.choice(categories),
+                calories=round(rng.uniform(0, 900), 2),
+                proteins=round(rng.uniform(0, 50), 2),
+                fats=round(rng.uniform(0, 50), 2),
+                carbs=round(rng.uniform(0, 80), 2),
+            )
+            for i in range(size)
+        )
+        ids += [ingredient.pk for ingredient in ingredients]
+
+        UtensilConversion.objects.bulk_create(
+            (
+                UtensilConversion(
+                    utensil_id=utensil_id,
+                    ingredient_id=ingredient.pk,
+                    standard_value=round(rng.uniform(5, 250), 1),
+                )
+                for ingredient in ingredients
+                for utensil_id in rng.sample(
+                    measure_ids, min(len(measure_ids), rng.randint(1, 3))
+                )
+            ),
+            batch_size=batch_size,
+        )
+    return ids
+
+
+def create_fridges(user_ids, picker, rng, shelf_size=15, batch_size=10000):
+    """A fridge for each user with `shelf_size` ingredients"""
+    Shelf = Fridge.shelf.through
+    for offset, size in _chunks(len(user_ids), batch_size):
+        fridges = Fridge.objects.bulk_create(
+            Fridge(name="fridge", user_id=user_id)
+            for user_id in user_ids[offset : offset + size]
+        )
+        Shelf.objects.bulk_create(
+            (
+                Shelf(fridge_id=fridge.pk, ingredient_id=ingredient_id)
+                for fridge in fridges
+                for ingredient_id in picker.sample(rng, shelf_size)
+            ),
+            batch_size=batch_size,
+        )
+
+
+class RecipeChunks:
+    """
+    Creates recipes in chunks of `batch_size`, each with its usages and
+    tags, and in its own transaction.
+
+    Every chunk draws from its own random generator, seeded from `seed`
+    and the chunk position, so the data doesn't depend on how chunks are
+    spread over worker processes.
+    """
+
+    def __init__(
+        self,
+        author_ids,
+        picker,
+        measure_ids,
+        tag_ids,
+        usages_per_recipe,
+        batch_size=10000,
+        seed=0,
+    ):
+        self.author_ids = author_ids
+        self.picker = picker
+        self.measure_ids = measure_ids
+        self.tag_ids = tag_ids
+        self.usages_per_recipe = usages_per_recipe
+        self.batch_size = batch_size
+        self.seed = seed
+
+    def create(self, count, workers=1):
+        """Create `count` recipes, in `workers` processes when more than
+        one, returns how many were created"""
+        chunks = list(_chunks(count, self.batch_size))
+        if workers <= 1:
+            return sum(map(self.create_chunk, chunks))
+
+        global _worker_chunks
+        _worker_chunks = self
+        # children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        try:
+            with context.Pool(workers, initializer=connections.close_all) as pool:
+                return sum(pool.imap_unordered(_create_chunk, chunks))
+        finally:
+            _worker_chunks = None
+
+    @transaction.atomic
+    def create_chunk(self, chunk):
+        start, size = chunk
+        rng = random.Random(f"{self.seed}:{start}")
+        usages = self.usages_per_recipe
+
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                title=f"{rng.choice(TITLE_WORDS)} {start + i}",
+                portions=rng.randint(1, 8),
+                total_time=clock_time(rng.randint(0, 3), rng.choice((0, 15, 30, 45))),
+                instructions=INSTRUCTIONS,
+                author_id=rng.choice(self.author_ids),
+                calories=round(rng.uniform(20, 700), 2),
+                proteins=round(rng.uniform(0, 40), 2),
+                fats=round(rng.uniform(0, 40), 2),
+                carbs=round(rng.uniform(0, 80), 2),
+            )
+            for i in range(size)
+        )
+        IngredientUsage.objects.bulk_create(
+            (
+                IngredientUsage(
+                    recipe_id=recipe.pk,
+                    ingredient_id=ingredient_id,
+                    measure_id=rng.choice(self.measure_ids),
+                    amount=rng.randint(1, 5),
+                )
+                for recipe in recipes
+                for ingredient_id in self.picker.sample(
+                    rng, rng.randint(max(1, usages - 2), usages + 2)
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        Tags = Recipe.tags.through
+        Tags.objects.bulk_create(
+            (
+                Tags(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in rng.sample(
+                    self.tag_ids, min(len(self.tag_ids), rng.randint(1, 3))
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        return len(recipes)
+
+
+def _create_chunk(chunk):
+    return _worker_chunks.create_chunk(chunk)
+
+
+def generate(
+    users,
+    recipes,
+    ingredients,
+    usages_per_recipe=8,
+    batch_size=10000,
+    workers=1,
+    exponent=1.1,
+    seed=0,
+):
+    """
+    Generate a synthetic dataset with bulk_create: `users` users (the
+    first one staff) with a fridge each, `ingredients` ingredients
+    mostly owned by staff, with conversions, and `recipes` recipes using
+    about `usages_per_recipe` ingredients each, picked with Zipf
+    distributed popularity.
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        user_ids = create_users(users, batch_size=batch_size)
+        tag_ids = ensure_tags()
+        measure_ids = ensure_measures()
+        # staff ingredients are visible to everyone
+        owner_ids = user_ids[:1] * 9 + user_ids[1:2]
+        ingredient_ids = create_ingredients(
+            ingredients, owner_ids, measure_ids, rng, batch_size
+        )
+        picker = ZipfPicker(ingredient_ids, exponent, rng)
+        create_fridges(user_ids, picker, rng, batch_size=batch_size)
+
+    chunks = RecipeChunks(
+        user_ids, picker, measure_ids, tag_ids, usages_per_recipe, batch_size, seed
+    )
+    return chunks.create(recipes, workers)
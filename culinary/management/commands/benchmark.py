@@ -0,0 +1,110 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from culinary.benchmark import BenchmarkError, cases, compare, run, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "time every API endpoint against seeded databases of the given "
+        "scales and compare with the baseline saved on this machine"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=int,
+            action="append",
+            help="recipes to seed, can be repeated (default 1000)",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--case", help="only run cases whose name contains this text"
+        )
+        parser.add_argument(
+            "--baseline",
+            type=Path,
+            default=settings.BASE_DIR / "benchmarks" / "baseline.json",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="store the results as the baseline of their scales",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="p95 slowdown reported as a regression, as a fraction",
+        )
+
+    def handle(self, *args, **kwargs):
+        path = kwargs["baseline"]
+        baseline = json.loads(path.read_text()) if path.exists() else {}
+
+        regressions = []
+        for scale in kwargs["scale"] or [1000]:
+            results = self.benchmark(scale, kwargs["repeat"], kwargs["case"])
+            before = baseline.get(str(scale), {})
+            self.report(scale, results, before)
+
+            if kwargs["save_baseline"]:
+                baseline[str(scale)] = {**before, **results}
+            elif not before:
+                print(
+                    f"No baseline for {scale} recipes in {path}, "
+                    "run with --save-baseline on this machine first"
+                )
+            else:
+                regressions += [
+                    f"{scale}: {regression}"
+                    for regression in compare(results, before, kwargs["tolerance"])
+                ]
+
+        if kwargs["save_baseline"]:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+            print(f"Baseline saved to {path}")
+        elif regressions:
+            raise CommandError("Regressions:\n" + "\n".join(regressions))
+
+    def benchmark(self, scale, repeat, name_filter):
+        """Run the cases on a throwaway test database seeded with `scale`
+        recipes"""
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            print(f"Seeding {scale} recipes")
+            with transaction.atomic():
+                seed(scale)
+
+            selected = [
+                case
+                for case in cases()
+                if name_filter is None or name_filter in case.name
+            ]
+            return run(selected, repeat)
+        except BenchmarkError as error:
+            raise CommandError(error)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def report(self, scale, results, baseline):
+        print(f"{scale} recipes")
+        print(f"{'case':<40} {'p50 ms':>9} {'p95 ms':>9} {'queries':>7} {'was':>9}")
+        for name, result in results.items():
+            before = baseline.get(name)
+            was = f"{before['p95']:.2f}" if before else "-"
+            print(
+                f"{name:<40} {result['p50']:>9.2f} {result['p95']:>9.2f} "
+                f"{result['queries']:>7} {was:>9}"
+            )
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from culinary.generator import generate
+
+
+class Command(BaseCommand):
+    help = "generate a large synthetic dataset with bulk inserts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument("--ingredients", type=int, default=1000)
+        parser.add_argument("--usages-per-recipe", type=int, default=8)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="processes creating recipes, needs a database that takes "
+            "concurrent writes",
+        )
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.1,
+            help="exponent of the ingredient popularity distribution",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **kwargs):
+        if kwargs["users"] < 1 or kwargs["ingredients"] < 1:
+            raise CommandError("At least one user and one ingredient are needed")
+        if kwargs["workers"] > 1 and connection.vendor == "sqlite":
+            raise CommandError("SQLite can't take writes from several workers")
+
+        start = time.monotonic()
+        created = generate(
+            users=kwargs["users"],
+            recipes=kwargs["recipes"],
+            ingredients=kwargs["ingredients"],
+            usages_per_recipe=kwargs["usages_per_recipe"],
+            batch_size=kwargs["batch_size"],
+            workers=kwargs["workers"],
+            exponent=kwargs["zipf"],
+            seed=kwargs["seed"],
+        )
+
+        print(
+            f"Created {kwargs['users']} users, {kwargs['ingredients']} "
+            f"ingredients and {created} recipes "
+            f"in {time.monotonic() - start:.1f}s"
+        )
+        print("Import complete")
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from culinary.bulk import import_recipes
+
+
+class Command(BaseCommand):
+    help = "import recipes from a newline-delimited JSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON file, one recipe per line")
+        parser.add_argument(
+            "--author", required=True, help="username the recipes are created by"
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **kwargs):
+        try:
+            author = User.objects.get(username=kwargs["author"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {kwargs['author']} does not exist")
+
+        created = failed = 0
+        with open(kwargs["path"], encoding="utf-8") as lines:
+            for result in import_recipes(lines, author, kwargs["chunk_size"]):
+                if "id" in result:
+                    created += 1
+                else:
+                    failed += 1
+                    print(f"line {result['line']}: {result['errors']}")
+
+        print(f"Created {created} recipes, {failed} failed")
+        print("Import complete")
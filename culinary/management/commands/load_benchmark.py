@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from culinary.benchmark import (
+    LOAD_CASES,
+    BenchmarkError,
+    cases,
+    load,
+    read_views,
+    seed,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "load the read endpoints through the ASGI handler at growing "
+        "concurrency, with sync and with async views"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=int, default=1000, help="recipes to seed")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            action="append",
+            help="concurrent clients, can be repeated (default 1, 4, 16 and 64)",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=500, help="requests per run"
+        )
+
+    def handle(self, *args, **kwargs):
+        levels = kwargs["concurrency"] or [1, 4, 16, 64]
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            print(f"Seeding {kwargs['scale']} recipes")
+            with transaction.atomic():
+                seed(kwargs["scale"])
+            selected = [case for case in cases() if case.name in LOAD_CASES]
+
+            print(
+                f"{'views':<6} {'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}"
+            )
+            for async_reads in (False, True):
+                with read_views(async_reads):
+                    # once to warm up
+                    load(selected, 1, len(selected))
+                    for concurrency in levels:
+                        result = load(selected, concurrency, kwargs["requests"])
+                        print(
+                            f"{'async' if async_reads else 'sync':<6} "
+                            f"{concurrency:>7} {result['rps']:>9.1f} "
+                            f"{result['p50']:>9.2f} {result['p95']:>9.2f}"
+                        )
+        except BenchmarkError as error:
+            raise CommandError(error)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
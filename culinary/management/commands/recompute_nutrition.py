@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from culinary.models import Ingredient, Measure
+from culinary.nutrition import recompute_nutrition
+
+
+class Command(BaseCommand):
+    help = "compute recipe nutrition from ingredients and utensil conversions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="report without saving"
+        )
+
+    def handle(self, *args, **kwargs):
+        result = recompute_nutrition(
+            batch_size=kwargs["batch_size"], dry_run=kwargs["dry_run"]
+        )
+
+        ingredients = Ingredient.objects.in_bulk(
+            {usage.ingredient_id for usage in result.missing}
+        )
+        measures = Measure.objects.in_bulk(
+            {usage.measure_id for usage in result.missing}
+        )
+        for usage in result.missing:
+            print(
+                f"recipe {usage.recipe_id}, usage {usage.usage_id}: "
+                f"no conversion of {measures[usage.measure_id]} "
+                f"to grams for {ingredients[usage.ingredient_id]}"
+            )
+
+        skipped = len(result.recipe_ids) - int(result.complete.sum())
+        action = "Would update" if kwargs["dry_run"] else "Updated"
+        print(
+            f"{action} {result.updated} recipes, "
+            f"{skipped} skipped for missing conversions"
+        )
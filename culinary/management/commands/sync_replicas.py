@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from foodinfo.replicas import copy_database
+
+
+class Command(BaseCommand):
+    help = (
+        "copy the default SQLite database over the DATABASE_REPLICAS, "
+        "standing in for replication in development"
+    )
+
+    def handle(self, *args, **kwargs):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No DATABASE_REPLICAS configured")
+
+        for alias in settings.DATABASE_REPLICAS:
+            try:
+                copy_database(alias)
+            except ValueError as error:
+                raise CommandError(error)
+            self.stdout.write(f"Copied default to {alias}")
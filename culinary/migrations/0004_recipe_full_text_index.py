@@ -0,0 +1,71 @@
+from django.db import migrations
+
+# the SQL is kept here rather than imported from culinary.search, so later
+# changes to the app can't change what this migration did
+FTS_TABLE = "culinary_recipe_fts"
+
+SQLITE_FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, instructions, content='culinary_recipe', content_rowid='id'
+    )""",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON culinary_recipe BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, instructions)
+        VALUES (new.id, new.title, new.instructions);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON culinary_recipe BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, instructions)
+        VALUES ('delete', old.id, old.title, old.instructions);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON culinary_recipe BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, instructions)
+        VALUES ('delete', old.id, old.title, old.instructions);
+        INSERT INTO {FTS_TABLE}(rowid, title, instructions)
+        VALUES (new.id, new.title, new.instructions);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRES_VECTOR = (
+    "to_tsvector('english', culinary_recipe.title || ' ' "
+    "|| culinary_recipe.instructions)"
+)
+
+
+def install_full_text_index(apps, schema_editor):
+    """
+    Create the full-text index over recipe titles and instructions: an FTS5
+    table kept in sync by triggers on SQLite, a GIN expression index on
+    PostgreSQL.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sql in SQLITE_FTS_SQL:
+            schema_editor.execute(sql)
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE} ON culinary_recipe "
+            f"USING GIN (({POSTGRES_VECTOR}))"
+        )
+
+
+def remove_full_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for action in ("insert", "delete", "update"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{action}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("culinary", "0003_remove_recipe_ingredients"),
+    ]
+
+    operations = [
+        migrations.RunPython(install_full_text_index, remove_full_text_index),
+    ]
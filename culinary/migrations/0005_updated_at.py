@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+FTS_TABLE = "culinary_recipe_fts"
+
+# adding a column rebuilds culinary_recipe on SQLite, dropping the full-text
+# index triggers, recreated as 0004_recipe_full_text_index made them
+SQLITE_TRIGGERS_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON culinary_recipe BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, instructions)
+        VALUES (new.id, new.title, new.instructions);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON culinary_recipe BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, instructions)
+        VALUES ('delete', old.id, old.title, old.instructions);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON culinary_recipe BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, instructions)
+        VALUES ('delete', old.id, old.title, old.instructions);
+        INSERT INTO {FTS_TABLE}(rowid, title, instructions)
+        VALUES (new.id, new.title, new.instructions);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def reinstall_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in SQLITE_TRIGGERS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("culinary", "0004_recipe_full_text_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fridge",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="ingredient",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                help_text="bumped on every change to the recipe or anything it shows",
+            ),
+        ),
+        migrations.RunPython(reinstall_triggers, migrations.RunPython.noop),
+    ]
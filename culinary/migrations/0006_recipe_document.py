@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("culinary", "0005_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeDocument",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="document",
+                        serialize=False,
+                        to="culinary.recipe",
+                    ),
+                ),
+                (
+                    "version",
+                    models.DateTimeField(
+                        help_text="updated_at of the recipe when the document was rendered"
+                    ),
+                ),
+                ("body", models.TextField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("culinary", "0006_recipe_document"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=models.Index(fields=["name", "id"], name="ingredient_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ingredientusage",
+            index=models.Index(
+                fields=["ingredient", "recipe"], name="usage_ingredient_recipe_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ingredientusage",
+            index=models.Index(
+                fields=["recipe", "ingredient"], name="usage_recipe_ingredient_idx"
+            ),
+        ),
+        # CREATE INDEX doesn't rebuild culinary_recipe, so the full-text triggers are kept
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["title", "id"], name="recipe_title_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["calories"], name="recipe_calories_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "title", "id"], name="recipe_author_title_idx"
+            ),
+        ),
+        # covering index of the implicit recipe/tag table for the tags filter,
+        # which a model Meta can't declare
+        migrations.RunSQL(
+            "CREATE INDEX recipe_tags_tag_recipe_idx "
+            "ON culinary_recipe_tags (tag_id, recipe_id)",
+            "DROP INDEX recipe_tags_tag_recipe_idx",
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+FTS_TABLE = "culinary_recipe_fts"
+
+UPDATE_TRIGGER_SQL = f"""CREATE TRIGGER {FTS_TABLE}_update
+    AFTER UPDATE {{columns}}ON culinary_recipe BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, instructions)
+        VALUES ('delete', old.id, old.title, old.instructions);
+        INSERT INTO {FTS_TABLE}(rowid, title, instructions)
+        VALUES (new.id, new.title, new.instructions);
+    END"""
+
+
+def update_trigger(columns):
+    def replace_trigger(apps, schema_editor):
+        if schema_editor.connection.vendor == "sqlite":
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update")
+            schema_editor.execute(UPDATE_TRIGGER_SQL.format(columns=columns))
+
+    return replace_trigger
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("culinary", "0007_indexes"),
+    ]
+
+    operations = [
+        # reindex recipes only when their text changes, not on updated_at
+        # touches or nutrition updates
+        migrations.RunPython(
+            update_trigger("OF title, instructions "), update_trigger("")
+        ),
+    ]
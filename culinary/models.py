@@ -65,6 +65,12 @@ class Ingredient(CaloryInfo):
         default=IngredientCategory.Other,
         max_length=50,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta(CaloryInfo.Meta):
+        # IngredientList pages, ordered by name for staff and users alike:
+        # owned by the user OR by staff can't narrow on a user index
+        indexes = [models.Index(fields=["name", "id"], name="ingredient_name_idx")]
 
     def __str__(self) -> str:
         return self.name
@@ -74,6 +80,7 @@ class Fridge(models.Model):
     name = models.CharField(max_length=50)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     shelf = models.ManyToManyField(Ingredient)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.name
@@ -115,6 +122,20 @@ class Recipe(CaloryInfo):
 
     author = models.ForeignKey(User, on_delete=models.PROTECT)
     tags = models.ManyToManyField(Tag)
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="bumped on every change to the recipe or anything it shows",
+    )
+
+    class Meta(CaloryInfo.Meta):
+        # RecipeList pages, ordered by title then id, and its filters
+        indexes = [
+            models.Index(fields=["title", "id"], name="recipe_title_idx"),
+            models.Index(fields=["calories"], name="recipe_calories_idx"),
+            models.Index(
+                fields=["author", "title", "id"], name="recipe_author_title_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -125,3 +146,26 @@ class IngredientUsage(models.Model):
     ingredient = models.ForeignKey(Ingredient, on_delete=models.PROTECT)
     measure = models.ForeignKey(Measure, on_delete=models.PROTECT)
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+
+    class Meta:
+        # covering, for recipes by ingredients and ingredients per recipe
+        indexes = [
+            models.Index(
+                fields=["ingredient", "recipe"], name="usage_ingredient_recipe_idx"
+            ),
+            models.Index(
+                fields=["recipe", "ingredient"], name="usage_recipe_ingredient_idx"
+            ),
+        ]
+
+
+class RecipeDocument(models.Model):
+    """RecipeSerializer output of a recipe, stored by culinary.documents"""
+
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True, related_name="document"
+    )
+    version = models.DateTimeField(
+        help_text="updated_at of the recipe when the document was rendered"
+    )
+    body = models.TextField()
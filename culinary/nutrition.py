@@ -0,0 +1,306 @@
+import atexit
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from scipy import sparse
+
+from culinary.models import Ingredient, IngredientUsage, Recipe, UtensilConversion
+from culinary.signals import rebuild_documents
+
+NUTRIENTS = ("calories", "proteins", "fats", "carbs")
+
+logger = logging.getLogger(__name__)
+
+MissingConversion = namedtuple(
+    "MissingConversion", ["usage_id", "recipe_id", "ingredient_id", "measure_id"]
+)
+
+
+def _load(queryset, *fields):
+    """values_list rows as a 2D float array, NULL becoming nan"""
+    rows = list(queryset.values_list(*fields))
+    return np.array(rows, dtype=float).reshape(len(rows), len(fields))
+
+
+def _conversion_keys(measure_ids, ingredient_ids):
+    return (measure_ids.astype(np.int64) << 32) | ingredient_ids.astype(np.int64)
+
+
+class NutritionResult:
+    def __init__(self, recipe_ids, current, values, grams, complete, missing):
+        # recipe ids in ascending order, indexing the rows of the arrays below
+        self.recipe_ids = recipe_ids
+        # stored per 100 grams values, one column per NUTRIENTS entry
+        self.current = current
+        # computed per 100 grams values, nan where unknown
+        self.values = values
+        # total weight in grams of the converted usages
+        self.grams = grams
+        # False for recipes with usages that have no conversion
+        self.complete = complete
+        self.missing = missing
+        self.updated = 0
+
+    def resolved(self):
+        """Values to store: the computed ones where every usage converts and
+        every ingredient has the value, the stored ones otherwise"""
+        known = self.complete[:, None] & np.isfinite(self.values)
+        return np.where(known, np.round(self.values, 2), self.current)
+
+    def __getitem__(self, recipe_id):
+        row = np.searchsorted(self.recipe_ids, recipe_id)
+        if row == len(self.recipe_ids) or self.recipe_ids[row] != recipe_id:
+            raise KeyError(recipe_id)
+        return {
+            name: None if np.isnan(value) else float(value)
+            for name, value in zip(NUTRIENTS, self.values[row])
+        }
+
+
+def compute_nutrition(recipe_ids=None):
+    """
+    Compute per 100 grams calories, proteins, fats and carbs of recipes
+    from their ingredient usages, all at once.
+
+    Each usage weighs `amount` times the grams of its measure from
+    UtensilConversion. Usage weights form a sparse recipe x ingredient
+    matrix which, multiplied by the per 100 grams ingredient values, gives
+    the totals of every recipe. Usages without a conversion are left out
+    and listed in `missing`; their recipes are marked incomplete.
+    """
+    recipes = Recipe.objects.order_by("id")
+    usages = IngredientUsage.objects.all()
+    ingredients = Ingredient.objects.order_by("id")
+    conversions = UtensilConversion.objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(id__in=recipe_ids)
+        usages = usages.filter(recipe_id__in=recipe_ids)
+        ingredients = ingredients.filter(id__in=usages.values("ingredient_id"))
+        conversions = conversions.filter(
+            ingredient_id__in=usages.values("ingredient_id")
+        )
+
+    recipe_rows = _load(recipes, "id", *NUTRIENTS)
+    usage_rows = _load(
+        usages, "id", "recipe_id", "ingredient_id", "measure_id", "amount"
+    )
+    ingredient_rows = _load(ingredients, "id", *NUTRIENTS)
+    conversion_rows = _load(
+        conversions, "utensil_id", "ingredient_id", "standard_value"
+    )
+
+    recipe_ids = recipe_rows[:, 0].astype(np.int64)
+    ingredient_ids = ingredient_rows[:, 0].astype(np.int64)
+    usage_ids = usage_rows[:, :4].astype(np.int64)
+    amounts = usage_rows[:, 4]
+
+    keys = _conversion_keys(conversion_rows[:, 0], conversion_rows[:, 1])
+    order = np.argsort(keys)
+    keys, standard = keys[order], conversion_rows[order, 2]
+
+    usage_keys = _conversion_keys(usage_ids[:, 3], usage_ids[:, 2])
+    positions = np.searchsorted(keys, usage_keys)
+    converted = positions < len(keys)
+    converted[converted] = keys[positions[converted]] == usage_keys[converted]
+
+    rows = np.searchsorted(recipe_ids, usage_ids[converted, 1])
+    columns = np.searchsorted(ingredient_ids, usage_ids[converted, 2])
+    grams = amounts[converted] * standard[positions[converted]]
+    weights = sparse.csr_matrix(
+        (grams / 100, (rows, columns)), shape=(len(recipe_ids), len(ingredient_ids))
+    )
+
+    totals = weights @ ingredient_rows[:, 1:]
+    recipe_grams = np.asarray(weights.sum(axis=1)).ravel() * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = totals / recipe_grams[:, None] * 100
+    values[recipe_grams <= 0] = np.nan
+
+    complete = np.ones(len(recipe_ids), dtype=bool)
+    complete[np.searchsorted(recipe_ids, usage_ids[~converted, 1])] = False
+    missing = [MissingConversion(*map(int, row)) for row in usage_ids[~converted]]
+
+    return NutritionResult(
+        recipe_ids, recipe_rows[:, 1:], values, recipe_grams, complete, missing
+    )
+
+
+@transaction.atomic
+def recompute_nutrition(recipe_ids=None, batch_size=500, dry_run=False):
+    """
+    Store computed nutrition values on recipes, see compute_nutrition.
+
+    Incomplete recipes and values some ingredient lacks keep what was
+    entered by hand. Only recipes whose values change are written, with
+    bulk_update, which also bumps their `updated_at`, and their documents
+    are rebuilt on commit.
+    """
+    result = compute_nutrition(recipe_ids)
+    resolved = result.resolved()
+
+    same = (resolved == result.current) | (
+        np.isnan(resolved) & np.isnan(result.current)
+    )
+    changed = np.flatnonzero(~same.all(axis=1))
+    result.updated = len(changed)
+    if dry_run or not len(changed):
+        return result
+
+    now = timezone.now()
+    recipes = [
+        Recipe(
+            id=int(result.recipe_ids[row]),
+            updated_at=now,
+            **{
+                name: None if np.isnan(value) else float(value)
+                for name, value in zip(NUTRIENTS, resolved[row])
+            },
+        )
+        for row in changed
+    ]
+    Recipe.objects.bulk_update(recipes, [*NUTRIENTS, "updated_at"], batch_size)
+    rebuild_documents(recipe.pk for recipe in recipes)
+    return result
+
+
+def _chunks(items, size):
+    items = sorted(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class NutritionQueue:
+    """
+    Ingredients, conversions and recipes whose changes make recipe
+    nutrition stale, recomputed together in one batch.
+
+    culinary.signals adds changes once they are committed. A batch runs
+    when nothing new has arrived for NUTRITION_DEBOUNCE seconds, or
+    `max_wait` seconds after its first change under a steady stream of
+    edits, so a bulk ingredient import recomputes each affected recipe
+    once. Changes are resolved to recipes through IngredientUsage only
+    when the batch runs.
+
+    Pending changes live in this process: a batch that fails is logged and
+    kept for the next one, and what is pending when the process exits is
+    recomputed then.
+    """
+
+    max_wait = 30
+    chunk_size = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timer = None
+        self._reset()
+
+    def _reset(self):
+        self.ingredients = set()
+        # (measure id, ingredient id)
+        self.conversions = set()
+        self.recipes = set()
+        self._first_added = None
+
+    def add(self, ingredients=(), conversions=(), recipes=()):
+        with self._lock:
+            self.ingredients.update(ingredients)
+            self.conversions.update(conversions)
+            self.recipes.update(recipes)
+
+            now = time.monotonic()
+            if self._first_added is None:
+                self._first_added = now
+            delay = min(
+                settings.NUTRITION_DEBOUNCE, self._first_added + self.max_wait - now
+            )
+
+            self.cancel()
+            if delay > 0:
+                self._timer = threading.Timer(delay, self._flush_in_thread)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if delay <= 0:
+            self.flush()
+
+    def clear(self):
+        with self._lock:
+            self.cancel()
+            self._reset()
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def affected_recipes(self, ingredients, conversions):
+        recipes = set()
+        ingredient_ids = ingredients | {id for _, id in conversions}
+        for chunk in _chunks(ingredient_ids, self.chunk_size):
+            usages = IngredientUsage.objects.filter(ingredient_id__in=chunk)
+            rows = usages.values_list("recipe_id", "ingredient_id", "measure_id")
+            for recipe_id, ingredient_id, measure_id in rows.iterator():
+                if (
+                    ingredient_id in ingredients
+                    or (measure_id, ingredient_id) in conversions
+                ):
+                    recipes.add(recipe_id)
+        return recipes
+
+    def pending(self):
+        return bool(self.ingredients or self.conversions or self.recipes)
+
+    def flush(self):
+        """Recompute the recipes affected by the pending changes now,
+        returns their ids. Changes stay pending if it fails."""
+        with self._lock:
+            self.cancel()
+            ingredients, conversions, recipes = (
+                self.ingredients,
+                self.conversions,
+                self.recipes,
+            )
+            self._reset()
+
+        try:
+            recipes = recipes | self.affected_recipes(ingredients, conversions)
+            for chunk in _chunks(recipes, self.chunk_size):
+                recompute_nutrition(recipe_ids=chunk)
+        except Exception:
+            with self._lock:
+                self.ingredients |= ingredients
+                self.conversions |= conversions
+                self.recipes |= recipes
+                if self._first_added is None:
+                    self._first_added = time.monotonic()
+            raise
+        return recipes
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception(
+                "Recomputing recipe nutrition failed, kept for the next batch"
+            )
+        finally:
+            # the timer thread's own connections
+            connections.close_all()
+
+    def flush_at_exit(self):
+        if not self.pending():
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Recomputing recipe nutrition at exit failed")
+
+
+nutrition_queue = NutritionQueue()
+atexit.register(nutrition_queue.flush_at_exit)
@@ -0,0 +1,328 @@
+import heapq
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.expressions import RawSQL
+
+from culinary.models import Ingredient, IngredientUsage, Recipe
+
+
+class RecipeIndex:
+    """In-process inverted index of ingredient -> recipes.
+
+    Answers "recipes missing at most N of these ingredients" by counting
+    postings instead of aggregating the whole IngredientUsage table.
+    Ranks recipes by the share of their usages present the same way.
+    The index is built lazily on first use and kept current by the
+    receivers in culinary.signals, so it only reflects writes made
+    through this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.loaded = False
+            # usage id -> (recipe id, ingredient id)
+            self._usages = {}
+            # ingredient id -> {recipe id: number of usages}
+            self._postings = defaultdict(dict)
+            # recipe id -> number of usages
+            self._sizes = {}
+            # number of usages -> recipe ids
+            self._by_size = defaultdict(set)
+            # ingredient id -> category
+            self._categories = {}
+            # recipe id -> {ingredient category: number of usages}
+            self._category_sizes = {}
+
+    def build(self):
+        with self._lock:
+            self.clear()
+            for recipe_id in Recipe.objects.values_list("id", flat=True).iterator():
+                self._set_size(recipe_id, 0)
+            self._categories.update(
+                Ingredient.objects.values_list("id", "category").iterator()
+            )
+            usages = IngredientUsage.objects.values_list(
+                "id", "recipe_id", "ingredient_id"
+            )
+            for usage_id, recipe_id, ingredient_id in usages.iterator():
+                self._add_usage(usage_id, recipe_id, ingredient_id)
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.build()
+
+    def _set_size(self, recipe_id, size):
+        old = self._sizes.get(recipe_id)
+        if old is not None:
+            self._by_size[old].discard(recipe_id)
+            if not self._by_size[old]:
+                del self._by_size[old]
+        self._sizes[recipe_id] = size
+        self._by_size[size].add(recipe_id)
+        self._category_sizes.setdefault(recipe_id, {})
+
+    def _count_category(self, recipe_id, category, count):
+        sizes = self._category_sizes.setdefault(recipe_id, {})
+        sizes[category] = sizes.get(category, 0) + count
+        if not sizes[category]:
+            del sizes[category]
+
+    def _category(self, ingredient_id):
+        if ingredient_id not in self._categories:
+            # an ingredient created since the index was built
+            self._categories[ingredient_id] = (
+                Ingredient.objects.filter(pk=ingredient_id)
+                .values_list("category", flat=True)
+                .first()
+            )
+        return self._categories[ingredient_id]
+
+    def _add_usage(self, usage_id, recipe_id, ingredient_id):
+        self._usages[usage_id] = (recipe_id, ingredient_id)
+        posting = self._postings[ingredient_id]
+        posting[recipe_id] = posting.get(recipe_id, 0) + 1
+        self._set_size(recipe_id, self._sizes.get(recipe_id, 0) + 1)
+        self._count_category(recipe_id, self._category(ingredient_id), 1)
+
+    def _remove_usage(self, usage_id):
+        recipe_id, ingredient_id = self._usages.pop(usage_id)
+        posting = self._postings[ingredient_id]
+        posting[recipe_id] -= 1
+        if not posting[recipe_id]:
+            del posting[recipe_id]
+        if not posting:
+            del self._postings[ingredient_id]
+        if recipe_id in self._sizes:
+            self._set_size(recipe_id, self._sizes[recipe_id] - 1)
+            self._count_category(recipe_id, self._category(ingredient_id), -1)
+
+    def add_recipe(self, recipe_id):
+        with self._lock:
+            if self.loaded and recipe_id not in self._sizes:
+                self._set_size(recipe_id, 0)
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            if not self.loaded or recipe_id not in self._sizes:
+                return
+            size = self._sizes.pop(recipe_id)
+            del self._category_sizes[recipe_id]
+            self._by_size[size].discard(recipe_id)
+            if not self._by_size[size]:
+                del self._by_size[size]
+
+    def save_usage(self, usage_id, recipe_id, ingredient_id):
+        with self._lock:
+            if not self.loaded:
+                return
+            if usage_id in self._usages:
+                self._remove_usage(usage_id)
+            self._add_usage(usage_id, recipe_id, ingredient_id)
+
+    def delete_usage(self, usage_id):
+        with self._lock:
+            if self.loaded and usage_id in self._usages:
+                self._remove_usage(usage_id)
+
+    def set_category(self, ingredient_id, category):
+        with self._lock:
+            if not self.loaded:
+                return
+            old = self._categories.get(ingredient_id, category)
+            self._categories[ingredient_id] = category
+            if old == category:
+                return
+            for recipe_id, count in self._postings.get(ingredient_id, {}).items():
+                if recipe_id in self._sizes:
+                    self._count_category(recipe_id, old, -count)
+                    self._count_category(recipe_id, category, count)
+
+    def match(self, ingredient_ids, absent_limit):
+        """Return ids of recipes missing at most `absent_limit` ingredient usages
+        from `ingredient_ids`, counted the same way as the annotated query."""
+        self.ensure_loaded()
+        with self._lock:
+            present = defaultdict(int)
+            for ingredient_id in set(ingredient_ids):
+                for recipe_id, count in self._postings.get(ingredient_id, {}).items():
+                    present[recipe_id] += count
+
+            matched = set()
+            for recipe_id, count in present.items():
+                # postings can outlive their recipe until its usages go
+                size = self._sizes.get(recipe_id)
+                if size is not None and size - count <= absent_limit:
+                    matched.add(recipe_id)
+            # recipes short enough to qualify even with nothing present
+            for size, recipe_ids in self._by_size.items():
+                if size <= absent_limit:
+                    matched.update(recipe_ids)
+
+            return matched
+
+    def rank(self, ingredient_ids, k, weights=None, absent_limit=None, accept=None):
+        """
+        Return the `k` recipes with the largest share of their ingredient
+        usages in `ingredient_ids`, as (recipe id, coverage) pairs, best
+        first and lowest id first among ties.
+
+        `weights` maps ingredient categories to the weight of their usages
+        (1 for categories left out), so spices can count less. Recipes
+        missing more than `absent_limit` usages, or having none present,
+        are left out. `accept`, given a list of recipe ids, returns those
+        passing the other filters of the search; it is called with batches
+        of the best remaining candidates, twice as large each time.
+
+        Only recipes in the postings of `ingredient_ids` are scored, and
+        the best are taken with a heap, never by sorting every candidate.
+        """
+        self.ensure_loaded()
+        weights = weights or {}
+        with self._lock:
+            present = defaultdict(int)
+            covered = defaultdict(float)
+            for ingredient_id in set(ingredient_ids):
+                weight = weights.get(self._categories.get(ingredient_id), 1.0)
+                for recipe_id, count in self._postings.get(ingredient_id, {}).items():
+                    present[recipe_id] += count
+                    covered[recipe_id] += weight * count
+
+            # (-coverage, recipe id), so the smallest keys are the best
+            keys = []
+            for recipe_id, count in present.items():
+                size = self._sizes.get(recipe_id)
+                if size is None or not covered[recipe_id]:
+                    continue
+                if absent_limit is not None and size - count > absent_limit:
+                    continue
+                total = sum(
+                    weights.get(category, 1.0) * usages
+                    for category, usages in self._category_sizes[recipe_id].items()
+                )
+                keys.append((-covered[recipe_id] / total, recipe_id))
+
+        if accept is None:
+            return [(recipe_id, -key) for key, recipe_id in heapq.nsmallest(k, keys)]
+
+        # pop the best candidates a batch at a time until k pass the filters,
+        # doubling the batch so rejected candidates cost logarithmic queries
+        heapq.heapify(keys)
+        ranked = []
+        size = k
+        while keys and len(ranked) < k:
+            batch = [heapq.heappop(keys) for _ in range(min(size, len(keys)))]
+            accepted = accept([recipe_id for _, recipe_id in batch])
+            ranked.extend(
+                (recipe_id, -key) for key, recipe_id in batch if recipe_id in accepted
+            )
+            size *= 2
+        return ranked[:k]
+
+
+recipe_index = RecipeIndex()
+
+
+def rank_by_coverage(queryset, ingredient_ids, k, weights=None, absent_limit=None):
+    """
+    RecipeIndex.rank() over the recipes of `queryset`, aggregated by the
+    database, which keeps only the best `k` rows while ordering.
+    """
+    usages = Q(ingredientusage__ingredient__pk__in=ingredient_ids)
+    weight = Case(
+        *[
+            When(ingredientusage__ingredient__category=category, then=Value(value))
+            for category, value in (weights or {}).items()
+        ],
+        default=Value(1.0),
+        output_field=FloatField(),
+    )
+    # candidates are the recipes using any of the ingredients, filtered in
+    # subqueries as joins of the filters would repeat usages
+    candidates = IngredientUsage.objects.filter(ingredient_id__in=ingredient_ids)
+    recipes = Recipe.objects.filter(
+        pk__in=queryset.order_by().values("pk"),
+    ).filter(pk__in=candidates.values("recipe_id"))
+    recipes = recipes.annotate(
+        all=Count("ingredientusage"),
+        present=Count("ingredientusage", filter=usages),
+        total=Sum(weight),
+        covered=Sum(weight, filter=usages),
+    ).filter(covered__gt=0)
+    if absent_limit is not None:
+        recipes = recipes.filter(all__lte=F("present") + absent_limit)
+
+    rows = (
+        recipes.annotate(coverage=F("covered") / F("total"))
+        .order_by("-coverage", "pk")
+        .values_list("pk", "coverage")
+    )
+    return list(rows[:k])
+
+
+# the full-text index, an FTS5 table kept in sync by triggers on SQLite and
+# a GIN expression index on PostgreSQL, is made by the culinary migrations
+FTS_TABLE = "culinary_recipe_fts"
+
+POSTGRES_VECTOR = (
+    "to_tsvector('english', culinary_recipe.title || ' ' "
+    "|| culinary_recipe.instructions)"
+)
+
+
+def full_text_search(queryset, text):
+    """
+    Filter recipes whose title or instructions contain every word of `text`
+    as a prefix, annotated with a relevance `rank`.
+
+    Returns the queryset and the ordering that puts the best matches first.
+    Backends without a full-text index fall back to substring matching
+    ordered by title.
+    """
+    terms = re.findall(r"\w+", text)
+    if not terms:
+        return queryset.none(), ["title"]
+
+    if connection.vendor == "sqlite":
+        query = " ".join(f'"{term}"*' for term in terms)
+        # a self-contained subquery, so the filter survives the queryset
+        # being nested in another query (culinary.facets)
+        matches = RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (query,)
+        )
+        # bm25 scores are negative, lower is more relevant
+        rank = RawSQL(
+            f"SELECT bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = culinary_recipe.id",
+            (query,),
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(rank=rank), ["rank"]
+
+    if connection.vendor == "postgresql":
+        query = " & ".join(f"{term}:*" for term in terms)
+        matches = RawSQL(
+            f"SELECT id FROM culinary_recipe "
+            f"WHERE {POSTGRES_VECTOR} @@ to_tsquery('english', %s)",
+            (query,),
+        )
+        rank = RawSQL(
+            f"ts_rank({POSTGRES_VECTOR}, to_tsquery('english', %s))",
+            (query,),
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(rank=rank), ["-rank"]
+
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(instructions__icontains=term)
+        )
+    return queryset, ["title"]
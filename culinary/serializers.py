@@ -1,3 +1,5 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
 from tags.models import Tag
 from tags.serializers import TagSerializer
 from .models import (
@@ -10,11 +12,14 @@ from .models import (
 )
 from rest_framework import serializers
 from rest_framework.exceptions import ParseError
+from culinary.bulk import new_ingredient, resolve_references
+from culinary.signals import recipes_bulk_created
+from foodinfo.metrics import TimedSerializerMixin
 from foodinfo.utils import DynamicFieldsModelSerializer
 
 
 class IngredientSerializer(DynamicFieldsModelSerializer):
-    user = serializers.ReadOnlyField(source="user.id")
+    user = serializers.ReadOnlyField(source="user_id")
 
     class Meta:
         model = Ingredient
@@ -36,7 +41,7 @@ class MeasureSerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
 
 
-class FridgeSerializer(serializers.ModelSerializer):
+class FridgeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source="user.id")
     shelf = IngredientSerializer(many=True, read_only=True, fields=["id", "name"])
 
@@ -45,7 +50,7 @@ class FridgeSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "user", "shelf"]
 
 
-class ConversionSerializer(serializers.ModelSerializer):
+class ConversionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     utensil = MeasureSerializer(many=False, read_only=True)
     ingredient = IngredientSerializer(many=False, read_only=True, fields=["id", "name"])
 
@@ -74,6 +79,12 @@ class ConversionSerializer(serializers.ModelSerializer):
         ]
 
 
+class ConversionRequestSerializer(serializers.Serializer):
+    ingredient = serializers.IntegerField()
+    measure = serializers.IntegerField()
+    amount = serializers.FloatField()
+
+
 class IngredientUsageSerializer(serializers.ModelSerializer):
     ingredient = IngredientSerializer(many=False)
     measure = MeasureSerializer(many=False)
@@ -89,9 +100,39 @@ class RecipeSerializer(DynamicFieldsModelSerializer):
     tags = TagSerializer(many=True, fields=["id", "label", "category_name"])
     favorite = serializers.SerializerMethodField()
 
+    @classmethod
+    def prefetch_plan(cls, queryset, fields=None, user=None):
+        """Eager load the relations that the given fields will traverse"""
+        fields = set(fields or cls.Meta.fields)
+
+        if "favorite" in fields and user and user.is_authenticated:
+            favorites = Recipe.favorites.through.objects.filter(
+                recipe_id=OuterRef("pk"), user_id=user.pk
+            )
+            queryset = queryset.annotate(is_favorite=Exists(favorites))
+
+        if "author" in fields:
+            queryset = queryset.select_related("author")
+        if "ingredients" in fields:
+            usages = IngredientUsage.objects.select_related(
+                "ingredient", "measure"
+            ).order_by("id")
+            queryset = queryset.prefetch_related(
+                Prefetch("ingredientusage_set", queryset=usages)
+            )
+        if "tags" in fields:
+            tags = Tag.objects.select_related("category").order_by("id")
+            queryset = queryset.prefetch_related(Prefetch("tags", queryset=tags))
+
+        return queryset
+
     def get_favorite(self, obj):
         request = self.context.get("request") or None
         if request and request.user.is_authenticated:
+            # precomputed for the whole page by prefetch_plan
+            is_favorite = getattr(obj, "is_favorite", None)
+            if is_favorite is not None:
+                return is_favorite
             return obj.favorites.filter(pk=request.user.pk).exists()
 
     def update(self, instance, validated_data):
@@ -124,40 +165,112 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = serializers.ListField(write_only=True)
     tags = serializers.ListField(write_only=True)
 
+    def validate_ingredients(self, value):
+        for usage in value:
+            if not (
+                isinstance(usage, dict)
+                and "amount" in usage
+                and isinstance(usage.get("ingredient"), dict)
+                and isinstance(usage.get("measure"), dict)
+            ):
+                raise serializers.ValidationError(
+                    "Each ingredient must have amount, ingredient and measure."
+                )
+
+        validated, errors = [], []
+        for usage in value:
+            usage, usage_errors = self._validate_usage(usage)
+            validated.append(usage)
+            errors.append(usage_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated
+
+    def _validate_usage(self, usage):
+        """The usage with its amount and any new ingredient or measure
+        validated, ids are resolved when writing"""
+        validated, errors = {}, {}
+        try:
+            validated["amount"] = serializers.FloatField().run_validation(
+                usage["amount"]
+            )
+        except serializers.ValidationError as error:
+            errors["amount"] = error.detail
+
+        for field, serializer_class in (
+            ("ingredient", IngredientSerializer),
+            ("measure", MeasureSerializer),
+        ):
+            if usage[field].get("id"):
+                validated[field] = {"id": usage[field]["id"]}
+                continue
+            serializer = serializer_class(data=usage[field])
+            if serializer.is_valid():
+                validated[field] = dict(serializer.validated_data)
+            else:
+                errors[field] = serializer.errors
+        return validated, errors
+
+    @transaction.atomic
     def create(self, validated_data):
-        ingredients_usage_data = validated_data.pop("ingredients")
+        """
+        Write one recipe in one transaction: the recipe with save() and tag
+        links with tags.add(), so their signals fire, and new ingredients,
+        measures and usages with bulk_create. bulk_create skips post_save,
+        so receivers learn about those rows from recipes_bulk_created, as
+        for imports (bulk_create_recipes).
+        """
+        found, [errors] = resolve_references([validated_data])
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        usages = validated_data.pop("ingredients")
         tag_ids = validated_data.pop("tags")
-
         recipe = Recipe.objects.create(**validated_data)
 
-        for usage in ingredients_usage_data:
-            ingredient_data = usage["ingredient"]
-            measure_data = usage["measure"]
-
-            ingr_id = ingredient_data.get("id") or None
-            mes_id = measure_data.get("id") or None
-
-            if ingr_id:
-                ingredient = Ingredient.objects.get(id=ingr_id)
-            else:
-                ingredient = Ingredient.objects.create(**ingredient_data)
-
-            if mes_id:
-                measure = Measure.objects.get(id=mes_id)
-            else:
-                measure = Measure.objects.create(**measure_data)
-
-            usage = IngredientUsage.objects.create(
-                amount=usage["amount"],
-                ingredient=ingredient,
-                measure=measure,
-                recipe=recipe,
+        new_ingredients = [
+            new_ingredient(validated_data, usage["ingredient"])
+            for usage in usages
+            if not usage["ingredient"].get("id")
+        ]
+        new_measures = [
+            Measure(**usage["measure"])
+            for usage in usages
+            if not usage["measure"].get("id")
+        ]
+        Ingredient.objects.bulk_create(new_ingredients)
+        Measure.objects.bulk_create(new_measures)
+
+        next_ingredient, next_measure = iter(new_ingredients), iter(new_measures)
+        rows = []
+        for usage in usages:
+            ingr_id = usage["ingredient"].get("id")
+            mes_id = usage["measure"].get("id")
+
+            rows.append(
+                IngredientUsage(
+                    amount=usage["amount"],
+                    ingredient=(
+                        found["ingredients"][int(ingr_id)]
+                        if ingr_id
+                        else next(next_ingredient)
+                    ),
+                    measure=(
+                        found["measures"][int(mes_id)] if mes_id else next(next_measure)
+                    ),
+                    recipe=recipe,
+                )
             )
-
-        for id in tag_ids:
-            tag = Tag.objects.get(id=id)
-            recipe.tags.add(tag)
-
+        IngredientUsage.objects.bulk_create(rows)
+
+        recipe.tags.add(*(found["tags"][int(id)] for id in tag_ids))
+        recipes_bulk_created.send(
+            sender=Recipe,
+            recipes=[recipe],
+            usages=rows,
+            ingredients=new_ingredients,
+            measures=new_measures,
+        )
         return recipe
 
     class Meta:
@@ -176,3 +289,12 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             "fats",
             "carbs",
         ]
+
+
+class RecipeImportSerializer(RecipeCreateSerializer):
+    """Validates bulk import records, whose author is set by the importer"""
+
+    class Meta(RecipeCreateSerializer.Meta):
+        fields = [
+            field for field in RecipeCreateSerializer.Meta.fields if field != "author"
+        ]
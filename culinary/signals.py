@@ -0,0 +1,291 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from culinary.autocomplete import ingredient_names, measure_names
+from culinary.conversions import conversion_table
+from culinary.models import (
+    Fridge,
+    Ingredient,
+    IngredientUsage,
+    Measure,
+    Recipe,
+    RecipeDocument,
+    UtensilConversion,
+)
+from tags.models import Tag, TagCategory
+from culinary.search import recipe_index
+
+# bulk_create() skips post_save, so writers that bulk insert recipes send
+# this with the recipes, usages and new ingredients and measures they wrote
+recipes_bulk_created = Signal()
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, created, **kwargs):
+    if created:
+        pk = instance.pk
+        transaction.on_commit(lambda: recipe_index.add_recipe(pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: recipe_index.remove_recipe(pk))
+
+
+@receiver(post_save, sender=IngredientUsage)
+def index_usage(sender, instance, **kwargs):
+    pk, recipe_id, ingredient_id = (
+        instance.pk,
+        instance.recipe_id,
+        instance.ingredient_id,
+    )
+    transaction.on_commit(lambda: recipe_index.save_usage(pk, recipe_id, ingredient_id))
+
+
+@receiver(post_delete, sender=IngredientUsage)
+def unindex_usage(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: recipe_index.delete_usage(pk))
+
+
+@receiver(post_save, sender=Ingredient)
+def index_ingredient_category(sender, instance, **kwargs):
+    pk, category = instance.pk, instance.category
+    transaction.on_commit(lambda: recipe_index.set_category(pk, category))
+
+
+@receiver(recipes_bulk_created)
+def index_bulk_recipes(sender, recipes, usages, **kwargs):
+    if kwargs.get("ingredients"):
+        transaction.on_commit(ingredient_names.invalidate)
+    if kwargs.get("measures"):
+        transaction.on_commit(measure_names.invalidate)
+
+    recipe_ids = [recipe.pk for recipe in recipes]
+    rows = [(usage.pk, usage.recipe_id, usage.ingredient_id) for usage in usages]
+
+    def index():
+        if None in recipe_ids or any(pk is None for pk, _, _ in rows):
+            # backend didn't return primary keys, rebuild on next search
+            recipe_index.clear()
+            return
+        for recipe_id in recipe_ids:
+            recipe_index.add_recipe(recipe_id)
+        for row in rows:
+            recipe_index.save_usage(*row)
+
+    transaction.on_commit(index)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_names(sender, **kwargs):
+    transaction.on_commit(ingredient_names.invalidate)
+
+
+@receiver(post_save, sender=Measure)
+@receiver(post_delete, sender=Measure)
+def invalidate_measure_names(sender, **kwargs):
+    transaction.on_commit(measure_names.invalidate)
+
+
+@receiver(post_save, sender=UtensilConversion)
+@receiver(post_delete, sender=UtensilConversion)
+def invalidate_conversion_table(sender, **kwargs):
+    transaction.on_commit(conversion_table.invalidate)
+
+
+def touch_recipes(**filters):
+    """Bump updated_at of the recipes matching `filters`, whose rendered
+    form depends on the row that just changed"""
+    recipes = Recipe.objects.filter(**filters)
+    if settings.RECIPE_DOCUMENTS:
+        # collected now: relations a pre_delete touches are gone on commit
+        rebuild_documents(set(recipes.values_list("pk", flat=True)))
+    recipes.update(updated_at=timezone.now())
+
+
+def touch_favorite_recipes(**filters):
+    """touch_recipes() for favorite changes: documents leave the per-user
+    flag out, so up to date ones move to the new version unrendered"""
+    now = timezone.now()
+    recipes = Recipe.objects.filter(**filters)
+    if settings.RECIPE_DOCUMENTS:
+        fresh = recipes.filter(document__version=F("updated_at"))
+        RecipeDocument.objects.filter(
+            recipe_id__in=list(fresh.values_list("pk", flat=True))
+        ).update(version=now)
+    recipes.update(updated_at=now)
+
+
+def touch_fridges(**filters):
+    Fridge.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=IngredientUsage)
+@receiver(post_delete, sender=IngredientUsage)
+def touch_usage_recipe(sender, instance, **kwargs):
+    touch_recipes(pk=instance.recipe_id)
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_dependants(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        touch_recipes(ingredientusage__ingredient_id=instance.pk)
+        touch_fridges(shelf__id=instance.pk)
+
+
+@receiver(post_save, sender=Measure)
+def touch_measure_dependants(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        touch_recipes(ingredientusage__measure_id=instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+def touch_tag_dependants(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        touch_recipes(tags__id=instance.pk)
+
+
+@receiver(post_save, sender=TagCategory)
+def touch_tag_category_dependants(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        touch_recipes(tags__category_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Tag)
+def touch_deleted_tag_dependants(sender, instance, **kwargs):
+    touch_recipes(tags__id=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, raw, update_fields, **kwargs):
+    # logins save last_login only, which recipes don't show
+    if created or raw or (update_fields and "username" not in update_fields):
+        return
+    touch_recipes(author_id=instance.pk)
+
+
+def _touch_m2m(touch, field, instance, action, reverse, pk_set):
+    if not reverse and action in ("post_add", "post_remove", "post_clear"):
+        touch(pk=instance.pk)
+    elif reverse and action in ("post_add", "post_remove"):
+        touch(pk__in=pk_set)
+    elif reverse and action == "pre_clear":
+        touch(**{f"{field}__id": instance.pk})
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    _touch_m2m(touch_recipes, "tags", instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Recipe.favorites.through)
+def touch_recipe_favorites(sender, instance, action, reverse, pk_set, **kwargs):
+    _touch_m2m(touch_favorite_recipes, "favorites", instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Fridge.shelf.through)
+def touch_fridge_shelf(sender, instance, action, reverse, pk_set, **kwargs):
+    _touch_m2m(touch_fridges, "shelf", instance, action, reverse, pk_set)
+
+
+# writes touching more recipes have their documents rebuilt in batches by
+# culinary.documents.document_queue instead of in their own request
+INLINE_DOCUMENT_REBUILDS = 20
+
+
+def rebuild_documents(recipe_ids):
+    """Have culinary.documents rebuild the documents of the given recipes
+    once the current transaction commits"""
+    if not settings.RECIPE_DOCUMENTS:
+        return
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+
+    from culinary.documents import document_queue, refresh_documents
+
+    if len(recipe_ids) <= INLINE_DOCUMENT_REBUILDS:
+        transaction.on_commit(lambda: refresh_documents(recipe_ids))
+    else:
+        transaction.on_commit(lambda: document_queue.add(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+def rebuild_recipe_document(sender, instance, raw, **kwargs):
+    if not raw:
+        rebuild_documents([instance.pk])
+
+
+@receiver(recipes_bulk_created)
+def rebuild_bulk_documents(sender, recipes, **kwargs):
+    rebuild_documents([recipe.pk for recipe in recipes if recipe.pk is not None])
+
+
+def queue_nutrition(**changes):
+    """Have culinary.nutrition recompute what `changes` affect once the
+    current transaction commits"""
+    if settings.NUTRITION_PROPAGATION:
+        from culinary.nutrition import nutrition_queue
+
+        transaction.on_commit(lambda: nutrition_queue.add(**changes))
+
+
+@receiver(post_save, sender=Ingredient)
+def queue_ingredient_nutrition(sender, instance, created, raw, update_fields, **kwargs):
+    # new ingredients aren't used by any recipe yet
+    if not settings.NUTRITION_PROPAGATION or created or raw:
+        return
+
+    from culinary.nutrition import NUTRIENTS
+
+    if update_fields and not set(update_fields) & set(NUTRIENTS):
+        return
+    queue_nutrition(ingredients=[instance.pk])
+
+
+@receiver(pre_save, sender=UtensilConversion)
+def remember_conversion_key(sender, instance, raw, **kwargs):
+    # changing the measure or ingredient also affects the old pair's recipes
+    if settings.NUTRITION_PROPAGATION and not raw and instance.pk is not None:
+        instance._stored_key = (
+            UtensilConversion.objects.filter(pk=instance.pk)
+            .values_list("utensil_id", "ingredient_id")
+            .first()
+        )
+
+
+@receiver(post_save, sender=UtensilConversion)
+@receiver(post_delete, sender=UtensilConversion)
+def queue_conversion_nutrition(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    keys = {(instance.utensil_id, instance.ingredient_id)}
+    if getattr(instance, "_stored_key", None):
+        keys.add(instance._stored_key)
+    queue_nutrition(conversions=keys)
+
+
+@receiver(post_save, sender=IngredientUsage)
+@receiver(post_delete, sender=IngredientUsage)
+def queue_usage_nutrition(sender, instance, **kwargs):
+    if not kwargs.get("raw"):
+        queue_nutrition(recipes=[instance.recipe_id])
+
+
+@receiver(recipes_bulk_created)
+def queue_bulk_recipes_nutrition(sender, recipes, **kwargs):
+    queue_nutrition(recipes=[recipe.pk for recipe in recipes if recipe.pk])
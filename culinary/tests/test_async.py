@@ -0,0 +1,139 @@
+from unittest import mock
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.urls import resolve, reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from account.authentication import token_cache
+from culinary.benchmark import read_views
+from culinary.views.ingredient_views import IngredientList
+from culinary.views.recipe_views import RecipeDetail, RecipeList
+from tags.cache import invalidate_catalogue
+from tags.views import TagViewSet
+from test.base_test import TestUsers, get_links
+
+COMPARED_HEADERS = ("Content-Type", "Link", "ETag", "Last-Modified", "Vary")
+
+
+class TestAsyncReadViews(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        token_cache.clear()
+        invalidate_catalogue()
+
+    def get_async(self, path, token=None, **headers):
+        if token:
+            headers["Authorization"] = token
+        with read_views(True):
+            self.assertTrue(hasattr(resolve(urlsplit(path).path).func, "async_view"))
+            return async_to_sync(self.request_async)("get", path, headers=headers)
+
+    async def request_async(self, method, path, *args, **kwargs):
+        return await getattr(self.async_client, method)(path, *args, **kwargs)
+
+    def assert_same(self, path, token=None):
+        """The async view answers `path` exactly as the sync one, without
+        falling back to it"""
+        headers = {"HTTP_AUTHORIZATION": token} if token else {}
+        expected = self.client.get(path, **headers)
+        # the tags catalogue rendered again, not from the cache
+        invalidate_catalogue()
+
+        sync = mock.Mock(side_effect=AssertionError("served by the sync view"))
+        with mock.patch.object(RecipeList, "list", sync), mock.patch.object(
+            RecipeDetail, "retrieve", sync
+        ), mock.patch.object(IngredientList, "list", sync), mock.patch.object(
+            TagViewSet, "list", sync
+        ), mock.patch.object(
+            TagViewSet, "retrieve", sync
+        ):
+            response = self.get_async(path, token)
+
+        self.assertEqual(response.status_code, expected.status_code, path)
+        self.assertEqual(response.content, expected.content, path)
+        for header in COMPARED_HEADERS:
+            self.assertEqual(response.get(header), expected.get(header), header)
+        return response
+
+    def test_recipe_list(self):
+        recipes = reverse("recipe-list")
+        for query in (
+            "",
+            "?expanded=false",
+            "?fields=id,title",
+            "?tags=1,2",
+            "?ingredients=1,2,3",
+            "?caloriesAbove=100",
+            "?q=pasta",
+            "?pageSize=1",
+        ):
+            self.assert_same(recipes + query)
+            self.assert_same(recipes + query, TestUsers.get_user1_token())
+
+        self.assert_same(recipes + "?fridgeId=2", TestUsers.get_user1_token())
+        self.assert_same(
+            recipes + "?fridgeId=2&absentLimit=2", TestUsers.get_user1_token()
+        )
+
+    def test_recipe_list_pages(self):
+        response = self.assert_same(reverse("recipe-list") + "?pageSize=1")
+        next_page = get_links(response)["next"]
+        response = self.assert_same(next_page)
+        self.assert_same(get_links(response)["previous"])
+
+    def test_recipe_detail(self):
+        self.assert_same(reverse("recipe-detail", args=[1]))
+        self.assert_same(
+            reverse("recipe-detail", args=[1]), TestUsers.get_staff_token()
+        )
+        self.assert_same(reverse("recipe-detail", args=[999]))
+
+    def test_ingredient_list(self):
+        self.assert_same(reverse("ingredients-list"))
+        self.assert_same(reverse("ingredients-list"), TestUsers.get_user1_token())
+        self.assert_same(reverse("ingredients-list"), TestUsers.get_staff_token())
+        self.assert_same(reverse("ingredients-list") + "?name=sugar")
+
+    def test_tags(self):
+        self.assert_same(reverse("tags-list"))
+        self.assert_same(reverse("tags-detail", args=[1]))
+        self.assert_same(reverse("tags-detail", args=[999]))
+        # the router's format suffix routes
+        self.assert_same(reverse("tags-list", kwargs={"format": "json"}))
+        self.assert_same(reverse("tags-detail", kwargs={"pk": 1, "format": "json"}))
+
+        # from the cache
+        path = reverse("tags-list")
+        first = self.get_async(path)
+        with mock.patch.object(TagViewSet, "get_queryset", side_effect=AssertionError):
+            self.assertEqual(self.get_async(path).content, first.content)
+
+    def test_invalid_token(self):
+        self.assert_same(reverse("recipe-list"), "Token invalid")
+
+    def test_conditional_requests_fall_back(self):
+        path = reverse("recipe-detail", args=[1])
+        etag = self.client.get(path)["ETag"]
+
+        response = self.get_async(path, **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_other_renderers_fall_back(self):
+        response = self.get_async(reverse("recipe-list") + "?format=api")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("text/html", response["Content-Type"])
+
+    def test_writes_stay_sync(self):
+        with read_views(True):
+            response = async_to_sync(self.request_async)(
+                "put",
+                reverse("tags-detail", args=[1]),
+                {"label": "renamed", "category": 1},
+                content_type="application/json",
+                headers={"Authorization": TestUsers.get_staff_token()},
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["label"], "renamed")
@@ -0,0 +1,71 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from culinary.autocomplete import ingredient_names, measure_names
+from culinary.models import Ingredient, Recipe
+from test.base_test import TestUsers
+from test.factories import IngredientFactory, IngredientUsageFactory, MeasureFactory
+
+
+class TestAutocomplete(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        ingredient_names.invalidate()
+        measure_names.invalidate()
+
+        self.tomato = IngredientFactory.create(name="Tomato", user_id=1)
+        self.cherry = IngredientFactory.create(name="Cherry tomato", user_id=1)
+        self.paste = IngredientFactory.create(name="Tomato paste", user_id=1)
+        self.private = IngredientFactory.create(name="Tomato sauce", user_id=2)
+        self.sundried = IngredientFactory.create(name="Sundried tomatoes", user_id=3)
+
+        recipe = Recipe.objects.get(pk=1)
+        for _ in range(3):
+            IngredientUsageFactory.create(
+                ingredient=self.paste, recipe=recipe, measure_id=1
+            )
+
+    def _names(self, path, params="", token=None):
+        kwargs = {"HTTP_AUTHORIZATION": token} if token else {}
+        response = self.client.get(reverse(path) + params, **kwargs)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["name"] for item in response.json()]
+
+    def test_ranking(self):
+        names = self._names("ingredients-autocomplete", "?q=tom")
+        # prefix matches by popularity, then word prefix matches
+        self.assertEqual(names, ["Tomato paste", "Tomato", "Cherry tomato"])
+
+    def test_visibility(self):
+        token = TestUsers.get_user1_token()
+        names = self._names("ingredients-autocomplete", "?q=tomato sa", token)
+        self.assertEqual(names, ["Tomato sauce"])
+
+        token = TestUsers.get_user2_token()
+        names = self._names("ingredients-autocomplete", "?q=toma", token)
+        self.assertNotIn("Tomato sauce", names)
+        self.assertIn("Sundried tomatoes", names)
+
+        token = TestUsers.get_staff_token()
+        names = self._names("ingredients-autocomplete", "?q=toma", token)
+        self.assertEqual(len(names), 5)
+
+    def test_substring_and_limit(self):
+        names = self._names("ingredients-autocomplete", "?q=mato&limit=2")
+        self.assertEqual(names, ["Tomato paste", "Cherry tomato"])
+
+    def test_invalidation(self):
+        self.assertEqual(self._names("measures-autocomplete", "?q=ounce"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MeasureFactory.create(name="ounce")
+        self.assertEqual(self._names("measures-autocomplete", "?q=oun"), ["ounce"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.filter(pk=self.tomato.pk).delete()
+        self.assertNotIn("Tomato", self._names("ingredients-autocomplete", "?q=tom"))
+
+    def test_empty_query(self):
+        self.assertEqual(self._names("ingredients-autocomplete", "?q="), [])
@@ -1,7 +1,15 @@
+import json
+import random
+from collections import Counter
+from tempfile import NamedTemporaryFile
+from django.contrib.auth.models import User
 from django.core.management import call_command
+from django.db.models import Count
 from django.test import TestCase
 from io import StringIO
 from contextlib import redirect_stdout
+from culinary import benchmark, generator
+from culinary.models import Ingredient, Recipe
 
 
 class TestCSVLoader(TestCase):
@@ -12,3 +20,108 @@ class TestCSVLoader(TestCase):
             call_command(command, stdout=out)
             expected = "Import complete"
             self.assertIn(expected, out.getvalue())
+
+
+class TestRecipeImporter(TestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def test_command_output(self):
+        record = {
+            "title": "imported recipe",
+            "portions": 2,
+            "total_time": "0:30:00",
+            "instructions": "Recipe steps",
+            "ingredients": [
+                {"amount": 1, "ingredient": {"id": 1}, "measure": {"id": 1}}
+            ],
+            "tags": [1],
+        }
+        with NamedTemporaryFile("w", suffix=".ndjson") as file:
+            file.write(json.dumps(record) + "\n" + json.dumps({"title": "bad"}) + "\n")
+            file.flush()
+
+            out = StringIO()
+            with out, redirect_stdout(out):
+                call_command("import_recipes", file.name, author="user 0", stdout=out)
+                self.assertIn("Created 1 recipes, 1 failed", out.getvalue())
+                self.assertIn("Import complete", out.getvalue())
+
+        self.assertTrue(Recipe.objects.filter(title="imported recipe").exists())
+
+
+class TestNutritionRecompute(TestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def test_command_output(self):
+        Ingredient.objects.filter(pk=1).update(calories=50)
+
+        out = StringIO()
+        with out, redirect_stdout(out):
+            call_command("recompute_nutrition", stdout=out)
+            output = out.getvalue()
+
+        self.assertIn(
+            "no conversion of test measure 0 to grams for test ingredient 1", output
+        )
+        self.assertIn("Updated 0 recipes, 3 skipped for missing conversions", output)
+
+
+class TestBenchmark(TestCase):
+    def test_cases_run(self):
+        benchmark.seed(50, batch_size=20)
+        self.assertEqual(Recipe.objects.count(), 50)
+
+        selected = benchmark.cases()
+        results = benchmark.run(selected, repeat=2, warmup=0)
+        self.assertEqual(list(results), [case.name for case in selected])
+        # writes are rolled back
+        self.assertEqual(Recipe.objects.count(), 50)
+
+    def test_compare(self):
+        baseline = {"list": {"p50": 5, "p95": 10, "queries": 3}}
+        results = {"list": {"p50": 6, "p95": 12, "queries": 3}}
+        self.assertEqual(benchmark.compare(results, baseline), [])
+
+        results = {"list": {"p50": 6, "p95": 13, "queries": 4}}
+        self.assertEqual(
+            benchmark.compare(results, baseline),
+            ["list: 4 queries, was 3", "list: p95 13.0ms, was 10.0ms"],
+        )
+
+
+class TestDataGenerator(TestCase):
+    def test_command_output(self):
+        out = StringIO()
+        with out, redirect_stdout(out):
+            call_command(
+                "generate_data",
+                users=3,
+                recipes=25,
+                ingredients=20,
+                usages_per_recipe=4,
+                batch_size=10,
+                stdout=out,
+            )
+            self.assertIn(
+                "Created 3 users, 20 ingredients and 25 recipes", out.getvalue()
+            )
+
+        self.assertEqual(Recipe.objects.count(), 25)
+        self.assertEqual(Ingredient.objects.count(), 20)
+        usages = Recipe.objects.annotate(usages=Count("ingredientusage"))
+        for recipe in usages:
+            self.assertTrue(2 <= recipe.usages <= 6)
+        self.assertTrue(User.objects.get(username="generated user 0").is_staff)
+
+    def test_zipf_popularity(self):
+        picker = generator.ZipfPicker(range(100), 1.1, random.Random(0))
+        rng = random.Random(0)
+        counts = Counter()
+        for _ in range(2000):
+            sample = picker.sample(rng, 5)
+            self.assertEqual(len(set(sample)), 5)
+            counts.update(sample)
+
+        most_popular = picker.ids[0]
+        self.assertEqual(counts.most_common(1)[0][0], most_popular)
+        self.assertGreater(counts[most_popular], 10 * counts[picker.ids[-1]])
@@ -0,0 +1,86 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from culinary.conversions import conversion_table
+from culinary.models import Ingredient, Measure, UtensilConversion
+from test.factories import ConversionFactory
+
+
+class TestConversionTable(TestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        conversion_table.invalidate()
+
+    def test_lookup(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(conversion_table.grams(1, 1, 1), 10.5)
+            self.assertEqual(conversion_table.grams(2, 2, 2), 241.4)
+            self.assertIsNone(conversion_table.grams(1, 2, 1))
+
+    def test_invalidated_on_change(self):
+        conversion_table.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            ConversionFactory.create(
+                utensil=Measure.objects.get(pk=1),
+                ingredient=Ingredient.objects.get(pk=2),
+                standard_value=5.0,
+            )
+        self.assertEqual(conversion_table.grams(1, 2, 3), 15.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UtensilConversion.objects.get(pk=1).delete()
+        self.assertIsNone(conversion_table.grams(1, 1, 1))
+
+    def test_detail_queries(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("conversion-detail", args=[1, 1]))
+        self.assertEqual(response.json()["utensil"]["id"], 1)
+
+        # read from the database, not the table
+        conversion_table.build()
+        UtensilConversion.objects.filter(pk=1).update(utensil_id=2, ingredient_id=3)
+        response = self.client.get(reverse("conversion-detail", args=[2, 3]))
+        self.assertEqual(response.json()["id"], 1)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("conversion-detail", args=[1, 1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestConversionBatch(TestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        conversion_table.invalidate()
+
+    def _post(self, data):
+        return self.client.post(
+            reverse("conversion-batch"), data=data, content_type="application/json"
+        )
+
+    def test_batch(self):
+        lines = [
+            {"ingredient": 1, "measure": 1, "amount": 2},
+            {"ingredient": 3, "measure": 3, "amount": 0.5},
+            {"ingredient": 1, "measure": 3, "amount": 1},
+        ]
+        with self.assertNumQueries(1):
+            response = self._post(lines)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [line["grams"] for line in response.json()], [21.0, 22.15, None]
+        )
+        self.assertEqual(response.json()[0]["ingredient"], 1)
+
+    def test_bad_data(self):
+        response = self._post([{"ingredient": "a", "measure": 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self._post({"ingredient": 1, "measure": 1, "amount": 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        lines = [{"ingredient": 1, "measure": 1, "amount": 1}] * 1001
+        response = self._post(lines)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
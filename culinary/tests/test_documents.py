@@ -0,0 +1,182 @@
+import json
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from account.authentication import token_cache
+from culinary.documents import document_queue, refresh_documents
+from culinary.models import Ingredient, Recipe, RecipeDocument
+from tags.models import Tag
+from test.base_test import TestUsers, get_links
+
+
+class TestRecipeDocuments(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        token_cache.clear()
+        document_queue.clear()
+        self.addCleanup(document_queue.clear)
+        Recipe.objects.filter(pk=1).update(thumbnail="recipe.png")
+        Recipe.objects.get(pk=2).favorites.add(2)
+
+    def _get(self, url, token=None, documents=True):
+        headers = {"HTTP_AUTHORIZATION": token} if token else {}
+        with self.settings(RECIPE_DOCUMENTS=documents):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def _refresh(self):
+        refresh_documents(Recipe.objects.values_list("pk", flat=True))
+
+    def _assert_same(self, url, token=None):
+        expected = self._get(url, token, documents=False)
+        response = self._get(url, token)
+        self.assertEqual(response.json(), expected.json())
+        return response
+
+    def test_same_output(self):
+        self._refresh()
+        for token in (None, TestUsers.get_user1_token()):
+            self._assert_same(reverse("recipe-list"), token)
+            self._assert_same(reverse("recipe-list") + "?tags=1,2", token)
+            self._assert_same(reverse("recipe-detail", args=[1]), token)
+            self._assert_same(reverse("recipe-detail", args=[2]), token)
+
+        self.assertEqual(RecipeDocument.objects.count(), 3)
+
+    def test_missing_documents(self):
+        for token in (None, TestUsers.get_user1_token()):
+            self._assert_same(reverse("recipe-list"), token)
+            self._assert_same(reverse("recipe-detail", args=[1]), token)
+
+        self.assertFalse(RecipeDocument.objects.exists())
+
+    def test_stale_documents_not_served(self):
+        self._refresh()
+        body = RecipeDocument.objects.get(recipe_id=1).body
+        Recipe.objects.filter(pk=1).update(
+            title="changed elsewhere", updated_at=timezone.now()
+        )
+
+        response = self._assert_same(reverse("recipe-detail", args=[1]))
+        self.assertEqual(response.json()["title"], "changed elsewhere")
+        self.assertEqual(RecipeDocument.objects.get(recipe_id=1).body, body)
+
+    def test_pagination(self):
+        url = reverse("recipe-list") + "?pageSize=2"
+        response = self._assert_same(url)
+        self.assertEqual(len(response.json()), 2)
+
+        self._assert_same(get_links(response)["next"])
+
+    def test_compact_list_not_affected(self):
+        url = reverse("recipe-list") + "?expanded=false"
+        response = self._get(url)
+        self.assertNotIn("ingredients", response.json()[0])
+        self.assertFalse(RecipeDocument.objects.exists())
+
+    def test_stored_documents_used(self):
+        url = reverse("recipe-list")
+        self._refresh()
+
+        with self.assertNumQueries(1):
+            self._get(url)
+        with self.assertNumQueries(2):
+            self._get(url, TestUsers.get_user1_token())
+
+    def test_rebuilt_after_changes(self):
+        url = reverse("recipe-detail", args=[1])
+        self._refresh()
+
+        with self.settings(RECIPE_DOCUMENTS=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                ingredient = Ingredient.objects.get(pk=1)
+                ingredient.name = "renamed ingredient"
+                ingredient.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                Recipe.objects.get(pk=1).tags.remove(1)
+
+        recipe = Recipe.objects.get(pk=1)
+        self.assertEqual(recipe.document.version, recipe.updated_at)
+        with self.assertNumQueries(1):
+            self._get(url)
+        response = self._assert_same(url)
+        names = [
+            usage["ingredient"]["name"] for usage in response.json()["ingredients"]
+        ]
+        self.assertIn("renamed ingredient", names)
+        self.assertNotIn(1, [tag["id"] for tag in response.json()["tags"]])
+
+    def test_rebuilt_on_save(self):
+        recipe = Recipe.objects.get(pk=2)
+        with self.settings(RECIPE_DOCUMENTS=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe.title = "saved"
+                recipe.save()
+
+        document = RecipeDocument.objects.get(recipe_id=2)
+        self.assertEqual(json.loads(document.body)["title"], "saved")
+        self.assertEqual(document.version, Recipe.objects.get(pk=2).updated_at)
+        self.assertEqual(RecipeDocument.objects.count(), 1)
+
+    @override_settings(RECIPE_DOCUMENTS=True, RECIPE_DOCUMENTS_DEBOUNCE=60)
+    def test_large_rebuilds_deferred(self):
+        self._refresh()
+        tagged = Recipe.objects.filter(tags__id=1)
+        self.assertTrue(tagged.exists())
+
+        with mock.patch("culinary.signals.INLINE_DOCUMENT_REBUILDS", 0):
+            with self.captureOnCommitCallbacks(execute=True):
+                tag = Tag.objects.get(pk=1)
+                tag.label = "renamed tag"
+                tag.save()
+
+        self.assertEqual(
+            document_queue.recipes, set(tagged.values_list("pk", flat=True))
+        )
+        # served from the serializer meanwhile
+        self._assert_same(reverse("recipe-detail", args=[1]))
+        self.assertNotIn("renamed tag", RecipeDocument.objects.get(recipe_id=1).body)
+
+        document_queue.flush()
+        self.assertFalse(document_queue.pending())
+        for recipe in tagged:
+            self.assertEqual(recipe.document.version, recipe.updated_at)
+            self.assertIn("renamed tag", recipe.document.body)
+
+    @override_settings(RECIPE_DOCUMENTS=True)
+    def test_favorites_not_rebuilt(self):
+        self._refresh()
+        body = RecipeDocument.objects.get(recipe_id=1).body
+
+        with mock.patch("culinary.documents.render_documents") as render:
+            with self.captureOnCommitCallbacks(execute=True):
+                Recipe.objects.get(pk=1).favorites.add(2)
+        render.assert_not_called()
+
+        recipe = Recipe.objects.get(pk=1)
+        self.assertEqual(recipe.document.version, recipe.updated_at)
+        self.assertEqual(recipe.document.body, body)
+        response = self._get(
+            reverse("recipe-detail", args=[1]), TestUsers.get_user1_token()
+        )
+        self.assertTrue(response.json()["favorite"])
+
+    def test_not_rebuilt_when_off(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(pk=1).tags.remove(1)
+        self.assertFalse(RecipeDocument.objects.exists())
+
+    @override_settings(RECIPE_DOCUMENTS=True)
+    def test_conditional_get(self):
+        url = reverse("recipe-detail", args=[1])
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
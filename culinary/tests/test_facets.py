@@ -0,0 +1,163 @@
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from account.authentication import token_cache
+from culinary.models import Ingredient, Recipe
+from test.base_test import TestUsers
+
+
+class CountedQueries:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class TestRecipeFacets(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        token_cache.clear()
+        for pk, calories in ((1, 150), (2, 450), (3, None)):
+            Recipe.objects.filter(pk=pk).update(calories=calories)
+
+    def expected(self, recipes):
+        """Facets counted in Python"""
+        tags, categories, ingredients = {}, {}, {}
+        for recipe in recipes:
+            for tag in recipe.tags.all():
+                tags[tag.pk, tag.label] = tags.get((tag.pk, tag.label), 0) + 1
+            for category in {
+                (tag.category.pk, tag.category.name) for tag in recipe.tags.all()
+            }:
+                categories[category] = categories.get(category, 0) + 1
+            for category in {
+                usage.ingredient.category for usage in recipe.ingredientusage_set.all()
+            }:
+                ingredients[category] = ingredients.get(category, 0) + 1
+
+        def bucket(low, high):
+            return sum(
+                1
+                for recipe in recipes
+                if recipe.calories is not None
+                and recipe.calories >= low
+                and (high is None or recipe.calories < high)
+            )
+
+        return {
+            "count": len(recipes),
+            "tags": [
+                {"id": id, "label": label, "count": count}
+                for (id, label), count in sorted(
+                    tags.items(), key=lambda item: (-item[1], item[0][1])
+                )
+            ],
+            "tag_categories": [
+                {"id": id, "name": name, "count": count}
+                for (id, name), count in sorted(
+                    categories.items(), key=lambda item: (-item[1], item[0][1])
+                )
+            ],
+            "ingredient_categories": [
+                {"category": category, "count": count}
+                for category, count in sorted(
+                    ingredients.items(), key=lambda item: (-item[1], item[0])
+                )
+            ],
+            "calories": [
+                {"from": 0, "to": 200, "count": bucket(0, 200)},
+                {"from": 200, "to": 400, "count": bucket(200, 400)},
+                {"from": 400, "to": 600, "count": bucket(400, 600)},
+                {"from": 600, "to": 800, "count": bucket(600, 800)},
+                {"from": 800, "to": None, "count": bucket(800, None)},
+            ],
+        }
+
+    def get(self, query, token=None):
+        headers = {"HTTP_AUTHORIZATION": token} if token else {}
+        response = self.client.get(reverse("recipe-list") + query, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_all_recipes(self):
+        response = self.get("?facets=true")
+        self.assertEqual(
+            response.json()["facets"], self.expected(list(Recipe.objects.all()))
+        )
+        self.assertEqual(
+            response.json()["results"], self.get("").json(), "same page as without"
+        )
+
+    def test_filtered(self):
+        response = self.get("?tags=1,2&facets=true")
+        recipes = list(Recipe.objects.filter(pk__in=[1, 2]))
+        self.assertEqual(response.json()["facets"], self.expected(recipes))
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_tag_filter_counts_every_tag(self):
+        facets = self.get("?tags=1&facets=true").json()["facets"]
+        self.assertEqual(
+            {tag["id"] for tag in facets["tags"]},
+            set(Recipe.objects.get(pk=1).tags.values_list("id", flat=True)),
+        )
+
+    def test_ingredients_filter(self):
+        ingredient = Recipe.objects.get(pk=1).ingredientusage_set.first().ingredient
+        facets = self.get(f"?ingredients={ingredient.pk}&facets=true").json()["facets"]
+        recipes = list(Recipe.objects.filter(ingredientusage__ingredient=ingredient))
+        self.assertEqual(facets, self.expected(recipes))
+
+    def test_calories_filter(self):
+        facets = self.get("?caloriesAbove=100&facets=true").json()["facets"]
+        self.assertEqual(facets["count"], 2)
+        self.assertEqual(
+            [bucket["count"] for bucket in facets["calories"]], [1, 0, 1, 0, 0]
+        )
+
+    def test_search(self):
+        facets = self.get("?q=recipe&facets=true").json()["facets"]
+        self.assertEqual(facets["count"], 3)
+
+    @override_settings(RECIPE_SEARCH_INDEX=False)
+    def test_absent_limit(self):
+        ids = Ingredient.objects.values_list("id", flat=True)
+        query = "?ingredients=" + ",".join(map(str, ids)) + "&absentLimit=0&facets=true"
+        facets = self.get(query).json()["facets"]
+        self.assertEqual(facets, self.expected(list(Recipe.objects.all())))
+
+    def test_no_matches(self):
+        facets = self.get("?title=missing&facets=true").json()["facets"]
+        self.assertEqual(facets["count"], 0)
+        self.assertEqual(facets["tags"], [])
+        self.assertTrue(all(bucket["count"] == 0 for bucket in facets["calories"]))
+
+    def test_without_facets(self):
+        self.assertIsInstance(self.get("").json(), list)
+        self.assertIsInstance(self.get("?facets=false").json(), list)
+
+    def test_constant_queries(self):
+        def count(query):
+            counted = CountedQueries()
+            with connection.execute_wrapper(counted):
+                self.get(query)
+            return counted.count
+
+        for query in ("?", "?tags=1,2&", "?tags=1&caloriesAbove=100&"):
+            self.assertEqual(count(query + "facets=true"), count(query) + 4, query)
+
+    def test_documents_and_values(self):
+        expected = self.get("?facets=true").json()
+        with override_settings(RECIPE_DOCUMENTS=True):
+            self.assertEqual(self.get("?facets=true").json(), expected)
+        with override_settings(VALUES_SERIALIZATION=True):
+            self.assertEqual(self.get("?facets=true").json(), expected)
+
+    def test_authenticated(self):
+        response = self.get("?facets=true", TestUsers.get_user1_token())
+        self.assertEqual(response.json()["facets"]["count"], 3)
@@ -0,0 +1,131 @@
+import re
+import threading
+
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from account.authentication import token_cache
+from foodinfo.metrics import Sample, metrics
+from test.base_test import TestUsers
+
+
+def sample_value(text, name, **labels):
+    """The value of the sample `name` with `labels` in exposition `text`"""
+    for line in text.splitlines():
+        match = re.fullmatch(r"(\w+)(?:\{(.*)\})? (\S+)", line)
+        if not match or match[1] != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match[2] or ""))
+        if found == {key: str(value) for key, value in labels.items()}:
+            return float(match[3])
+    return None
+
+
+class TestMetrics(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        metrics.clear()
+        token_cache.clear()
+
+    def scrape(self):
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION=TestUsers.get_staff_token()
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return response.content.decode("utf-8")
+
+    def test_staff_only(self):
+        url = reverse("metrics")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(url, HTTP_AUTHORIZATION=TestUsers.get_user1_token())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_request_recorded(self):
+        response = self.client.get(reverse("recipe-detail", kwargs={"pk": 1}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.get(reverse("recipe-detail", kwargs={"pk": 1000}))
+
+        text = self.scrape()
+        labels = {"route": "/api/recipes/<int:pk>", "method": "GET"}
+        self.assertEqual(
+            sample_value(text, "foodinfo_requests_total", status=200, **labels), 1
+        )
+        self.assertEqual(
+            sample_value(text, "foodinfo_requests_total", status=404, **labels), 1
+        )
+        self.assertEqual(
+            sample_value(text, "foodinfo_request_duration_seconds_count", **labels), 2
+        )
+        self.assertEqual(
+            sample_value(
+                text, "foodinfo_request_duration_seconds_bucket", le="+Inf", **labels
+            ),
+            2,
+        )
+        # the recipe with its usages and tags, then the missing one
+        self.assertEqual(sample_value(text, "foodinfo_db_queries_sum", **labels), 4)
+        self.assertGreater(
+            sample_value(text, "foodinfo_serializer_seconds_total", **labels), 0
+        )
+        self.assertGreater(
+            sample_value(text, "foodinfo_response_bytes_total", **labels),
+            len(response.content),
+        )
+
+    def test_streamed_size(self):
+        response = self.client.get(
+            reverse("recipe-list") + "?stream=ndjson",
+            HTTP_AUTHORIZATION=TestUsers.get_staff_token(),
+        )
+        size = len(b"".join(response.streaming_content))
+
+        text = self.scrape()
+        labels = {"route": "/api/recipes/", "method": "GET"}
+        self.assertEqual(
+            sample_value(text, "foodinfo_response_bytes_total", **labels), size
+        )
+
+    def test_streamed_size_asgi(self):
+        async def stream():
+            response = await self.async_client.get(
+                reverse("recipe-list") + "?stream=ndjson",
+                headers={"Authorization": TestUsers.get_staff_token()},
+            )
+            self.assertTrue(response.is_async)
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        size = len(async_to_sync(stream)())
+
+        text = self.scrape()
+        labels = {"route": "/api/recipes/", "method": "GET"}
+        self.assertEqual(
+            sample_value(text, "foodinfo_response_bytes_total", **labels), size
+        )
+
+    def test_token_cache(self):
+        self.scrape()
+        text = self.scrape()
+        self.assertEqual(sample_value(text, "foodinfo_token_cache_hits_total"), 1)
+        self.assertEqual(sample_value(text, "foodinfo_token_cache_misses_total"), 1)
+        self.assertEqual(sample_value(text, "foodinfo_token_cache_entries"), 1)
+
+    def test_threads_merged(self):
+        def record():
+            metrics.record("/test", "GET", 200, 0.02, Sample(), 10)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        record()
+
+        stats = metrics.collect()["/test", "GET"]
+        self.assertEqual(stats.statuses, {200: 5})
+        self.assertEqual(stats.response_bytes, 50)
+        self.assertEqual(sum(stats.latency_buckets), 5)
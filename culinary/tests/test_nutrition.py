@@ -0,0 +1,204 @@
+import threading
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from culinary.models import (
+    Ingredient,
+    IngredientUsage,
+    Measure,
+    Recipe,
+    UtensilConversion,
+)
+from culinary.nutrition import (
+    compute_nutrition,
+    nutrition_queue,
+    recompute_nutrition,
+)
+from test.factories import ConversionFactory
+
+
+class TestNutrition(TestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        measure = Measure.objects.get(pk=1)
+        for i, ingredient in enumerate(Ingredient.objects.filter(pk__in=range(1, 6))):
+            ingredient.calories = 100.0 * (i + 1)
+            ingredient.proteins = 10.0
+            ingredient.fats = 2.0 * i
+            ingredient.carbs = None if i == 4 else 20.0
+            ingredient.save()
+            if ingredient.pk != 1:
+                ConversionFactory.create(
+                    utensil=measure, ingredient=ingredient, standard_value=5.0 * i
+                )
+
+    def _expected(self, recipe_id, nutrient):
+        total = grams = 0
+        for usage in IngredientUsage.objects.filter(recipe_id=recipe_id):
+            conversion = usage.ingredient.utensilconversion_set.get(
+                utensil=usage.measure
+            )
+            weight = usage.amount * conversion.standard_value
+            total += weight * getattr(usage.ingredient, nutrient) / 100
+            grams += weight
+        return total / grams * 100
+
+    def test_compute(self):
+        result = compute_nutrition()
+
+        self.assertEqual(list(result.recipe_ids), [1, 2, 3])
+        self.assertEqual(list(result.complete), [True, False, False])
+        self.assertAlmostEqual(result[1]["calories"], self._expected(1, "calories"))
+        self.assertAlmostEqual(result[1]["fats"], self._expected(1, "fats"))
+        # ingredient 5 has no carbs value
+        self.assertIsNone(result[1]["carbs"])
+
+    def test_missing_conversions(self):
+        result = compute_nutrition()
+
+        missing = {(usage.recipe_id, usage.ingredient_id) for usage in result.missing}
+        expected = set(
+            IngredientUsage.objects.filter(recipe_id__in=[2, 3]).values_list(
+                "recipe_id", "ingredient_id"
+            )
+        )
+        self.assertEqual(missing, expected)
+
+    def test_subset(self):
+        result = compute_nutrition(recipe_ids=[1])
+
+        self.assertEqual(list(result.recipe_ids), [1])
+        self.assertEqual(result.missing, [])
+        self.assertAlmostEqual(result[1]["proteins"], 10.0)
+
+    def test_recompute(self):
+        Recipe.objects.filter(pk=1).update(carbs=12.5)
+        before = Recipe.objects.get(pk=2)
+
+        result = recompute_nutrition()
+        self.assertEqual(result.updated, 1)
+
+        recipe = Recipe.objects.get(pk=1)
+        self.assertAlmostEqual(recipe.calories, self._expected(1, "calories"), 2)
+        self.assertEqual(recipe.proteins, 10.0)
+        # kept as entered, since an ingredient has no value
+        self.assertEqual(recipe.carbs, 12.5)
+        self.assertEqual(Recipe.objects.get(pk=2).updated_at, before.updated_at)
+
+        self.assertEqual(recompute_nutrition().updated, 0)
+
+    def test_dry_run(self):
+        result = recompute_nutrition(dry_run=True)
+
+        self.assertEqual(result.updated, 1)
+        self.assertIsNone(Recipe.objects.get(pk=1).calories)
+
+    def test_recipe_without_usages(self):
+        recipe_id = Recipe.objects.create(
+            title="empty", portions=1, total_time="0:10", instructions="", author_id=1
+        ).id
+        result = compute_nutrition()
+
+        self.assertTrue(result.complete[-1])
+        self.assertIsNone(result[recipe_id]["calories"])
+
+
+@override_settings(NUTRITION_PROPAGATION=True, NUTRITION_DEBOUNCE=0)
+class TestNutritionPropagation(TestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        nutrition_queue.clear()
+        measure = Measure.objects.get(pk=1)
+        for ingredient in Ingredient.objects.filter(pk__in=range(2, 6)):
+            ConversionFactory.create(
+                utensil=measure, ingredient=ingredient, standard_value=10.0
+            )
+        Ingredient.objects.filter(pk__in=range(1, 6)).update(calories=100.0)
+        nutrition_queue.clear()
+
+    def tearDown(self):
+        nutrition_queue.clear()
+
+    def test_ingredient_change(self):
+        ingredient = Ingredient.objects.get(pk=1)
+        ingredient.calories = 300.0
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+
+        expected = compute_nutrition(recipe_ids=[1])[1]["calories"]
+        self.assertGreater(expected, 100.0)
+        self.assertAlmostEqual(Recipe.objects.get(pk=1).calories, expected, 2)
+        self.assertIsNone(Recipe.objects.get(pk=2).calories)
+
+    def test_conversion_change(self):
+        conversion = UtensilConversion.objects.get(pk=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            conversion.standard_value = 20.0
+            conversion.save()
+        self.assertAlmostEqual(Recipe.objects.get(pk=1).calories, 100.0)
+
+        conversion.ingredient_id = 6
+        with self.captureOnCommitCallbacks(execute=True):
+            conversion.save()
+        self.assertEqual(nutrition_queue.conversions, set())
+        self.assertFalse(compute_nutrition(recipe_ids=[1]).complete[0])
+
+    def test_unrelated_fields(self):
+        ingredient = Ingredient.objects.get(pk=1)
+        ingredient.name = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save(update_fields=["name"])
+        self.assertEqual(nutrition_queue.ingredients, set())
+
+    @override_settings(NUTRITION_DEBOUNCE=60)
+    def test_coalesced(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for ingredient in Ingredient.objects.filter(pk__in=range(1, 6)):
+                ingredient.calories = 200.0
+                ingredient.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.get(pk=20).save()
+
+        self.assertIsNone(Recipe.objects.get(pk=1).calories)
+        self.assertEqual(nutrition_queue.ingredients, {1, 2, 3, 4, 5, 20})
+
+        with patch(
+            "culinary.nutrition.recompute_nutrition", wraps=recompute_nutrition
+        ) as recompute:
+            self.assertEqual(nutrition_queue.flush(), {1})
+
+        recompute.assert_called_once_with(recipe_ids=[1])
+        self.assertAlmostEqual(Recipe.objects.get(pk=1).calories, 200.0)
+
+    @override_settings(NUTRITION_DEBOUNCE=60)
+    def test_failed_batch_is_kept(self):
+        nutrition_queue.add(recipes=[1])
+        with patch(
+            "culinary.nutrition.recompute_nutrition", side_effect=RuntimeError
+        ), patch("culinary.nutrition.connections") as connections:
+            with self.assertLogs("culinary.nutrition", "ERROR"):
+                # as the timer does, in a thread of its own
+                thread = threading.Thread(target=nutrition_queue._flush_in_thread)
+                thread.start()
+                thread.join()
+
+        connections.close_all.assert_called_once_with()
+        self.assertEqual(nutrition_queue.recipes, {1})
+
+        self.assertEqual(nutrition_queue.flush(), {1})
+        self.assertFalse(nutrition_queue.pending())
+
+    @override_settings(NUTRITION_DEBOUNCE=60)
+    def test_flush_at_exit(self):
+        nutrition_queue.add(recipes=[1])
+        with patch.object(nutrition_queue, "flush") as flush:
+            nutrition_queue.flush_at_exit()
+        flush.assert_called_once_with()
+
+        nutrition_queue.clear()
+        with patch.object(nutrition_queue, "flush") as flush:
+            nutrition_queue.flush_at_exit()
+        flush.assert_not_called()
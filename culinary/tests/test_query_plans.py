@@ -0,0 +1,140 @@
+import re
+
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from account.authentication import token_cache
+from test.base_test import TestUsers, get_links
+
+# a table read row by row, without any index
+FULL_SCAN = re.compile(r"\bSCAN (\w+)$")
+
+
+class CapturedSelects:
+    """execute_wrapper() collecting the SELECTs a request runs"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith("SELECT"):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+@override_settings(RECIPE_SEARCH_INDEX=False)
+class TestQueryPlans(APITestCase):
+    """
+    Every query of the recipe and ingredient lists, for each filter they
+    take, is planned with EXPLAIN QUERY PLAN and must not read a table
+    without an index. Fixture tables are tiny, but SQLite plans without
+    statistics until ANALYZE runs, so the plans are the ones a large
+    database would get from the indexes alone.
+    """
+
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    # tables small enough to read whole
+    small_tables = {"culinary_measure", "tags_tag", "tags_tagcategory"}
+
+    def setUp(self):
+        token_cache.clear()
+
+    def plans(self, path, token=None):
+        headers = {"HTTP_AUTHORIZATION": token} if token else {}
+        captured = CapturedSelects()
+        with connection.execute_wrapper(captured):
+            response = self.client.get(path, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, path)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for sql, params in captured.queries:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assert_no_full_scans(self, path, token=None):
+        for sql, plan in self.plans(path, token):
+            for line in plan:
+                match = FULL_SCAN.search(line)
+                if match and match.group(1) not in self.small_tables:
+                    self.fail(
+                        f"{path} scans {match.group(1)}:\n{sql}\n" + "\n".join(plan)
+                    )
+
+    def assert_ordered_by_index(self, path, token=None):
+        """The page query reads rows in page order instead of sorting all
+        that match"""
+        pages = [
+            (sql, plan) for sql, plan in self.plans(path, token) if " LIMIT " in sql
+        ]
+        self.assertEqual(len(pages), 1, path)
+        sql, plan = pages[0]
+        self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan, f"{path}:\n{sql}")
+
+    def assert_uses_index(self, path, index, token=None):
+        lines = [line for _, plan in self.plans(path, token) for line in plan]
+        self.assertTrue(
+            any(index in line for line in lines), f"{path}:\n" + "\n".join(lines)
+        )
+
+    def test_recipe_list(self):
+        recipes = reverse("recipe-list")
+        for query in (
+            "",
+            "?expanded=false",
+            "?title=pasta",
+            "?caloriesAbove=100",
+            "?caloriesBelow=500",
+            "?userId=1",
+            "?tags=1,2",
+            "?ingredients=1,2,3",
+            "?ingredients=1,2,3&absentLimit=2",
+            "?ingredients=1,2,3&rank=coverage",
+            "?ingredients=1,2,3&rank=weighted&tags=1&absentLimit=2",
+            "?userId=1&tags=1&caloriesAbove=100",
+        ):
+            self.assert_no_full_scans(recipes + query)
+            self.assert_no_full_scans(recipes + query, TestUsers.get_user1_token())
+
+        for query in ("?fridgeId=2", "?fridgeId=2&absentLimit=2", "?fridgeId=2&tags=1"):
+            self.assert_no_full_scans(recipes + query, TestUsers.get_user1_token())
+
+        for query in ("", "?expanded=false", "?title=pasta", "?caloriesAbove=100"):
+            self.assert_ordered_by_index(recipes + query)
+            self.assert_ordered_by_index(recipes + query, TestUsers.get_user1_token())
+
+    def test_recipe_list_indexes(self):
+        recipes = reverse("recipe-list")
+        self.assert_uses_index(recipes + "?userId=1", "recipe_author_title_idx")
+        self.assert_uses_index(
+            recipes + "?tags=1,2", "COVERING INDEX recipe_tags_tag_recipe_idx"
+        )
+        self.assert_uses_index(
+            recipes + "?ingredients=1,2", "COVERING INDEX usage_ingredient_recipe_idx"
+        )
+
+    def test_recipe_list_next_page(self):
+        response = self.client.get(reverse("recipe-list") + "?pageSize=1")
+        next_page = get_links(response)["next"]
+        self.assert_no_full_scans(next_page)
+        self.assert_ordered_by_index(next_page)
+
+        previous_page = get_links(self.client.get(next_page))["previous"]
+        self.assert_no_full_scans(previous_page)
+        self.assert_ordered_by_index(previous_page)
+
+    def test_ingredient_list(self):
+        ingredients = reverse("ingredients-list")
+        for query in ("", "?name=sugar"):
+            self.assert_no_full_scans(ingredients + query)
+            self.assert_no_full_scans(ingredients + query, TestUsers.get_user1_token())
+            self.assert_no_full_scans(ingredients + query, TestUsers.get_staff_token())
+            self.assert_ordered_by_index(ingredients + query)
+            self.assert_ordered_by_index(
+                ingredients + query, TestUsers.get_user1_token()
+            )
@@ -0,0 +1,172 @@
+import json
+import sqlite3
+import tempfile
+from contextlib import closing
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITransactionTestCase
+
+from account.authentication import token_cache
+from culinary.models import Recipe
+from foodinfo.replicas import PIN_COOKIE, copy_database
+from test.base_test import TestUsers
+
+REPLICAS = ["replica1", "replica2"]
+
+
+class TestReplicaRouting(APITransactionTestCase):
+    """Replicas are SQLite files copied from the test database, each with
+    its first recipe renamed after it to tell where reads went"""
+
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        for alias in REPLICAS:
+            connections.settings[alias] = {
+                **connections["default"].settings_dict,
+                "NAME": str(Path(directory.name) / f"{alias}.sqlite3"),
+            }
+            self.addCleanup(self.remove_alias, alias)
+            copy_database(alias)
+            self.rename_recipe(alias, alias)
+
+        self.replicas = override_settings(DATABASE_REPLICAS=REPLICAS[:1])
+        self.replicas.enable()
+        self.addCleanup(self.replicas.disable)
+
+    def remove_alias(self, alias):
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+    def rename_recipe(self, alias, title):
+        path = connections[alias].settings_dict["NAME"]
+        with closing(sqlite3.connect(path)) as replica, replica:
+            replica.execute(
+                "UPDATE culinary_recipe SET title = ? WHERE id = 1", [title]
+            )
+
+    def get_title(self, client=None, token=None):
+        client = client or self.client
+        headers = {"HTTP_AUTHORIZATION": token} if token else {}
+        response = client.get(reverse("recipe-detail", args=[1]), **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["title"]
+
+    def rename(self, title, client=None):
+        client = client or self.client
+        response = client.put(
+            reverse("recipe-edit", args=[1]),
+            {"title": title},
+            HTTP_AUTHORIZATION=TestUsers.get_staff_token(),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_safe_requests_read_replica(self):
+        self.assertEqual(self.get_title(), "replica1")
+        response = self.client.get(reverse("recipe-list") + "?fields=id,title")
+        self.assertIn("replica1", [recipe["title"] for recipe in response.data])
+
+        response = self.client.get(reverse("tags-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(RECIPE_DOCUMENTS=True)
+    def test_documents_read_replica(self):
+        response = self.client.get(reverse("recipe-list"))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertIn("replica1", [recipe["title"] for recipe in response.json()])
+
+        # serving documents wrote nothing, so the client isn't pinned
+        response = self.client.get(reverse("recipe-detail", args=[1]))
+        self.assertEqual(response.json()["title"], "replica1")
+
+    def test_without_replicas(self):
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertNotIn(self.get_title(), REPLICAS)
+
+    def test_several_replicas(self):
+        with override_settings(DATABASE_REPLICAS=REPLICAS):
+            titles = {self.get_title() for _ in range(30)}
+        self.assertEqual(titles, set(REPLICAS))
+
+    def test_writes_go_to_default(self):
+        response = self.rename("renamed")
+        self.assertEqual(response.data["title"], "renamed")
+        self.assertEqual(Recipe.objects.get(pk=1).title, "renamed")
+        self.assertEqual(self.get_title(APIClient()), "replica1")
+
+    def test_read_after_write_with_cookie(self):
+        response = self.rename("renamed")
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        # the client keeps the cookie
+        self.assertEqual(self.get_title(), "renamed")
+
+    def test_streamed_import_pins(self):
+        record = {
+            "title": "imported",
+            "portions": 2,
+            "total_time": "0:30:00",
+            "instructions": "Recipe steps",
+            "ingredients": [
+                {"amount": 1, "ingredient": {"id": 1}, "measure": {"id": 1}}
+            ],
+            "tags": [1],
+        }
+        response = self.client.post(
+            reverse("recipe-import"),
+            data=json.dumps(record),
+            content_type="application/x-ndjson",
+            HTTP_AUTHORIZATION=TestUsers.get_staff_token(),
+        )
+        b"".join(response.streaming_content)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertTrue(Recipe.objects.filter(title="imported").exists())
+
+    def test_read_after_write_for_user(self):
+        self.rename("renamed")
+
+        client = APIClient()
+        self.assertEqual(self.get_title(client, TestUsers.get_staff_token()), "renamed")
+        self.assertEqual(
+            self.get_title(client, TestUsers.get_user1_token()), "replica1"
+        )
+
+    def test_pin_expires(self):
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.rename("renamed")
+            self.assertEqual(
+                self.get_title(APIClient(), TestUsers.get_staff_token()), "replica1"
+            )
+
+    def test_users_and_tokens_read_default(self):
+        # missing from the replica
+        user = User.objects.create_user("new user")
+        token, _ = Token.objects.get_or_create(user=user)
+
+        title = self.get_title(APIClient(), f"Token {token.key}")
+        self.assertEqual(title, "replica1")
+
+    def test_reads_outside_requests_use_default(self):
+        self.get_title()
+        self.assertNotIn(Recipe.objects.get(pk=1).title, REPLICAS)
+
+    def test_sync_replicas(self):
+        with override_settings(DATABASE_REPLICAS=REPLICAS):
+            call_command("sync_replicas", stdout=StringIO())
+            self.assertNotIn(self.get_title(), REPLICAS)
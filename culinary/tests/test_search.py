@@ -0,0 +1,338 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from culinary.models import Fridge, Ingredient, IngredientUsage, Recipe
+from culinary.search import FTS_TABLE, recipe_index
+from culinary.serializers import RecipeCreateSerializer
+from test.base_test import TestUsers, get_links
+from test.factories import IngredientUsageFactory, RecipeFactory
+
+
+class TestRecipeIndex(TestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        recipe_index.clear()
+
+    def test_match(self):
+        self.assertEqual(recipe_index.match([1, 2, 3, 4, 5], 0), {1})
+        self.assertEqual(recipe_index.match([1, 2, 3, 6], 2), {1})
+        self.assertEqual(recipe_index.match([1, 2, 3, 6, 7, 8], 2), {1, 2})
+        self.assertEqual(recipe_index.match([], 5), {1, 2, 3})
+        self.assertEqual(recipe_index.match([], 4), set())
+
+    def test_recipe_without_ingredients(self):
+        recipe_index.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = RecipeFactory.create(title="empty recipe")
+
+        self.assertEqual(recipe_index.match([1], 0), {recipe.id})
+
+    def test_usage_signals(self):
+        recipe_index.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            usage = IngredientUsageFactory.create(
+                recipe=Recipe.objects.get(pk=1),
+                ingredient=Ingredient.objects.get(pk=20),
+            )
+        self.assertEqual(recipe_index.match([1, 2, 3, 4, 5], 0), set())
+        self.assertEqual(recipe_index.match([1, 2, 3, 4, 5, 20], 0), {1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usage.ingredient_id = 21
+            usage.save()
+        self.assertEqual(recipe_index.match([1, 2, 3, 4, 5, 21], 0), {1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usage.delete()
+        self.assertEqual(recipe_index.match([1, 2, 3, 4, 5], 0), {1})
+
+    def test_recipe_delete(self):
+        recipe_index.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(pk=1).delete()
+
+        self.assertEqual(recipe_index.match([1, 2, 3, 4, 5], 0), set())
+        self.assertEqual(recipe_index.match([], 5), {2, 3})
+        self.assertFalse(IngredientUsage.objects.filter(recipe_id=1).exists())
+
+    def test_bulk_created_usages(self):
+        recipe_index.build()
+        data = {
+            "title": "new recipe",
+            "portions": 10,
+            "total_time": "1:30:00",
+            "instructions": "Recipe steps",
+            "ingredients": [
+                {"amount": 10, "ingredient": {"id": 20}, "measure": {"id": 1}},
+                {"amount": 10, "ingredient": {"id": 21}, "measure": {"id": 1}},
+            ],
+            "author": 1,
+            "tags": [],
+        }
+        serializer = RecipeCreateSerializer(data=data)
+        self.assertTrue(serializer.is_valid())
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = serializer.save()
+
+        self.assertEqual(recipe_index.match([20, 21], 0), {recipe.id})
+
+    def test_removed_recipe_postings(self):
+        recipe_index.build()
+        recipe_index.remove_recipe(1)
+
+        self.assertEqual(recipe_index.match([1, 2, 3, 4, 5], 0), set())
+        self.assertEqual(recipe_index.match([1, 2, 3, 6, 7, 8], 2), {2})
+
+    def test_rank(self):
+        self.assertEqual(
+            recipe_index.rank([1, 2, 3, 6, 7, 11], 3), [(1, 0.6), (2, 0.4), (3, 0.2)]
+        )
+        self.assertEqual(
+            recipe_index.rank([1, 2, 3, 6, 7, 11], 2), [(1, 0.6), (2, 0.4)]
+        )
+        self.assertEqual(
+            recipe_index.rank([1, 2, 3, 6, 7], 3, absent_limit=2), [(1, 0.6)]
+        )
+        self.assertEqual(recipe_index.rank([20], 3), [])
+
+    def test_rank_ties(self):
+        self.assertEqual(
+            recipe_index.rank([1, 6, 11], 3), [(1, 0.2), (2, 0.2), (3, 0.2)]
+        )
+        self.assertEqual(recipe_index.rank([11, 6], 1), [(2, 0.2)])
+
+    def test_rank_weights(self):
+        Ingredient.objects.filter(pk__in=[8, 9, 10]).update(category="Spices")
+        weights = {"Spices": 0.25}
+
+        ranked = recipe_index.rank([1, 2, 3, 6, 7], 2, weights)
+        self.assertEqual([recipe_id for recipe_id, _ in ranked], [2, 1])
+        self.assertAlmostEqual(ranked[0][1], 2 / 2.75)
+
+        # only spices present
+        self.assertEqual(recipe_index.rank([8], 1, weights), [(2, 0.25 / 2.75)])
+        self.assertEqual(recipe_index.rank([8], 1, {"Spices": 0}), [])
+
+    def test_rank_accept(self):
+        accepted = []
+
+        def accept(recipe_ids):
+            accepted.append(recipe_ids)
+            return {2, 3}
+
+        ranked = recipe_index.rank([1, 2, 3, 6, 7, 11], 1, accept=accept)
+        self.assertEqual(ranked, [(2, 0.4)])
+        self.assertEqual(accepted, [[1], [2, 3]])
+
+    def test_category_signals(self):
+        recipe_index.build()
+        ingredient = Ingredient.objects.get(pk=8)
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.category = "Spices"
+            ingredient.save()
+
+        ranked = recipe_index.rank([6, 7], 1, {"Spices": 0})
+        self.assertEqual(ranked, [(2, 0.5)])
+
+        # the spice still weighs nothing once another usage is gone
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientUsage.objects.get(recipe_id=2, ingredient_id=9).delete()
+        ranked = recipe_index.rank([6, 7], 1, {"Spices": 0})
+        self.assertEqual(ranked, [(2, 2 / 3)])
+
+
+@override_settings(RECIPE_SEARCH_INDEX=True)
+class TestRecipeIndexViews(TestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        recipe_index.clear()
+
+    def test_filter_by_precise_ingredients(self):
+        url = reverse("recipe-list")
+        response = self.client.get(url + "?absentLimit=1&ingredients=1,2,3,4,6,7,8")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([recipe["id"] for recipe in response.json()], [1])
+
+    def test_combines_with_filters(self):
+        url = reverse("recipe-list")
+        response = self.client.get(url + "?absentLimit=5&ingredients=1&tags=2")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([recipe["id"] for recipe in response.json()], [2])
+
+    def test_bad_ids(self):
+        url = reverse("recipe-list")
+        response = self.client.get(url + "?absentLimit=0&ingredients=a,b")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestFullTextSearch(TestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        RecipeFactory.create(
+            title="Chicken soup", instructions="Boil the chicken with carrots."
+        )
+        RecipeFactory.create(
+            title="Carrot cake", instructions="Bake with grated carrots and chicken."
+        )
+        RecipeFactory.create(title="Plain rice", instructions="Boil the rice.")
+
+    def _search(self, params):
+        response = self.client.get(reverse("recipe-list") + params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe["title"] for recipe in response.json()]
+
+    def test_relevance_order(self):
+        self.assertEqual(self._search("?q=chicken"), ["Chicken soup", "Carrot cake"])
+        self.assertEqual(self._search("?q=carrot"), ["Carrot cake", "Chicken soup"])
+
+    def test_prefix_match(self):
+        self.assertEqual(self._search("?q=chick+boil"), ["Chicken soup"])
+        self.assertEqual(self._search("?q=pla+ric"), ["Plain rice"])
+
+    def test_combines_with_filters(self):
+        Recipe.objects.filter(title="Chicken soup").update(calories=500)
+        Recipe.objects.filter(title="Carrot cake").update(calories=100)
+
+        self.assertEqual(self._search("?q=chicken&caloriesBelow=200"), ["Carrot cake"])
+
+    def test_tracks_updates(self):
+        recipe = Recipe.objects.get(title="Plain rice")
+        recipe.title = "Fried rice with chicken"
+        recipe.save()
+        self.assertIn("Fried rice with chicken", self._search("?q=chicken"))
+
+        recipe.delete()
+        self.assertEqual(self._search("?q=rice"), [])
+
+    def test_update_trigger_columns(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = %s",
+                [FTS_TABLE + "_update"],
+            )
+            (sql,) = cursor.fetchone()
+        self.assertIn("AFTER UPDATE OF title, instructions ON culinary_recipe", sql)
+
+        # other columns change without reindexing, and stay searchable
+        Recipe.objects.filter(title="Plain rice").update(calories=100)
+        self.assertEqual(self._search("?q=rice"), ["Plain rice"])
+
+    def test_pagination(self):
+        titles = self._search("?q=chicken&pageSize=1")
+        self.assertEqual(titles, ["Chicken soup"])
+
+        response = self.client.get(reverse("recipe-list") + "?q=chicken&pageSize=1")
+        response = self.client.get(get_links(response)["next"])
+        self.assertEqual(
+            [recipe["title"] for recipe in response.json()], ["Carrot cake"]
+        )
+
+
+class TestCoverageRanking(TestCase):
+    """Ranked by the index and by the database alike"""
+
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        recipe_index.clear()
+        Ingredient.objects.filter(pk__in=[8, 9, 10]).update(category="Spices")
+
+    def _ranked(self, params):
+        ranked = []
+        for index in (True, False):
+            with self.settings(RECIPE_SEARCH_INDEX=index):
+                response = self.client.get(reverse("recipe-list") + params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ranked.append([recipe["id"] for recipe in response.json()])
+
+        self.assertEqual(ranked[0], ranked[1], params)
+        return ranked[0]
+
+    def test_coverage(self):
+        self.assertEqual(
+            self._ranked("?ingredients=11,1,2,3,6,7&rank=coverage"), [1, 2, 3]
+        )
+        self.assertEqual(self._ranked("?ingredients=6,11&rank=coverage"), [2, 3])
+        self.assertEqual(self._ranked("?ingredients=20&rank=coverage"), [])
+
+    def test_top(self):
+        self.assertEqual(
+            self._ranked("?ingredients=1,2,3,6,7,11&rank=coverage&top=2"), [1, 2]
+        )
+
+    def test_weighted(self):
+        self.assertEqual(self._ranked("?ingredients=1,2,3,6,7&rank=coverage"), [1, 2])
+        self.assertEqual(self._ranked("?ingredients=1,2,3,6,7&rank=weighted"), [2, 1])
+
+    def test_absent_limit(self):
+        self.assertEqual(
+            self._ranked("?ingredients=1,2,3,6,7&rank=coverage&absentLimit=2"), [1]
+        )
+
+    def test_combines_with_filters(self):
+        params = "?ingredients=1,2,3,6,7,11&rank=coverage"
+        self.assertEqual(self._ranked(params + "&tags=2,3&top=1"), [2])
+        self.assertEqual(self._ranked(params + "&tags=3,1"), [1, 3])
+        self.assertEqual(self._ranked(params + "&q=recipe&top=2"), [1, 2])
+
+    def test_search_filters_candidates(self):
+        Recipe.objects.filter(pk=2).update(title="zebra stew")
+        params = "?ingredients=1,2,3,6,7,11&rank=coverage&q=zebra"
+        self.assertEqual(self._ranked(params + "&top=1"), [2])
+        self.assertEqual(self._ranked(params), [2])
+
+    def test_rejected_candidates_queries(self):
+        ingredient = Ingredient.objects.get(pk=1)
+        for recipe in RecipeFactory.create_batch(60):
+            IngredientUsageFactory.create(recipe=recipe, ingredient=ingredient)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(
+                self._ranked("?ingredients=1&rank=coverage&top=1&tags=1"), [1]
+            )
+        self.assertLess(len(queries), 20)
+
+    def test_fridge(self):
+        fridge = Fridge.objects.get(pk=2)
+        fridge.shelf.set([6, 7, 11])
+        token = TestUsers.get_user1_token()
+
+        for index in (True, False):
+            with self.settings(RECIPE_SEARCH_INDEX=index):
+                response = self.client.get(
+                    reverse("recipe-list") + "?fridgeId=2&rank=coverage",
+                    HTTP_AUTHORIZATION=token,
+                )
+            self.assertEqual([recipe["id"] for recipe in response.json()], [2, 3])
+
+    def test_pagination(self):
+        params = "?ingredients=1,2,3,6,7,11&rank=coverage&pageSize=1"
+        for index in (True, False):
+            with self.settings(RECIPE_SEARCH_INDEX=index):
+                ids = []
+                url = reverse("recipe-list") + params
+                while url:
+                    response = self.client.get(url)
+                    ids += [recipe["id"] for recipe in response.json()]
+                    url = get_links(response).get("next")
+            self.assertEqual(ids, [1, 2, 3])
+
+    def test_bad_params(self):
+        for params in (
+            "?ingredients=1&rank=best",
+            "?ingredients=1&rank=coverage&top=0",
+            "?ingredients=1&rank=coverage&top=a",
+            "?ingredients=a&rank=coverage",
+            "?rank=coverage",
+        ):
+            response = self.client.get(reverse("recipe-list") + params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -1,9 +1,14 @@
 import json
 
+from django.db import connection
+from django.db.models.signals import m2m_changed, post_save
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
 
 from culinary.models import *
 from culinary.serializers import *
+from culinary.signals import recipes_bulk_created
 
 
 class TestIngredientSerializer(TestCase):
@@ -294,6 +299,103 @@ class TestRecipeCreateSerializer(TestCase):
         }
         self.assertEqual(json.dumps(serialized), json.dumps(db_data))
 
+    def test_missing_ids(self):
+        data = {
+            "title": "new recipe",
+            "portions": 10,
+            "total_time": "1:30:00",
+            "instructions": "Recipe steps",
+            "ingredients": [
+                {"amount": 10, "ingredient": {"id": 100}, "measure": {"id": 1}},
+                {"amount": 10, "ingredient": {"id": 1}, "measure": {"id": 100}},
+                {"amount": 10, "ingredient": {"id": 101}, "measure": {"id": 1}},
+            ],
+            "author": 1,
+            "tags": [1, 100],
+        }
+        creation_serializer = RecipeCreateSerializer(data=data)
+        self.assertTrue(creation_serializer.is_valid())
+
+        with self.assertRaises(serializers.ValidationError) as context:
+            creation_serializer.save()
+
+        self.assertEqual(
+            context.exception.detail,
+            {
+                "ingredients": ["Objects do not exist: 100, 101"],
+                "measures": ["Objects do not exist: 100"],
+                "tags": ["Objects do not exist: 100"],
+            },
+        )
+        self.assertEqual(Recipe.objects.count(), 3)
+
+    def test_query_count(self):
+        def create(usages):
+            data = {
+                "title": f"recipe with {usages} ingredients",
+                "portions": 10,
+                "total_time": "1:30:00",
+                "instructions": "Recipe steps",
+                "ingredients": [
+                    {"amount": i, "ingredient": {"id": i + 1}, "measure": {"id": 1}}
+                    for i in range(usages)
+                ],
+                "author": 1,
+                "tags": [1, 2, 3],
+            }
+            creation_serializer = RecipeCreateSerializer(data=data)
+            self.assertTrue(creation_serializer.is_valid())
+            with CaptureQueriesContext(connection) as queries:
+                recipe = creation_serializer.save()
+            self.assertEqual(recipe.ingredientusage_set.count(), usages)
+            self.assertEqual(recipe.tags.count(), 3)
+            return len(queries)
+
+        self.assertEqual(create(2), create(20))
+
+    def test_signals(self):
+        data = {
+            "title": "new recipe",
+            "portions": 10,
+            "total_time": "1:30:00",
+            "instructions": "Recipe steps",
+            "ingredients": [
+                {"amount": 10, "ingredient": {"id": 1}, "measure": {"id": 1}},
+            ],
+            "author": 1,
+            "tags": [1],
+        }
+        saved, tagged, bulk = [], [], []
+
+        def on_save(sender, instance, **kwargs):
+            saved.append(sender)
+
+        def on_tags(sender, action, **kwargs):
+            tagged.append(action)
+
+        def on_bulk(sender, **kwargs):
+            bulk.append(kwargs)
+
+        post_save.connect(on_save)
+        m2m_changed.connect(on_tags, sender=Recipe.tags.through)
+        recipes_bulk_created.connect(on_bulk)
+        self.addCleanup(post_save.disconnect, on_save)
+        self.addCleanup(m2m_changed.disconnect, on_tags, sender=Recipe.tags.through)
+        self.addCleanup(recipes_bulk_created.disconnect, on_bulk)
+
+        creation_serializer = RecipeCreateSerializer(data=data)
+        self.assertTrue(creation_serializer.is_valid())
+        recipe = creation_serializer.save()
+
+        self.assertIn(Recipe, saved)
+        self.assertIn("post_add", tagged)
+        [sent] = bulk
+        self.assertEqual(sent["recipes"], [recipe])
+        self.assertEqual(
+            [usage.pk for usage in sent["usages"]],
+            list(recipe.ingredientusage_set.values_list("pk", flat=True)),
+        )
+
 
 class TestIngredientUsageSerializer(TestCase):
     fixtures = ["users.json", "tags.json", "culinary.json"]
@@ -0,0 +1,109 @@
+import json
+
+import factory
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from culinary.views.recipe_views import RecipeList
+from foodinfo.streaming import aiterate
+from test.base_test import TestUsers
+from test.factories import RecipeFactory
+
+
+class TestStreamingExport(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def _stream(self, url, token=None, **headers):
+        if token is None:
+            token = TestUsers.get_staff_token()
+        response = self.client.get(url, HTTP_AUTHORIZATION=token, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode("utf-8")
+
+    def _listed(self, url):
+        token = TestUsers.get_staff_token()
+        return self.client.get(url, HTTP_AUTHORIZATION=token).json()
+
+    def test_ndjson(self):
+        for name in ("recipe-list", "ingredients-list", "conversion-list"):
+            url = reverse(name)
+            response, content = self._stream(url + "?stream=ndjson")
+
+            self.assertEqual(response["Content-Type"], "application/x-ndjson")
+            lines = [json.loads(line) for line in content.splitlines()]
+            self.assertEqual(lines, self._listed(url + "?pageSize=1000"))
+
+    def test_json(self):
+        url = reverse("recipe-list")
+        _, content = self._stream(url + "?stream=json&expanded=false&tags=1")
+        self.assertEqual(
+            json.loads(content), self._listed(url + "?expanded=false&tags=1")
+        )
+
+        _, content = self._stream(url + "?stream=json&tags=1000")
+        self.assertEqual(json.loads(content), [])
+
+    def test_accept_header(self):
+        url = reverse("ingredients-list")
+        response, content = self._stream(url, HTTP_ACCEPT="application/x-ndjson")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(content.splitlines()), 31)
+
+    def test_staff_only(self):
+        url = reverse("recipe-list") + "?stream=ndjson"
+        response = self.client.get(url, HTTP_AUTHORIZATION=TestUsers.get_user1_token())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_chunked_prefetch(self):
+        RecipeFactory.create_batch(7, title=factory.Sequence(lambda n: f"export {n}"))
+        url = reverse("recipe-list") + "?stream=ndjson"
+
+        with patch.object(RecipeList, "stream_chunk_size", 5):
+            response = self.client.get(
+                url, HTTP_AUTHORIZATION=TestUsers.get_staff_token()
+            )
+            # the rows, then usages and tags for each of the two chunks
+            with self.assertNumQueries(5):
+                content = b"".join(response.streaming_content)
+
+        self.assertEqual(len(content.splitlines()), 10)
+
+    def test_asgi(self):
+        url = reverse("recipe-list") + "?stream=ndjson"
+        token = TestUsers.get_staff_token()
+
+        async def stream():
+            response = await self.async_client.get(
+                url, headers={"Authorization": token}
+            )
+            self.assertTrue(response.is_async)
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        _, expected = self._stream(url)
+        self.assertEqual(async_to_sync(stream)().decode("utf-8"), expected)
+
+    def test_aiterate_pulls_chunks(self):
+        pulled = []
+
+        def items():
+            for item in range(7):
+                pulled.append(item)
+                yield item
+
+        async def first():
+            iterator = aiterate(items(), 3)
+            item = await iterator.__anext__()
+            await iterator.aclose()
+            return item
+
+        self.assertEqual(async_to_sync(first)(), 0)
+        self.assertEqual(pulled, [0, 1, 2])
@@ -0,0 +1,70 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from culinary.models import Ingredient, Recipe
+from tags.models import Tag
+from test.base_test import TestUsers, get_links
+from test.factories import IngredientUsageFactory, RecipeFactory
+
+
+class TestValuesSerialization(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        Recipe.objects.filter(pk=1).update(thumbnail="recipe.png", calories=120.5)
+        Recipe.objects.get(pk=2).favorites.add(2)
+        # tags and usages added out of id order
+        Recipe.objects.get(pk=3).tags.add(Tag.objects.get(pk=1))
+        IngredientUsageFactory.create(
+            recipe=Recipe.objects.get(pk=3),
+            ingredient=Ingredient.objects.get(pk=1),
+            measure_id=1,
+        )
+
+    def _get(self, url, token=None, values=True):
+        headers = {"HTTP_AUTHORIZATION": token} if token else {}
+        with self.settings(VALUES_SERIALIZATION=values):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def _assert_same(self, url, token=None):
+        expected = self._get(url, token, values=False)
+        response = self._get(url, token)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.get("Link"), expected.get("Link"))
+        return response
+
+    def test_recipes(self):
+        url = reverse("recipe-list")
+        for token in (None, TestUsers.get_user1_token()):
+            self._assert_same(url, token)
+            self._assert_same(url + "?expanded=false", token)
+            self._assert_same(url + "?tags=1&caloriesAbove=100", token)
+            self._assert_same(url + "?absentLimit=4&ingredients=1,2", token)
+
+    def test_recipe_search_and_pages(self):
+        RecipeFactory.create(title="Chicken soup", instructions="Boil chicken.")
+        RecipeFactory.create(title="Chicken pie", instructions="Bake it.")
+        url = reverse("recipe-list")
+        self._assert_same(url + "?q=chicken")
+
+        response = self._assert_same(url + "?pageSize=2")
+        self._assert_same(get_links(response)["next"])
+
+    def test_ingredients(self):
+        url = reverse("ingredients-list")
+        self._assert_same(url)
+        self._assert_same(url + "?name=1", TestUsers.get_user1_token())
+        response = self._assert_same(url + "?pageSize=5", TestUsers.get_staff_token())
+        self._assert_same(get_links(response)["next"], TestUsers.get_staff_token())
+
+    def test_conversions(self):
+        self._assert_same(reverse("conversion-list"))
+
+    def test_queries(self):
+        with self.assertNumQueries(3):
+            self._get(reverse("recipe-list"))
+        with self.assertNumQueries(1):
+            self._get(reverse("conversion-list"))
@@ -1,16 +1,20 @@
+import json
+from base64 import b64encode
 from typing_extensions import override
 from django.urls import reverse
 from rest_framework import status
-from culinary.models import Ingredient
+from culinary.models import Fridge, Ingredient, Measure, Recipe
+from account.authentication import token_cache
 from tags.models import Tag
 from test.factories import (
     FridgeFactory,
     IngredientFactory,
+    IngredientUsageFactory,
     MeasureFactory,
     RecipeFactory,
 )
 from rest_framework.test import APITestCase
-from test.base_test import BaseTestMixins, TestUsers
+from test.base_test import BaseTestMixins, TestUsers, get_links
 
 
 class TestIngredientViews(
@@ -469,3 +473,355 @@ class TestRecipeViews(
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()), 3)
+
+
+class TestKeysetPagination(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def _collect(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.token)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([item["id"] for item in response.json()])
+            url = get_links(response).get("next")
+        return pages
+
+    def setUp(self):
+        self.token = TestUsers.get_staff_token()
+
+    def test_ingredient_pages(self):
+        url = reverse("ingredients-list")
+        expected = list(
+            Ingredient.objects.order_by("name", "id").values_list("id", flat=True)
+        )
+
+        pages = self._collect(url + "?pageSize=10")
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_title_tiebreak(self):
+        for i in range(5):
+            RecipeFactory.create(title=f"same title {i}")
+        Recipe.objects.filter(title__startswith="same title").update(title="same")
+
+        pages = self._collect(reverse("recipe-list") + "?pageSize=2")
+
+        ids = sum(pages, [])
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+        same = list(
+            Recipe.objects.filter(title="same")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(ids[:5], same)
+
+    def test_previous_page(self):
+        url = reverse("measures-list")
+        response = self.client.get(url + "?pageSize=2")
+        next_url = get_links(response)["next"]
+
+        response = self.client.get(next_url)
+        self.assertEqual(len(response.json()), 1)
+        self.assertNotIn("next", get_links(response))
+
+        response = self.client.get(get_links(response)["previous"])
+        self.assertEqual(
+            [measure["id"] for measure in response.json()],
+            list(Measure.objects.order_by("name", "id").values_list("id", flat=True))[
+                :2
+            ],
+        )
+
+    def test_distinct_and_annotated(self):
+        url = reverse("recipe-list")
+        pages = self._collect(url + "?tags=1,2,4&pageSize=1")
+        self.assertEqual(pages, [[1], [2]])
+
+        pages = self._collect(url + "?absentLimit=5&ingredients=1&pageSize=2")
+        self.assertEqual(pages, [[1, 2], [3]])
+
+    def test_invalid_cursor(self):
+        url = reverse("recipe-list")
+        response = self.client.get(url + "?cursor=notacursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        url = reverse("recipe-list")
+        for position in (["a", "x"], ["a", None], ["a", [1]], [{}, 1]):
+            token = json.dumps({"position": position, "reverse": False})
+            cursor = b64encode(token.encode("utf-8")).decode("ascii")
+            response = self.client.get(url, {"cursor": cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+        cursor = b64encode(b'{"position": ["a", 1], "reverse": false}').decode()
+        response = self.client.get(url, {"q": "recipe", "cursor": cursor})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestRecipeQueryCount(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        token_cache.clear()
+
+    def _add_recipes(self, count):
+        ingredients = list(Ingredient.objects.all()[:3])
+        for recipe in RecipeFactory.create_batch(count, tags=Tag.objects.all()[:3]):
+            for ingredient in ingredients:
+                IngredientUsageFactory.create(
+                    recipe=recipe, ingredient=ingredient, measure_id=1
+                )
+
+    def test_list(self):
+        url = reverse("recipe-list")
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()), 3)
+
+        self._add_recipes(10)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()), 13)
+
+    def test_compact_list(self):
+        self._add_recipes(10)
+        url = reverse("recipe-list")
+        with self.assertNumQueries(2):
+            response = self.client.get(url + "?expanded=false")
+        self.assertEqual(len(response.json()), 13)
+
+    def test_filtered_list(self):
+        self._add_recipes(10)
+        url = reverse("recipe-list")
+        with self.assertNumQueries(3):
+            response = self.client.get(url + "?absentLimit=0&ingredients=1,2,3")
+        self.assertEqual(len(response.json()), 10)
+
+    def test_detail(self):
+        url = reverse("recipe-detail", args=[1])
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()["ingredients"]), 5)
+
+    def test_authenticated_list(self):
+        token = TestUsers.get_user1_token()
+        Recipe.objects.get(pk=2).favorites.add(2)
+        self._add_recipes(10)
+
+        url = reverse("recipe-list")
+        with self.assertNumQueries(4):
+            response = self.client.get(url, HTTP_AUTHORIZATION=token)
+
+        favorites = [recipe["id"] for recipe in response.json() if recipe["favorite"]]
+        self.assertEqual(len(response.json()), 13)
+        self.assertEqual(favorites, [2])
+
+    def test_authenticated_detail(self):
+        token = TestUsers.get_user1_token()
+        Recipe.objects.get(pk=1).favorites.add(2)
+
+        url = reverse("recipe-detail", args=[1])
+        with self.assertNumQueries(4):
+            response = self.client.get(url, HTTP_AUTHORIZATION=token)
+        self.assertTrue(response.json()["favorite"])
+
+        url = reverse("recipe-detail", args=[2])
+        response = self.client.get(url, HTTP_AUTHORIZATION=token)
+        self.assertFalse(response.json()["favorite"])
+
+
+class TestRecipeImportView(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def _record(self, title, ingredient_id=1, tags=(1, 2)):
+        return {
+            "title": title,
+            "portions": 2,
+            "total_time": "0:30:00",
+            "instructions": "Recipe steps",
+            "ingredients": [
+                {
+                    "amount": 1,
+                    "ingredient": {"id": ingredient_id},
+                    "measure": {"id": 1},
+                },
+                {"amount": 2, "ingredient": {"name": "imported"}, "measure": {"id": 2}},
+            ],
+            "tags": list(tags),
+        }
+
+    def _post(self, records, token):
+        body = "\n".join(
+            record if isinstance(record, str) else json.dumps(record)
+            for record in records
+        )
+        return self.client.post(
+            reverse("recipe-import"),
+            data=body,
+            content_type="application/x-ndjson",
+            HTTP_AUTHORIZATION=token,
+        )
+
+    def _results(self, response):
+        body = b"".join(response.streaming_content).decode("utf-8")
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_import_by_staff(self):
+        records = [self._record(f"imported {i}") for i in range(5)]
+        records.insert(2, "{not json")
+        records.append(self._record("missing ingredient", ingredient_id=100))
+        records.append({"title": "incomplete"})
+
+        response = self._post(records, TestUsers.get_staff_token())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        *results, totals = self._results(response)
+        self.assertEqual(totals, {"created": 5, "failed": 3})
+        results.sort(key=lambda result: result["line"])
+        self.assertEqual([result["line"] for result in results], list(range(1, 9)))
+        self.assertIn("errors", results[2])
+        self.assertEqual(
+            results[6]["errors"], {"ingredients": ["Objects do not exist: 100"]}
+        )
+
+        recipe = Recipe.objects.get(pk=results[0]["id"])
+        self.assertEqual(recipe.author_id, 1)
+        self.assertEqual(recipe.ingredientusage_set.count(), 2)
+        self.assertEqual(recipe.tags.count(), 2)
+
+    def test_invalid_nested_data(self):
+        bad_ingredient = self._record("bad ingredient")
+        bad_ingredient["ingredients"][1]["ingredient"] = {"nme": "new"}
+        bad_amount = self._record("bad amount")
+        bad_amount["ingredients"][0]["amount"] = "lots"
+        bad_measure = self._record("bad measure")
+        bad_measure["ingredients"][0]["measure"] = {"name": "m" * 30}
+        records = [self._record("valid"), bad_ingredient, bad_amount, bad_measure]
+
+        response = self._post(records, TestUsers.get_staff_token())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        *results, totals = self._results(response)
+        self.assertEqual(totals, {"created": 1, "failed": 3})
+        errors = {result["line"]: result.get("errors") for result in results}
+        self.assertIsNone(errors[1])
+        self.assertIn("name", errors[2]["ingredients"][1]["ingredient"])
+        self.assertIn("amount", errors[3]["ingredients"][0])
+        self.assertIn("name", errors[4]["ingredients"][0]["measure"])
+        self.assertEqual(Recipe.objects.filter(title__startswith="bad").count(), 0)
+
+    def test_import_by_user(self):
+        response = self._post([self._record("imported")], TestUsers.get_user1_token())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Recipe.objects.filter(title="imported").exists())
+
+
+class TestConditionalRequests(APITestCase):
+    fixtures = ["users.json", "tags.json", "culinary.json"]
+
+    def setUp(self):
+        token_cache.clear()
+
+    def _get(self, url, token=None, **headers):
+        if token:
+            headers["HTTP_AUTHORIZATION"] = token
+        return self.client.get(url, **headers)
+
+    def _assert_not_modified(self, url, token=None):
+        response = self._get(url, token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        # the token was cached by the first request
+        with self.assertNumQueries(1):
+            response = self._get(url, token, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        return etag
+
+    def test_recipe_etag(self):
+        url = reverse("recipe-detail", args=[1])
+        etag = self._assert_not_modified(url)
+
+        Recipe.objects.get(pk=1).tags.add(Tag.objects.get(pk=2))
+        response = self._get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_recipe_etag_follows_ingredients(self):
+        url = reverse("recipe-detail", args=[1])
+        etag = self._assert_not_modified(url)
+
+        ingredient = Ingredient.objects.get(pk=1)
+        ingredient.name = "renamed"
+        ingredient.save()
+
+        response = self._get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        IngredientUsageFactory.create(
+            recipe=Recipe.objects.get(pk=1),
+            ingredient=Ingredient.objects.get(pk=20),
+            measure=Measure.objects.get(pk=1),
+        )
+        response = self._get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_recipe_etag_per_user(self):
+        url = reverse("recipe-detail", args=[1])
+        user1 = self._get(url, TestUsers.get_user1_token())
+        user2 = self._get(url, TestUsers.get_user2_token())
+
+        self.assertNotEqual(user1["ETag"], user2["ETag"])
+        self.assertIn("Authorization", user1["Vary"])
+
+        response = self._get(
+            url, TestUsers.get_user2_token(), HTTP_IF_NONE_MATCH=user1["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        url = reverse("recipe-detail", args=[2])
+        last_modified = self._get(url)["Last-Modified"]
+
+        response = self._get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self._get(
+            url, HTTP_IF_MODIFIED_SINCE="Sat, 01 Jan 2000 00:00:00 GMT"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ingredient_etag(self):
+        token = TestUsers.get_user1_token()
+        url = reverse("ingredients-detail", args=[1])
+        etag = self._assert_not_modified(url, token)
+
+        Ingredient.objects.filter(pk=1).update(name="changed")
+        self.assertEqual(
+            self._get(url, token, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+    def test_fridge_etag(self):
+        token = TestUsers.get_user1_token()
+        url = reverse("shelfs-detail", args=[2])
+        etag = self._assert_not_modified(url, token)
+
+        Fridge.objects.get(pk=2).shelf.remove(22)
+        response = self._get(url, token, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["shelf"]), 4)
+
+    def test_permissions_checked(self):
+        url = reverse("shelfs-detail", args=[2])
+        etag = self._get(url, TestUsers.get_user1_token())["ETag"]
+
+        response = self._get(url, TestUsers.get_user2_token(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self._get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from culinary.views import *
+from foodinfo.asyncviews import read_view
 
 router = DefaultRouter(trailing_slash=False)
 router.register(r"measures", measure_views.MeasureViewSet, "measures")
@@ -9,12 +10,18 @@ urlpatterns = [
     path("", include(router.urls)),
     path(
         "ingredients/",
-        ingredient_views.IngredientList.as_view(),
+        read_view(
+            ingredient_views.IngredientList.as_view(),
+            ingredient_views.AsyncIngredientList.as_view(),
+        ),
         name="ingredients-list",
     ),
     path(
         "ingredients/<str:name>/",
-        ingredient_views.IngredientList.as_view(),
+        read_view(
+            ingredient_views.IngredientList.as_view(),
+            ingredient_views.AsyncIngredientList.as_view(),
+        ),
         name="ingredients-list",
     ),
     path(
@@ -27,6 +34,16 @@ urlpatterns = [
         ingredient_views.IngredientEdit.as_view(),
         name="ingredients-edit",
     ),
+    path(
+        "autocomplete/ingredients",
+        autocomplete_views.IngredientAutocomplete.as_view(),
+        name="ingredients-autocomplete",
+    ),
+    path(
+        "autocomplete/measures",
+        autocomplete_views.MeasureAutocomplete.as_view(),
+        name="measures-autocomplete",
+    ),
     path("fridge/all", fridge_views.FridgeList.as_view(), name="shelfs-list"),
     path("fridge/<int:pk>", fridge_views.FridgeDetail.as_view(), name="shelfs-detail"),
     path(
@@ -39,6 +56,11 @@ urlpatterns = [
         conversion_views.ConversionList.as_view(),
         name="conversion-list",
     ),
+    path(
+        "conversion/batch",
+        conversion_views.ConversionBatch.as_view(),
+        name="conversion-batch",
+    ),
     path(
         "conversion/<int:utensil_pk>/<int:ingredient_pk>",
         conversion_views.ConversionDetail.as_view(),
@@ -49,8 +71,22 @@ urlpatterns = [
         conversion_views.ConversionEdit.as_view(),
         name="conversion-edit",
     ),
-    path("recipes/", recipe_views.RecipeList.as_view(), name="recipe-list"),
-    path("recipes/<int:pk>", recipe_views.RecipeDetail.as_view(), name="recipe-detail"),
+    path(
+        "recipes/",
+        read_view(
+            recipe_views.RecipeList.as_view(), recipe_views.AsyncRecipeList.as_view()
+        ),
+        name="recipe-list",
+    ),
+    path("recipes/import", recipe_views.RecipeImport.as_view(), name="recipe-import"),
+    path(
+        "recipes/<int:pk>",
+        read_view(
+            recipe_views.RecipeDetail.as_view(),
+            recipe_views.AsyncRecipeDetail.as_view(),
+        ),
+        name="recipe-detail",
+    ),
     path(
         "recipes/edit/<int:pk>", recipe_views.RecipeEdit.as_view(), name="recipe-edit"
     ),
@@ -1,4 +1,5 @@
 __all__ = [
+    "autocomplete_views",
     "conversion_views",
     "fridge_views",
     "ingredient_views",
@@ -0,0 +1,30 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from culinary.autocomplete import ingredient_names, measure_names
+
+
+class Autocomplete(APIView):
+    permission_classes = [permissions.AllowAny]
+    index = None
+    limit = 10
+    max_limit = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(int(request.query_params["limit"]), self.max_limit)
+        except (KeyError, ValueError):
+            limit = self.limit
+
+        matches = self.index.search(
+            request.query_params.get("q", ""), limit, request.user
+        )
+        return Response([{"id": id, "name": name} for id, name in matches])
+
+
+class IngredientAutocomplete(Autocomplete):
+    index = ingredient_names
+
+
+class MeasureAutocomplete(Autocomplete):
+    index = measure_names
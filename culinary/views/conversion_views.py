@@ -2,9 +2,13 @@ from django.db.utils import IntegrityError
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions, mixins, generics, status
 from rest_framework.response import Response
-from culinary.serializers import ConversionSerializer
+from rest_framework.views import APIView
+from culinary.conversions import conversion_table
+from culinary.serializers import ConversionRequestSerializer, ConversionSerializer
 from culinary.models import UtensilConversion
 from culinary.permissions import IsStaffOrReadOnly
+from foodinfo.streaming import StreamingListMixin
+from foodinfo.values import ValuesListMixin
 
 
 class ConversionDetail(mixins.RetrieveModelMixin, generics.GenericAPIView):
@@ -17,9 +21,10 @@ class ConversionDetail(mixins.RetrieveModelMixin, generics.GenericAPIView):
     def get_object(self):
         ingredient_id = self.kwargs["ingredient_pk"]
         utensil_id = self.kwargs["utensil_pk"]
+        queryset = UtensilConversion.objects.select_related("utensil", "ingredient")
 
         obj = get_object_or_404(
-            UtensilConversion, utensil_id=utensil_id, ingredient_id=ingredient_id
+            queryset, utensil_id=utensil_id, ingredient_id=ingredient_id
         )
         self.check_object_permissions(self.request, obj)
 
@@ -27,11 +32,16 @@ class ConversionDetail(mixins.RetrieveModelMixin, generics.GenericAPIView):
 
 
 class ConversionList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    StreamingListMixin,
+    ValuesListMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
-    queryset = UtensilConversion.objects.all()
+    queryset = UtensilConversion.objects.select_related("utensil", "ingredient")
     serializer_class = ConversionSerializer
     permission_classes = [IsStaffOrReadOnly]
+    ordering = ["id"]
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -58,3 +68,28 @@ class ConversionEdit(
 
     def delete(self, request, *args, **kwargs):
         return self.destroy(request, *args, **kwargs)
+
+
+class ConversionBatch(APIView):
+    """Converts a list of {ingredient, measure, amount} lines to grams in one
+    request; `grams` is null for lines without a conversion"""
+
+    permission_classes = [permissions.AllowAny]
+    max_lines = 1000
+
+    def post(self, request, *args, **kwargs):
+        serializer = ConversionRequestSerializer(
+            data=request.data, many=True, max_length=self.max_lines
+        )
+        serializer.is_valid(raise_exception=True)
+
+        results = [
+            {
+                **line,
+                "grams": conversion_table.grams(
+                    line["measure"], line["ingredient"], line["amount"]
+                ),
+            }
+            for line in serializer.validated_data
+        ]
+        return Response(results)
@@ -2,6 +2,7 @@ from rest_framework import mixins, generics
 from culinary.serializers import FridgeSerializer
 from culinary.models import Fridge
 from culinary.permissions import IsOwnerOrStaff
+from foodinfo.utils import ConditionalRetrieveMixin
 
 
 class FridgeList(
@@ -9,6 +10,7 @@ class FridgeList(
 ):
     serializer_class = FridgeSerializer
     permission_classes = [IsOwnerOrStaff]
+    ordering = ["name"]
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -23,16 +25,23 @@ class FridgeList(
     def get_queryset(self):
         user = self.request.user
         if not user.is_staff:
-            return Fridge.objects.filter(user_id=user.id)
+            return Fridge.objects.filter(user_id=user.id).order_by("name")
 
-        return Fridge.objects.all()
+        return Fridge.objects.all().order_by("name")
 
 
-class FridgeDetail(mixins.RetrieveModelMixin, generics.GenericAPIView):
+class FridgeDetail(
+    ConditionalRetrieveMixin, mixins.RetrieveModelMixin, generics.GenericAPIView
+):
     queryset = Fridge.objects.all()
     serializer_class = FridgeSerializer
     permission_classes = [IsOwnerOrStaff]
 
+    def version_queryset(self):
+        return Fridge.objects.select_related("user").only(
+            "id", "updated_at", "user__id"
+        )
+
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
@@ -2,6 +2,10 @@ from django.db.models import Q
 from rest_framework import permissions, mixins, generics
 from culinary.serializers import IngredientSerializer
 from culinary.models import Ingredient
+from foodinfo.asyncviews import AsyncReadMixin
+from foodinfo.utils import ConditionalRetrieveMixin
+from foodinfo.streaming import StreamingListMixin
+from foodinfo.values import ValuesListMixin
 from culinary.permissions import (
     HasAccessOrReadOnly,
     HasAccess,
@@ -22,20 +26,32 @@ class IngredientEdit(
         return self.destroy(request, *args, **kwargs)
 
 
-class IngredientDetail(mixins.RetrieveModelMixin, generics.GenericAPIView):
+class IngredientDetail(
+    ConditionalRetrieveMixin, mixins.RetrieveModelMixin, generics.GenericAPIView
+):
     queryset = Ingredient.objects.all().order_by("name")
     serializer_class = IngredientSerializer
     permission_classes = [HasAccess]
 
+    def version_queryset(self):
+        return Ingredient.objects.select_related("user").only(
+            "id", "updated_at", "user__id", "user__is_staff"
+        )
+
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
 
 class IngredientList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    StreamingListMixin,
+    ValuesListMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
     serializer_class = IngredientSerializer
     permission_classes = [HasAccessOrReadOnly, permissions.IsAuthenticatedOrReadOnly]
+    ordering = ["name"]
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -59,3 +75,12 @@ class IngredientList(
             filters.append(has_access)
 
         return Ingredient.objects.filter(*filters).order_by("name")
+
+
+class AsyncIngredientList(AsyncReadMixin, IngredientList):
+    """IngredientList reads on the async ORM, see foodinfo.asyncviews"""
+
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
@@ -9,6 +9,7 @@ class MeasureViewSet(viewsets.ModelViewSet):
     queryset = Measure.objects.all().order_by("name")
     serializer_class = MeasureSerializer
     permission_classes = [IsStaffOrReadOnly]
+    ordering = ["name"]
 
     def get_queryset(self):
         filters = []
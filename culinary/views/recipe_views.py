@@ -1,10 +1,28 @@
-from django.db.models import Q, Count, F
+from django.conf import settings
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied, ParseError
 from rest_framework import mixins, generics, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from culinary.bulk import import_recipes
+from culinary.documents import assemble, document_bodies, documents_queryset
+from culinary.facets import recipe_facets
 from culinary.serializers import RecipeCreateSerializer, RecipeSerializer
 from culinary.models import Fridge, Recipe
 from culinary.permissions import IsOwnerOrStaff
+from culinary.search import full_text_search, rank_by_coverage, recipe_index
+from foodinfo.asyncviews import AsyncReadMixin
+from foodinfo.metrics import serializing
+from foodinfo.utils import ConditionalRetrieveMixin, render_json
+from foodinfo.replicas import mark_written
+from foodinfo.streaming import (
+    NDJSONRenderer,
+    StreamingListMixin,
+    streaming_response,
+)
+from foodinfo.values import ValuesListMixin
 
 
 class RecipeEdit(
@@ -21,18 +39,76 @@ class RecipeEdit(
         return self.destroy(request, *args, **kwargs)
 
 
-class RecipeDetail(mixins.RetrieveModelMixin, generics.GenericAPIView):
+class RecipeDocumentsMixin:
+    """Serves full recipe representations from stored documents
+    (culinary.documents) when RECIPE_DOCUMENTS is on"""
+
+    def use_documents(self):
+        return bool(
+            settings.RECIPE_DOCUMENTS
+            and self.request.method == "GET"
+            and self.request.accepted_renderer.format == "json"
+            and self.get_serializer_fields() is None
+            and not getattr(self, "streaming", False)
+        )
+
+    def get_serializer_fields(self):
+        return None
+
+    def prefetch(self, queryset):
+        if self.use_documents():
+            return documents_queryset(queryset, self.request.user)
+        return RecipeSerializer.prefetch_plan(
+            queryset, self.get_serializer_fields(), self.request.user
+        )
+
+    def documents_response(self, recipes, many=True):
+        bodies = document_bodies(recipes)
+        with serializing():
+            items = [
+                assemble(recipe, bodies[recipe.pk], self.request) for recipe in recipes
+            ]
+        body = f"[{','.join(items)}]" if many else items[0]
+        return HttpResponse(body, content_type="application/json")
+
+
+class RecipeDetail(
+    RecipeDocumentsMixin,
+    ConditionalRetrieveMixin,
+    mixins.RetrieveModelMixin,
+    generics.GenericAPIView,
+):
     queryset = Recipe.objects.all().order_by("title")
     serializer_class = RecipeSerializer
+    # favorite is per user
+    vary_on_user = True
 
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
+    def get_queryset(self):
+        return self.prefetch(super().get_queryset())
+
+    def render_object(self, obj):
+        if self.use_documents():
+            return self.documents_response([obj], many=False)
+        return super().render_object(obj)
+
 
 class RecipeList(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    RecipeDocumentsMixin,
+    StreamingListMixin,
+    ValuesListMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    ordering = ["title"]
+    search_ordering = None
+    # recipes ranked by fridge coverage, by default and at most
+    ranked_limit = 100
+    max_ranked_limit = 1000
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -40,6 +116,56 @@ class RecipeList(
     def post(self, request, *args, **kwargs):
         return self.create(request, *args, **kwargs)
 
+    def use_facets(self):
+        return bool(
+            self.request.method == "GET"
+            and self.request.query_params.get("facets") == "true"
+            and not getattr(self, "streaming", False)
+        )
+
+    def filter_queryset(self, queryset):
+        # kept for the facets of the page's filters
+        self.filtered_queryset = super().filter_queryset(queryset)
+        return self.filtered_queryset
+
+    def list(self, request, *args, **kwargs):
+        response = self.list_page(request, *args, **kwargs)
+        if self.use_facets():
+            facets = recipe_facets(self.filtered_queryset)
+            response = self.add_facets(response, facets)
+        return response
+
+    def add_facets(self, response, facets):
+        """The page as {"results": page, "facets": facets}"""
+        if isinstance(response, Response):
+            response.data = {"results": response.data, "facets": facets}
+            return response
+
+        # stored documents, already rendered
+        response.content = b"".join(
+            [
+                b'{"results":',
+                response.content,
+                b',"facets":',
+                render_json(facets).encode("utf-8"),
+                b"}",
+            ]
+        )
+        return response
+
+    def list_page(self, request, *args, **kwargs):
+        if not self.use_documents():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        response = self.documents_response(list(queryset if page is None else page))
+        if page is not None:
+            link = self.get_paginated_response(None).get("Link")
+            if link:
+                response["Link"] = link
+        return response
+
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
             serializer.save(author=self.request.user)
@@ -53,17 +179,51 @@ class RecipeList(
         serializer_class = self.get_serializer_class()
 
         if serializer_class == RecipeSerializer:
-            fields = None
-            expanded = self.request.query_params.get("expanded")
-            if expanded == "false":
-                fields = ["id", "title", "thumbnail", "author", "tags"]
-
-            kwargs["fields"] = fields
+            kwargs["fields"] = self.get_serializer_fields()
 
         kwargs["context"] = self.get_serializer_context()
         return serializer_class(*args, **kwargs)
 
+    def use_values(self):
+        return super().use_values() and not self.use_documents()
+
+    def get_values_overrides(self):
+        if self.request.user.is_authenticated:
+            return {"favorite": ("is_favorite", None)}
+        return {"favorite": (None, lambda value: None)}
+
+    def prefetch(self, queryset):
+        if self.use_values():
+            # values() rows get their relations from ValuesPlan
+            return RecipeSerializer.prefetch_plan(
+                queryset, ["favorite"], self.request.user
+            )
+        return super().prefetch(queryset)
+
+    def get_serializer_fields(self):
+        expanded = self.request.query_params.get("expanded")
+        if expanded == "false":
+            return ["id", "title", "thumbnail", "author", "tags"]
+        return None
+
+    def get_ordering(self):
+        return self.search_ordering or self.ordering
+
     def get_queryset(self):
+        queryset = self.get_filtered_queryset()
+
+        q = self.request.query_params.get("q")
+        if q:
+            queryset, ordering = full_text_search(queryset, q)
+            # coverage ranks first, relevance breaks its ties
+            self.search_ordering = (self.search_ordering or []) + ordering
+            queryset = queryset.order_by(*self.search_ordering)
+
+        if self.request.method == "GET":
+            queryset = self.prefetch(queryset)
+        return queryset
+
+    def get_filtered_queryset(self):
         filters = []
 
         calories_above = self.request.query_params.get("caloriesAbove")
@@ -78,11 +238,13 @@ class RecipeList(
         fridgeId = self.request.query_params.get("fridgeId")
         fridge_ingredients = None
         absent_limit = self.request.query_params.get("absentLimit")
+        rank = self.request.query_params.get("rank")
         tags = self.request.query_params.get("tags")
+        coverage = absent_limit or rank
 
         if title:
             filters.append(Q(title__contains=title))
-        if ingredients and not absent_limit:
+        if ingredients and not coverage:
             filters.append(
                 Q(ingredientusage__ingredient__pk__in=ingredients.split(","))
             )
@@ -99,14 +261,14 @@ class RecipeList(
                 raise PermissionDenied()
 
             fridge_ingredients = fridge.shelf.all().values_list("id", flat=True)
-            if not absent_limit:
+            if not coverage:
                 filters.append(
                     Q(ingredientusage__ingredient__pk__in=fridge_ingredients)
                 )
         if tags:
             filters.append(Q(tags__pk__in=tags.split(",")))
 
-        if absent_limit:
+        if coverage:
             if ingredients:
                 include = ingredients.split(",")
             elif fridge_ingredients:
@@ -114,6 +276,20 @@ class RecipeList(
             else:
                 raise ParseError()
 
+            if rank:
+                return self.get_ranked_queryset(include, rank, absent_limit, filters)
+
+            if settings.RECIPE_SEARCH_INDEX:
+                try:
+                    include = [int(id) for id in include]
+                    absent_limit = int(absent_limit)
+                except ValueError:
+                    raise ParseError()
+
+                matched = recipe_index.match(include, absent_limit)
+                filters.append(Q(pk__in=matched))
+                return Recipe.objects.filter(*filters).distinct().order_by("title")
+
             filters.append(Q(absent__lte=absent_limit))
 
             return Recipe.objects.annotate(
@@ -126,3 +302,107 @@ class RecipeList(
             ).filter(*filters)
 
         return Recipe.objects.filter(*filters).distinct().order_by("title")
+
+    def get_ranked_queryset(self, include, rank, absent_limit, filters):
+        """
+        The `top` recipes with the largest share of their ingredients in
+        `include`, best first. rank=weighted weighs usages by ingredient
+        category (RECIPE_CATEGORY_WEIGHTS), absentLimit still drops
+        recipes missing more ingredients.
+        """
+        if rank not in ("coverage", "weighted"):
+            raise ParseError()
+        weights = settings.RECIPE_CATEGORY_WEIGHTS if rank == "weighted" else {}
+
+        try:
+            include = [int(id) for id in include]
+            absent_limit = int(absent_limit) if absent_limit else None
+            top = int(self.request.query_params.get("top", self.ranked_limit))
+        except ValueError:
+            raise ParseError()
+        if top <= 0:
+            raise ParseError()
+        top = min(top, self.max_ranked_limit)
+
+        # a search term narrows the candidates, get_queryset() only orders
+        # the ranked recipes by its relevance
+        candidates = Recipe.objects.filter(*filters)
+        q = self.request.query_params.get("q")
+        if q:
+            candidates, _ = full_text_search(candidates, q)
+
+        if settings.RECIPE_SEARCH_INDEX:
+            accept = None
+            if filters or q:
+
+                def accept(recipe_ids):
+                    queryset = candidates.filter(pk__in=recipe_ids)
+                    return set(queryset.values_list("pk", flat=True))
+
+            ranked = recipe_index.rank(include, top, weights, absent_limit, accept)
+        else:
+            ranked = rank_by_coverage(candidates, include, top, weights, absent_limit)
+
+        self.search_ordering = ["-coverage"]
+        coverage = Case(
+            *[When(pk=recipe_id, then=Value(score)) for recipe_id, score in ranked],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        return Recipe.objects.filter(
+            pk__in=[recipe_id for recipe_id, _ in ranked]
+        ).annotate(coverage=coverage)
+
+
+class RecipeImport(APIView):
+    """
+    Bulk create recipes from a newline-delimited JSON upload.
+
+    The response is newline-delimited JSON too, streamed as the upload is
+    read: a result per record, in the order they are written (invalid
+    records first within their chunk), then {"created": n, "failed": m}.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    chunk_size = 500
+
+    def post(self, request, *args, **kwargs):
+        lines = request.stream or []
+        # the recipes are written once ReplicaMiddleware returned
+        mark_written()
+        return streaming_response(
+            request,
+            self.stream_results(import_recipes(lines, request.user, self.chunk_size)),
+            NDJSONRenderer.media_type,
+            self.chunk_size,
+        )
+
+    def stream_results(self, results):
+        created = failed = 0
+        for result in results:
+            if "id" in result:
+                created += 1
+            else:
+                failed += 1
+            yield render_json(result) + "\n"
+        yield render_json({"created": created, "failed": failed}) + "\n"
+
+
+class AsyncRecipeList(AsyncReadMixin, RecipeList):
+    """RecipeList reads on the async ORM, see foodinfo.asyncviews"""
+
+    http_method_names = ["get", "head", "options"]
+    # the fridgeId filter and the search index look rows up
+    queryset_queries = True
+
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+
+class AsyncRecipeDetail(AsyncReadMixin, RecipeDetail):
+    """RecipeDetail on the async ORM, see foodinfo.asyncviews"""
+
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request, *args, **kwargs):
+        return await self.aretrieve(request, *args, **kwargs)
@@ -0,0 +1,146 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import Http404
+from django.urls import URLPattern
+from rest_framework.response import Response
+
+from foodinfo.utils import ConditionalRetrieveMixin
+
+SAFE_METHODS = ("GET", "HEAD")
+
+
+def async_reads(sync_view, async_view):
+    """
+    A view serving GET and HEAD with `async_view` and every other method
+    with `sync_view`, in a thread, so reads and writes can share a URL.
+    """
+    threaded_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await async_view(request, *args, **kwargs)
+        return await threaded_view(request, *args, **kwargs)
+
+    # named after the sync view, as routing and logging look views up by it
+    view.__module__ = sync_view.__module__
+    view.__name__ = view.__qualname__ = sync_view.__name__
+    view.csrf_exempt = True
+    view.async_view = async_view
+    return markcoroutinefunction(view)
+
+
+def read_view(sync_view, async_view):
+    """async_reads() of the views when ASYNC_READ_VIEWS is on, else
+    `sync_view` alone"""
+    if settings.ASYNC_READ_VIEWS:
+        return async_reads(sync_view, async_view)
+    return sync_view
+
+
+def read_routes(urlpatterns, async_viewsets):
+    """
+    A router's `urlpatterns` with the list and retrieve routes of the
+    viewsets in `async_viewsets` ({viewset: async viewset}) served by
+    read_view(), so they keep the router's paths, names and suffixes.
+    """
+    routes = []
+    for pattern in urlpatterns:
+        view = pattern.callback
+        action = getattr(view, "actions", {}).get("get")
+        async_viewset = async_viewsets.get(getattr(view, "cls", None))
+        if async_viewset is not None and action in ("list", "retrieve"):
+            async_view = async_viewset.as_view({"get": f"a{action}"}, **view.initkwargs)
+            pattern = URLPattern(
+                pattern.pattern,
+                read_view(view, async_view),
+                pattern.default_args,
+                pattern.name,
+            )
+        routes.append(pattern)
+    return routes
+
+
+class AsyncReadMixin:
+    """
+    Native async list and retrieve for DRF generic views, returning what
+    the view's own list() and retrieve() do.
+
+    Authentication, permissions and content negotiation run once in a
+    thread, rows are read with aiterator() and aget() and serialized on
+    the event loop, which is fine as long as everything the serializer
+    needs is loaded by the queryset. Requests the async path doesn't
+    cover (see use_async) are handed to the sync implementation in a
+    thread.
+    """
+
+    # set when get_queryset() itself queries, it then runs in a thread
+    queryset_queries = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(
+                self, request.method.lower(), self.http_method_not_allowed
+            )
+            response = handler(request, *args, **kwargs)
+            if iscoroutinefunction(handler):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    def use_async(self):
+        return bool(
+            self.request.method in SAFE_METHODS
+            and self.request.accepted_renderer.format == "json"
+            and "HTTP_IF_NONE_MATCH" not in self.request.META
+            and "HTTP_IF_MODIFIED_SINCE" not in self.request.META
+            and not getattr(self, "streaming", False)
+            and not (hasattr(self, "use_documents") and self.use_documents())
+            and not (hasattr(self, "use_values") and self.use_values())
+            and not (hasattr(self, "use_facets") and self.use_facets())
+        )
+
+    async def aget_queryset(self):
+        if self.queryset_queries:
+            return await sync_to_async(self._filtered_queryset)()
+        return self._filtered_queryset()
+
+    def _filtered_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    async def alist(self, request, *args, **kwargs):
+        if not self.use_async():
+            return await sync_to_async(self.list)(request, *args, **kwargs)
+
+        queryset = await self.aget_queryset()
+        page = await self.paginator.apaginate_queryset(queryset, request, self)
+        serializer = self.get_serializer(page, many=True)
+        return self.paginator.get_paginated_response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        if not self.use_async():
+            return await sync_to_async(self.retrieve)(request, *args, **kwargs)
+
+        queryset = await self.aget_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (queryset.model.DoesNotExist, TypeError, ValueError):
+            raise Http404
+        self.check_object_permissions(request, obj)
+
+        response = Response(self.get_serializer(obj).data)
+        if isinstance(self, ConditionalRetrieveMixin):
+            response = self._add_validators(response, obj)
+        return response
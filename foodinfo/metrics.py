@@ -0,0 +1,386 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# the Sample of the request being handled
+_sample = ContextVar("metrics_sample", default=None)
+
+
+class Sample:
+    """What one request did, collected while it is handled"""
+
+    __slots__ = ("queries", "query_seconds", "serializer_seconds", "serializing")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - start
+
+
+@contextmanager
+def serializing():
+    """Count the time spent inside towards the request's serializer time,
+    unless an outer block already does"""
+    sample = _sample.get()
+    if sample is None or sample.serializing:
+        yield
+        return
+
+    sample.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.serializer_seconds += time.perf_counter() - start
+        sample.serializing = False
+
+
+class TimedSerializerMixin:
+    """Counts to_representation towards the request's serializer time.
+    Written out rather than using serializing(), it runs for every item."""
+
+    def to_representation(self, instance):
+        sample = _sample.get()
+        if sample is None or sample.serializing:
+            return super().to_representation(instance)
+
+        sample.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            sample.serializer_seconds += time.perf_counter() - start
+            sample.serializing = False
+
+
+class RouteStats:
+    __slots__ = (
+        "statuses",
+        "latency_buckets",
+        "latency_sum",
+        "query_buckets",
+        "queries",
+        "query_seconds",
+        "serializer_seconds",
+        "response_bytes",
+    )
+
+    def __init__(self):
+        # status code -> requests
+        self.statuses = {}
+        # per bucket counts, the last one for everything above the bounds
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.query_buckets = [0] * (len(QUERY_BUCKETS) + 1)
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.response_bytes = 0
+
+    def merge(self, other):
+        for status, count in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        for i, count in enumerate(other.latency_buckets):
+            self.latency_buckets[i] += count
+        for i, count in enumerate(other.query_buckets):
+            self.query_buckets[i] += count
+        self.latency_sum += other.latency_sum
+        self.queries += other.queries
+        self.query_seconds += other.query_seconds
+        self.serializer_seconds += other.serializer_seconds
+        self.response_bytes += other.response_bytes
+
+
+class Metrics:
+    """
+    Per route and method request metrics.
+
+    Every thread records into its own (route, method) -> RouteStats dict,
+    so handling a request takes no lock; the lock is only taken the first
+    time a thread records and when the dicts are merged for export. A
+    merge may see a request half recorded by another thread, which is
+    fine for monitoring. Stores of finished threads are kept, counters
+    never go down.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stores = []
+
+    def _store(self):
+        store = getattr(self._local, "store", None)
+        if store is None:
+            store = self._local.store = {}
+            with self._lock:
+                self._stores.append(store)
+        return store
+
+    def _stats(self, route, method):
+        store = self._store()
+        stats = store.get((route, method))
+        if stats is None:
+            stats = store[route, method] = RouteStats()
+        return stats
+
+    def record(self, route, method, status, seconds, sample, response_bytes):
+        stats = self._stats(route, method)
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.latency_buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        stats.latency_sum += seconds
+        stats.query_buckets[bisect_left(QUERY_BUCKETS, sample.queries)] += 1
+        stats.queries += sample.queries
+        stats.query_seconds += sample.query_seconds
+        stats.serializer_seconds += sample.serializer_seconds
+        stats.response_bytes += response_bytes
+
+    def record_bytes(self, route, method, response_bytes):
+        self._stats(route, method).response_bytes += response_bytes
+
+    def clear(self):
+        with self._lock:
+            for store in self._stores:
+                store.clear()
+
+    def collect(self):
+        """Merged (route, method) -> RouteStats of every thread"""
+        with self._lock:
+            stores = list(self._stores)
+
+        merged = {}
+        for store in stores:
+            for key, stats in list(store.items()):
+                merged.setdefault(key, RouteStats()).merge(stats)
+        return dict(sorted(merged.items()))
+
+
+metrics = Metrics()
+
+
+def _route(request):
+    match = request.resolver_match
+    if match is None:
+        return "unmatched"
+    return "/" + match.route
+
+
+class MetricsMiddleware:
+    """
+    Records latency, database queries and their time, serializer time and
+    response size of every request in `metrics`, by URL pattern.
+
+    Queries are counted with an execute_wrapper on every database
+    connection. Streamed responses add their size as they finish sending,
+    counted by a wrapper of the same kind as their content, so async
+    content (foodinfo.streaming under ASGI) stays async and streamed.
+    Works both ways under ASGI, so async views stay on the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with self._measure() as measure:
+            response = self.get_response(request)
+        return self._record(request, response, *measure)
+
+    async def __acall__(self, request):
+        with self._measure() as measure:
+            response = await self.get_response(request)
+        return self._record(request, response, *measure)
+
+    @contextmanager
+    def _measure(self):
+        sample = Sample()
+        token = _sample.set(sample)
+        measure = [sample, time.perf_counter()]
+        try:
+            with ExitStack() as stack:
+                # connections are per context, sync_to_async code shares them
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample))
+                yield measure
+        finally:
+            _sample.reset(token)
+            measure[1] = time.perf_counter() - measure[1]
+
+    def _record(self, request, response, sample, seconds):
+        route, method = _route(request), request.method
+        if response.streaming:
+            count = self._acount if response.is_async else self._count
+            response.streaming_content = count(
+                response.streaming_content, route, method
+            )
+            size = 0
+        else:
+            size = len(response.content)
+        metrics.record(route, method, response.status_code, seconds, sample, size)
+        return response
+
+    def _count(self, content, route, method):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            metrics.record_bytes(route, method, size)
+
+    async def _acount(self, content, route, method):
+        size = 0
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            metrics.record_bytes(route, method, size)
+
+
+def _labels(**labels):
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+
+
+def _histogram(lines, name, bounds, buckets, total, labels):
+    cumulative = 0
+    for bound, count in zip((*bounds, "+Inf"), buckets):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {total}")
+    lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+
+def _header(lines, name, kind, help):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def export():
+    """Collected metrics in the Prometheus text exposition format"""
+    from account.authentication import token_cache
+
+    collected = metrics.collect()
+    lines = []
+
+    _header(lines, "foodinfo_requests_total", "counter", "Requests by response status")
+    for (route, method), stats in collected.items():
+        for status, count in sorted(stats.statuses.items()):
+            labels = _labels(route=route, method=method, status=status)
+            lines.append(f"foodinfo_requests_total{{{labels}}} {count}")
+
+    _header(
+        lines,
+        "foodinfo_request_duration_seconds",
+        "histogram",
+        "Time to handle requests",
+    )
+    for (route, method), stats in collected.items():
+        _histogram(
+            lines,
+            "foodinfo_request_duration_seconds",
+            LATENCY_BUCKETS,
+            stats.latency_buckets,
+            stats.latency_sum,
+            _labels(route=route, method=method),
+        )
+
+    _header(lines, "foodinfo_db_queries", "histogram", "Database queries per request")
+    for (route, method), stats in collected.items():
+        _histogram(
+            lines,
+            "foodinfo_db_queries",
+            QUERY_BUCKETS,
+            stats.query_buckets,
+            stats.queries,
+            _labels(route=route, method=method),
+        )
+
+    counters = (
+        ("foodinfo_db_query_seconds_total", "query_seconds", "Time spent in queries"),
+        (
+            "foodinfo_serializer_seconds_total",
+            "serializer_seconds",
+            "Time spent rendering objects to data",
+        ),
+        ("foodinfo_response_bytes_total", "response_bytes", "Response body sizes"),
+    )
+    for name, attribute, help in counters:
+        _header(lines, name, "counter", help)
+        for (route, method), stats in collected.items():
+            labels = _labels(route=route, method=method)
+            lines.append(f"{name}{{{labels}}} {getattr(stats, attribute)}")
+
+    cache = token_cache.stats()
+    for name, kind, help, value in (
+        ("foodinfo_token_cache_hits_total", "counter", "Cached tokens", cache["hits"]),
+        (
+            "foodinfo_token_cache_misses_total",
+            "counter",
+            "Tokens looked up",
+            cache["misses"],
+        ),
+        ("foodinfo_token_cache_entries", "gauge", "Tokens cached", cache["size"]),
+    ):
+        _header(lines, name, kind, help)
+        lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data.encode(self.charset)
+
+
+class MetricsView(APIView):
+    """Request metrics for Prometheus, staff only"""
+
+    permission_classes = [IsAdminUser]
+    renderer_classes = [PrometheusRenderer, JSONRenderer]
+
+    def get(self, request):
+        return Response(export(), content_type="text/plain; version=0.0.4")
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # errors are rendered as JSON whatever was asked for
+        if response.exception:
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
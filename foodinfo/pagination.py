@@ -0,0 +1,200 @@
+import json
+from base64 import b64decode, b64encode
+from functools import reduce
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.db.models import Q, prefetch_related_objects
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginates by the view's `ordering` with an `id` tiebreak, seeking
+    past the last row seen instead of counting an offset, so every page
+    costs the same no matter how deep it is.
+
+    Response bodies stay plain lists; next and previous pages are
+    advertised in the `Link` header.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "pageSize"
+    page_size = 100
+    max_page_size = 1000
+    ordering = ("id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() reading the page with aiterator()"""
+        # aiterator() doesn't run prefetches, they run once the page is read
+        lookups = queryset._prefetch_related_lookups
+        queryset = self.page_queryset(queryset.prefetch_related(None), request, view)
+        results = [obj async for obj in queryset.aiterator()]
+        if lookups:
+            await sync_to_async(prefetch_related_objects)(results, *lookups)
+        return self.set_page(results)
+
+    def page_queryset(self, queryset, request, view=None):
+        """The queryset of the requested page, plus one row to tell whether
+        there is another page"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor["reverse"])
+
+        if reverse:
+            ordering = [self._reverse_field(field) for field in self.ordering]
+        else:
+            ordering = self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            position = self._clean_position(queryset, ordering, cursor["position"])
+            try:
+                queryset = queryset.filter(self._seek(ordering, position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        self.cursor = cursor
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if self.cursor and self.cursor["reverse"]:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        links = []
+        if self.has_next and self.page:
+            links.append((self.get_next_link(), "next"))
+        if self.has_previous and self.page:
+            links.append((self.get_previous_link(), "previous"))
+
+        headers = {}
+        if links:
+            headers["Link"] = ", ".join(f'<{url}>; rel="{rel}"' for url, rel in links)
+
+        return Response(data, headers=headers)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, view):
+        if hasattr(view, "get_ordering"):
+            ordering = view.get_ordering()
+        else:
+            ordering = getattr(view, "ordering", None)
+        ordering = ordering or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+
+        ordering = tuple(ordering)
+        if "id" not in ordering and "-id" not in ordering:
+            ordering += ("id",)
+        return ordering
+
+    def get_next_link(self):
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        if isinstance(instance, dict):
+            # values() rows
+            position = [instance[field.lstrip("-")] for field in self.ordering]
+        else:
+            position = [getattr(instance, field.lstrip("-")) for field in self.ordering]
+        token = json.dumps({"position": position, "reverse": reverse})
+        token = b64encode(token.encode("utf-8")).decode("ascii")
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            cursor = json.loads(b64decode(token.encode("ascii")).decode("utf-8"))
+            position, reverse = cursor["position"], cursor["reverse"]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {"position": position, "reverse": bool(reverse)}
+
+    def _clean_position(self, queryset, ordering, position):
+        """The cursor position converted to the types of the ordering fields,
+        so a tampered cursor is a 404 instead of failing in the query"""
+        cleaned = []
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            try:
+                if name in queryset.query.annotations:
+                    model_field = queryset.query.annotations[name].output_field
+                else:
+                    model_field = queryset.model._meta.get_field(name)
+            except (FieldDoesNotExist, FieldError):
+                # a lookup across relations, checked by the query
+                cleaned.append(value)
+                continue
+
+            if value is None or isinstance(value, (list, dict)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                cleaned.append(model_field.to_python(value))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def _reverse_field(self, field):
+        return field[1:] if field.startswith("-") else "-" + field
+
+    def _seek(self, ordering, position):
+        """Lexicographic "after this row" filter for the given ordering:
+        a >= x AND ((a > x) OR (a = x AND b > y) OR ...), the redundant
+        bound lets the database walk an index on the ordering instead of
+        sorting every row the OR matches"""
+        clauses = []
+        for i, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+
+            equal = {f.lstrip("-"): v for f, v in zip(ordering[:i], position[:i])}
+            equal[f"{name}__{lookup}"] = position[i]
+            clauses.append(Q(**equal))
+
+        first = ordering[0]
+        bound = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{bound}": position[0]}) & reduce(
+            lambda a, b: a | b, clauses
+        )
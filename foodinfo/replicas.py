@@ -0,0 +1,178 @@
+import random
+import sqlite3
+from contextlib import closing
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# apps whose views and models read from replicas
+REPLICA_APPS = ("culinary", "tags")
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PIN_COOKIE = "replica_pin"
+
+# the ReadState of the request being handled
+_state = ContextVar("replica_state", default=None)
+
+
+def _pin_key(user):
+    return f"replicas:pin:{user.pk}"
+
+
+def mark_written():
+    """Pin the client of the request being handled as if it wrote, for
+    views whose writes happen while a streamed response is sent, after
+    ReplicaMiddleware returned"""
+    state = _state.get()
+    if state is not None:
+        state.wrote = True
+
+
+class ReadState:
+    """Where the request being handled reads from"""
+
+    __slots__ = ("request", "alias", "wrote")
+
+    def __init__(self, request):
+        self.request = request
+        # the replica picked for the request, or DEFAULT_DB_ALIAS when it
+        # must read its client's writes
+        self.alias = None
+        self.wrote = False
+
+    def read_alias(self):
+        if self.wrote or not settings.DATABASE_REPLICAS or not self.replica_view():
+            return None
+        if self.alias is None:
+            # one replica for the whole request, so it reads one snapshot
+            pinned = self.pinned()
+            self.alias = (
+                DEFAULT_DB_ALIAS
+                if pinned
+                else random.choice(settings.DATABASE_REPLICAS)
+            )
+        return self.alias
+
+    def replica_view(self):
+        match = self.request.resolver_match
+        return bool(
+            self.request.method in SAFE_METHODS
+            and match is not None
+            and match.func.__module__.split(".")[0] in REPLICA_APPS
+        )
+
+    def pinned(self):
+        """Whether the client wrote recently enough for replicas to lag"""
+        if PIN_COOKIE in self.request.COOKIES:
+            return True
+        # set by DRF once it authenticated the request
+        user = getattr(self.request, "user", None)
+        return bool(
+            user is not None
+            and user.is_authenticated
+            and cache.get(_pin_key(user)) is not None
+        )
+
+
+class ReplicaRouter:
+    """
+    Sends reads of culinary and tags models to DATABASE_REPLICAS while
+    ReplicaMiddleware handles a safe request to a culinary or tags view.
+
+    Everything else uses the default database: writes, reads of other
+    apps (tokens and users, which must never lag), reads outside
+    requests, and every read of a request that wrote or whose client
+    wrote in the last REPLICA_PIN_SECONDS.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or model._meta.app_label not in REPLICA_APPS:
+            return None
+        return state.read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the default database
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from the default database
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Lets ReplicaRouter send the reads of safe requests to culinary and
+    tags views to a replica, and pins the client to the default database
+    for REPLICA_PIN_SECONDS once a request wrote: with a cookie, and for
+    authenticated users in the cache, as token clients rarely keep
+    cookies. The cache pin only holds across workers when the default
+    cache is shared between them.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = ReadState(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response, state)
+
+    async def __acall__(self, request):
+        state = ReadState(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response, state)
+
+    def _pin(self, request, response, state):
+        if not state.wrote or not settings.DATABASE_REPLICAS:
+            return response
+
+        seconds = settings.REPLICA_PIN_SECONDS
+        response.set_cookie(PIN_COOKIE, "1", max_age=seconds, httponly=True)
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            cache.set(_pin_key(user), True, seconds)
+        return response
+
+
+def copy_database(alias, source=DEFAULT_DB_ALIAS):
+    """Overwrite the SQLite database of `alias` with a copy of `source`,
+    standing in for replication in development and tests"""
+    for name in (alias, source):
+        if connections[name].vendor != "sqlite":
+            raise ValueError(f"{name} is not a SQLite database")
+
+    connections[alias].close()
+    connections[source].ensure_connection()
+    target = connections[alias].settings_dict["NAME"]
+    with closing(sqlite3.connect(target)) as copy:
+        connections[source].connection.backup(copy)
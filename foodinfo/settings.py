@@ -58,11 +58,56 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly"
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "account.authentication.CachedTokenAuthentication",
     ],
     "EXCEPTION_HANDLER": "foodinfo.utils.custom_exception_handler",
+    "DEFAULT_PAGINATION_CLASS": "foodinfo.pagination.KeysetPagination",
 }
 
+# Answer absentLimit recipe searches from the in-process ingredient index
+# (culinary.search) instead of aggregating IngredientUsage on every request
+RECIPE_SEARCH_INDEX = False
+
+# Weights of ingredient usages by category when recipes are ranked by
+# weighted fridge coverage (rank=weighted), categories left out weigh 1
+RECIPE_CATEGORY_WEIGHTS = {"Spices": 0.25, "Seasonings": 0.25}
+
+# How long cached tag and tag category responses are kept, in seconds
+# (tags.cache). Every Tag/TagCategory change invalidates them through a
+# version key in the default cache, which must be shared by every worker
+# (Redis, Memcached, the database cache) for the change to reach them all;
+# with the per-process local memory cache, the other workers keep serving
+# their copy for up to this long.
+TAG_CATALOGUE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Serve full recipe representations from documents stored in
+# RecipeDocument (culinary.documents), rebuilt when writes commit
+# (culinary.signals); reads never write them. Writes affecting many recipes
+# have them rebuilt in batches, once none has arrived for
+# RECIPE_DOCUMENTS_DEBOUNCE seconds, and reads serialize them until then.
+RECIPE_DOCUMENTS = False
+RECIPE_DOCUMENTS_DEBOUNCE = 2.0
+
+# Render recipe, ingredient and conversion lists from values() rows
+# (foodinfo.values) instead of model instances and serializer fields
+VALUES_SERIALIZATION = False
+
+# Authenticated tokens are cached in process (account.authentication) for
+# up to TOKEN_CACHE_TTL seconds, keeping at most TOKEN_CACHE_SIZE of them
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_SIZE = 10000
+
+# Recompute the nutrition of recipes affected by ingredient, conversion and
+# usage changes (culinary.nutrition, needs numpy and scipy). Changes are
+# batched until none has arrived for NUTRITION_DEBOUNCE seconds.
+NUTRITION_PROPAGATION = False
+NUTRITION_DEBOUNCE = 2.0
+
+# Serve GET of the recipe list and detail, ingredient list and tags from
+# native async views (foodinfo.asyncviews) when running under ASGI. Read
+# when the URLconf is loaded.
+ASYNC_READ_VIEWS = False
+
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_UNIQUE_EMAIL = True
 ACCOUNT_EMAIL_VERIFICATION = "mandatory"
@@ -78,11 +123,15 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = "/tmp/app-messages"  # change this to a proper location
 
 MIDDLEWARE = [
+    # first, so it times everything below (foodinfo.metrics, see /api/metrics)
+    "foodinfo.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # inside the session middleware, so saving sessions doesn't pin clients
+    "foodinfo.replicas.ReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -118,6 +167,23 @@ DATABASES = {
     }
 }
 
+# Aliases of DATABASES holding read replicas of "default" (foodinfo.replicas).
+# Safe requests to culinary and tags views read their models from one of
+# them; a client that wrote reads from "default" for REPLICA_PIN_SECONDS.
+# Clients keeping cookies are pinned with one, token clients are pinned in
+# the default cache, which must be shared by every worker (Redis, Memcached,
+# the database cache) for their reads to see their writes; the per-process
+# local memory cache only pins them on the worker that handled the write.
+# SQLite copies made with `manage.py sync_replicas` can stand in for them:
+#   DATABASES["replica"] = {
+#       "ENGINE": "django.db.backends.sqlite3",
+#       "NAME": BASE_DIR / "replica.sqlite3",
+#       "TEST": {"MIRROR": "default"},
+#   }
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 5
+DATABASE_ROUTERS = ["foodinfo.replicas.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -0,0 +1,123 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from foodinfo.utils import render_json
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Newline-delimited JSON, one line per item of a list"""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return "".join(render_json(item) + "\n" for item in items).encode("utf-8")
+
+
+async def aiterate(iterator, chunk_size):
+    """
+    Async iterator over a sync one, pulled `chunk_size` items at a time
+    in the request's sync thread, so database work stays off the event
+    loop and only a chunk is held in memory.
+    """
+    iterator = iter(iterator)
+    pull = sync_to_async(lambda: list(islice(iterator, chunk_size)))
+    try:
+        while True:
+            chunk = await pull()
+            if not chunk:
+                return
+            for item in chunk:
+                yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_response(request, content, content_type, chunk_size):
+    """
+    StreamingHttpResponse of `content`, a sync iterator of strings.
+
+    Under ASGI, Django reads a sync iterator into a list before sending
+    it (StreamingHttpResponse.__aiter__), so the content is given to it
+    as an async iterator (aiterate) instead and memory stays flat under
+    ASGI as under WSGI.
+    """
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        content = aiterate(content, chunk_size)
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+class StreamingListMixin:
+    """
+    Streams the whole, unpaginated list to staff when asked for with
+    `?stream=ndjson` (or `json`) or an `Accept: application/x-ndjson`
+    header.
+
+    Rows are read with iterator(chunk_size=...), which also runs the
+    queryset's prefetches one chunk at a time, and serialized as they are
+    sent, so memory use doesn't grow with the size of the export, under
+    ASGI too (see streaming_response).
+    """
+
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    stream_query_param = "stream"
+    stream_formats = {"ndjson": NDJSONRenderer.media_type, "json": "application/json"}
+    stream_chunk_size = 500
+    stream_format = None
+    streaming = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        self.stream_format = self.get_stream_format()
+        self.streaming = self.stream_format is not None
+        if self.streaming and not request.user.is_staff:
+            self.permission_denied(request, "Only staff can export the full list")
+
+    def get_stream_format(self):
+        if self.request.method != "GET":
+            return None
+        stream = self.request.query_params.get(self.stream_query_param)
+        if stream in self.stream_formats:
+            return stream
+        if self.request.accepted_renderer.format == NDJSONRenderer.format:
+            return NDJSONRenderer.format
+        return None
+
+    def list(self, request, *args, **kwargs):
+        if not self.streaming:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.order_by(*self.paginator.get_ordering(self))
+        return streaming_response(
+            request,
+            self.stream_rows(queryset, self.stream_format),
+            self.stream_formats[self.stream_format],
+            self.stream_chunk_size,
+        )
+
+    def stream_rows(self, queryset, stream_format):
+        serializer = self.get_serializer(many=True).child
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+
+        if stream_format == "ndjson":
+            for obj in rows:
+                yield render_json(serializer.to_representation(obj)) + "\n"
+            return
+
+        separator = "["
+        for obj in rows:
+            yield separator + render_json(serializer.to_representation(obj))
+            separator = ","
+        yield "[]" if separator == "[" else "]"
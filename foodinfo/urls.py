@@ -13,14 +13,17 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+
 from django.contrib import admin
 from django.urls import path, include
 from dj_rest_auth.registration.views import VerifyEmailView
+from foodinfo.metrics import MetricsView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("culinary.urls")),
     path("api/", include("tags.urls")),
+    path("api/metrics", MetricsView.as_view(), name="metrics"),
     path("api/auth/", include("dj_rest_auth.urls")),
     path("api/registration/", include("dj_rest_auth.registration.urls")),
     # seem to work fine without importing view despite what the docs say
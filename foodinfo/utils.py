@@ -1,8 +1,15 @@
 from __future__ import unicode_literals
+import json
 from django.db import IntegrityError
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from rest_framework.views import Response, exception_handler
 from rest_framework import status
 from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from foodinfo.metrics import TimedSerializerMixin
 
 
 def custom_exception_handler(exc, context):
@@ -22,7 +29,18 @@ def custom_exception_handler(exc, context):
     return response
 
 
-class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+def render_json(data):
+    """Serialize `data` the way JSONRenderer does, as a string"""
+    return json.dumps(
+        data,
+        cls=JSONEncoder,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    )
+
+
+class DynamicFieldsModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     A ModelSerializer that takes an additional 'fields' argument that
     controls which fields should be displayed.
@@ -41,3 +59,59 @@ class DynamicFieldsModelSerializer(serializers.ModelSerializer):
             existing = set(self.fields)
             for field_name in existing - allowed:
                 self.fields.pop(field_name)
+
+
+class ConditionalRetrieveMixin:
+    """
+    Answers If-None-Match/If-Modified-Since on retrieve with 304 Not Modified,
+    comparing against the object's `updated_at` before the serializer runs.
+
+    Conditional requests are checked with one primary key lookup of
+    `version_queryset()`, which must load whatever the view's object
+    permissions need. Unconditional requests skip it and take their
+    validators from the fully loaded object.
+    """
+
+    # set when the representation differs between users
+    vary_on_user = False
+
+    def version_queryset(self):
+        return self.get_queryset().model.objects.only("id", "updated_at")
+
+    def get_etag(self, obj):
+        etag = f"{obj.pk}-{obj.updated_at.timestamp():.6f}"
+        if self.vary_on_user:
+            etag += f"-{self.request.user.pk}"
+        return quote_etag(etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        if (
+            "HTTP_IF_NONE_MATCH" in request.META
+            or "HTTP_IF_MODIFIED_SINCE" in request.META
+        ):
+            obj = get_object_or_404(
+                self.version_queryset(), pk=self.kwargs[self.lookup_field]
+            )
+            self.check_object_permissions(request, obj)
+
+            response = get_conditional_response(
+                request,
+                etag=self.get_etag(obj),
+                last_modified=int(obj.updated_at.timestamp()),
+            )
+            if response is not None:
+                return self._add_validators(response, obj)
+
+        obj = self.get_object()
+        return self._add_validators(self.render_object(obj), obj)
+
+    def render_object(self, obj):
+        serializer = self.get_serializer(obj)
+        return Response(serializer.data)
+
+    def _add_validators(self, response, obj):
+        response["ETag"] = self.get_etag(obj)
+        response["Last-Modified"] = http_date(obj.updated_at.timestamp())
+        if self.vary_on_user:
+            patch_vary_headers(response, ["Authorization"])
+        return response
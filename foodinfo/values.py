@@ -0,0 +1,186 @@
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.fields.related_descriptors import (
+    ManyToManyDescriptor,
+    ReverseManyToOneDescriptor,
+)
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from foodinfo.metrics import serializing
+
+# fields whose to_representation returns what values() already gives
+IDENTITY_FIELDS = (
+    serializers.ReadOnlyField,
+    serializers.CharField,
+    serializers.IntegerField,
+)
+
+PARENT = "_parent"
+
+
+def _nullable(getter, transform):
+    def get(row, related):
+        value = getter(row)
+        return None if value is None else transform(value)
+
+    return get
+
+
+class ValuesPlan:
+    """
+    Renders rows fetched with values() the same way a serializer renders
+    model instances, without going through its fields for every row.
+
+    The plan is compiled once from a serializer instance: plain fields
+    become values() columns, paired with the field's to_representation
+    where the column needs converting, nested serializers are flattened
+    into their parent's columns and nested lists are fetched with one
+    values() query per relation for all rows. Fields that need the model
+    instance, like SerializerMethodField, must be given in `overrides` as
+    a (column, transform) pair, a None column rendering transform(None).
+    """
+
+    def __init__(self, serializer, overrides=None, prefix=""):
+        self.model = serializer.Meta.model
+        self.columns = []
+        # (field name, ValuesPlan, lookup from the child model to the parent)
+        self.lists = []
+        self.getters = self._compile(serializer, overrides or {}, prefix)
+
+    def _compile(self, serializer, overrides, prefix):
+        getters = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            if name in overrides:
+                column, transform = overrides[name]
+                getters.append((name, self._override(column, transform)))
+                continue
+
+            column = prefix + field.source.replace(".", "__")
+            if isinstance(field, serializers.ListSerializer):
+                plan = ValuesPlan(field.child)
+                self.lists.append((name, plan, self._parent_lookup(field.source)))
+                getters.append((name, self._list(name)))
+            elif isinstance(field, serializers.BaseSerializer):
+                getters.append((name, self._nested(field, column)))
+            elif isinstance(field, serializers.FileField):
+                getters.append((name, self._file(field, column)))
+            elif isinstance(field, serializers.SerializerMethodField):
+                raise TypeError(f"{name} needs an override to be rendered from values")
+            else:
+                self.columns.append(column)
+                getter = itemgetter(column)
+                if isinstance(field, IDENTITY_FIELDS):
+                    getters.append((name, lambda row, related, get=getter: get(row)))
+                else:
+                    getters.append((name, _nullable(getter, field.to_representation)))
+        return getters
+
+    def _override(self, column, transform):
+        if column is None:
+            return lambda row, related: transform(None)
+        self.columns.append(column)
+        return _nullable(itemgetter(column), transform or (lambda value: value))
+
+    def _nested(self, field, column):
+        pk = f"{column}__pk"
+        self.columns.append(pk)
+        getters = self._compile(field, {}, column + "__")
+
+        def get(row, related):
+            if row[pk] is None:
+                return None
+            return {name: getter(row, related) for name, getter in getters}
+
+        return get
+
+    def _file(self, field, column):
+        self.columns.append(column)
+        model_field = self.model._meta.get_field(column.split("__")[-1])
+
+        def transform(name):
+            return field.to_representation(
+                model_field.attr_class(None, model_field, name)
+            )
+
+        return _nullable(itemgetter(column), transform)
+
+    def _list(self, name):
+        return lambda row, related: related[name].get(row["pk"], [])
+
+    def _parent_lookup(self, source):
+        descriptor = getattr(self.model, source)
+        if isinstance(descriptor, ManyToManyDescriptor) and not descriptor.reverse:
+            return descriptor.field.related_query_name()
+        if isinstance(descriptor, ReverseManyToOneDescriptor):
+            return descriptor.field.name
+        raise TypeError(f"{source} is not a reverse foreign key or many to many")
+
+    def values(self, queryset, extra=()):
+        """values() queryset of the columns the plan reads, plus `extra`"""
+        columns = dict.fromkeys(["pk", *self.columns, *extra])
+        return queryset.values(*columns)
+
+    def render(self, rows):
+        rows = list(rows)
+        related = {}
+        if self.lists:
+            ids = [row["pk"] for row in rows]
+            for name, plan, lookup in self.lists:
+                related[name] = plan.render_children(ids, lookup)
+
+        with serializing():
+            return [
+                {name: getter(row, related) for name, getter in self.getters}
+                for row in rows
+            ]
+
+    def render_children(self, parent_ids, lookup):
+        """Render the rows related to `parent_ids`, grouped by parent id"""
+        queryset = self.model._default_manager.filter(**{f"{lookup}__in": parent_ids})
+        rows = self.values(queryset).annotate(**{PARENT: F(lookup)}).order_by("pk")
+        rows = list(rows)
+
+        children = {}
+        for row, data in zip(rows, self.render(rows)):
+            children.setdefault(row[PARENT], []).append(data)
+        return children
+
+
+class ValuesListMixin:
+    """
+    list() rendering through a ValuesPlan of the view's serializer when
+    VALUES_SERIALIZATION is on, with the same output.
+    """
+
+    def use_values(self):
+        return bool(
+            settings.VALUES_SERIALIZATION
+            and self.request.method == "GET"
+            and not getattr(self, "streaming", False)
+        )
+
+    def get_values_overrides(self):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values():
+            return super().list(request, *args, **kwargs)
+
+        plan = ValuesPlan(self.get_serializer(), self.get_values_overrides())
+        queryset = self.filter_queryset(self.get_queryset())
+
+        ordering = self.get_ordering() if hasattr(self, "get_ordering") else None
+        ordering = ordering or getattr(self, "ordering", None) or ()
+        extra = [field.lstrip("-") for field in ordering] + ["id"]
+
+        rows = plan.values(queryset, extra)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.render(page))
+        return Response(plan.render(rows))
@@ -0,0 +1,98 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+VERSION_KEY = "tags:catalogue:version"
+
+
+def catalogue_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+async def acatalogue_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(VERSION_KEY, version, None):
+            version = await cache.aget(VERSION_KEY, version)
+    return version
+
+
+def invalidate_catalogue():
+    """Move the catalogue to a new version, orphaning every cached response"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def catalogue_key(version, params):
+    digest = hashlib.md5(repr(params).encode("utf-8")).hexdigest()
+    return f"tags:catalogue:{version}:{digest}"
+
+
+class CachedCatalogueMixin:
+    """
+    Serve list and retrieve responses of a rarely changing catalogue from
+    the cache. Entries are keyed by the catalogue version, which the
+    receivers in tags.signals bump whenever a Tag or TagCategory changes,
+    and by the normalised parameters of the request, so query strings
+    the views ignore don't multiply them.
+
+    The version lives in the default cache, so invalidation only reaches
+    every worker when that cache is shared between them.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, super().retrieve, *args, **kwargs)
+
+    def cache_params(self, request):
+        """What the response depends on, besides the catalogue version"""
+        params = [
+            self.basename,
+            self.action,
+            sorted(self.kwargs.items()),
+            request.accepted_renderer.format,
+        ]
+        if self.action == "list" and self.paginator is not None:
+            params += [
+                self.paginator.get_page_size(request),
+                request.query_params.get(self.paginator.cursor_query_param),
+            ]
+        return params
+
+    def _cached(self, request, render, *args, **kwargs):
+        key = catalogue_key(catalogue_version(), self.cache_params(request))
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            return Response(data, headers=headers)
+
+        response = render(request, *args, **kwargs)
+        cache.set(key, self._entry(response), settings.TAG_CATALOGUE_CACHE_TIMEOUT)
+        return response
+
+    async def _acached(self, request, render, *args, **kwargs):
+        key = catalogue_key(await acatalogue_version(), self.cache_params(request))
+        cached = await cache.aget(key)
+        if cached is not None:
+            data, headers = cached
+            return Response(data, headers=headers)
+
+        response = await render(request, *args, **kwargs)
+        await cache.aset(
+            key, self._entry(response), settings.TAG_CATALOGUE_CACHE_TIMEOUT
+        )
+        return response
+
+    def _entry(self, response):
+        headers = {"Link": response["Link"]} if response.has_header("Link") else {}
+        return response.data, headers
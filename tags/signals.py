@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tags.cache import invalidate_catalogue
+from tags.models import Tag, TagCategory
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=TagCategory)
+@receiver(post_delete, sender=TagCategory)
+def invalidate_tag_catalogue(sender, **kwargs):
+    transaction.on_commit(invalidate_catalogue)
@@ -1,4 +1,8 @@
-from test.base_test import BaseTestMixins
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from tags.models import Tag, TagCategory
+from test.base_test import BaseTestMixins, get_links
 from rest_framework.test import APITestCase
 
 
@@ -14,6 +18,7 @@ class TestTagViews(
     fixtures = ["tags.json", "users.json"]
 
     def setUp(self):
+        cache.clear()
         self.factory_count = 15
         self.list_path_name = "tags-list"
         self.single_path_name = "tags-detail"
@@ -42,6 +47,7 @@ class TestTagCategoryViews(
     fixtures = ["tags.json", "users.json"]
 
     def setUp(self):
+        cache.clear()
         self.factory_count = 3
         self.list_path_name = "tag-categories-list"
         self.single_path_name = "tag-categories-detail"
@@ -56,3 +62,78 @@ class TestTagCategoryViews(
         self.delete_id = 1
 
         super().setUp()
+
+
+class TestTagPagination(APITestCase):
+    fixtures = ["tags.json", "users.json"]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_follow_label(self):
+        url = reverse("tags-list") + "?pageSize=4"
+        labels = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.json()), 4)
+            labels += [tag["label"] for tag in response.json()]
+            url = get_links(response).get("next")
+
+        self.assertEqual(
+            labels, list(Tag.objects.order_by("label").values_list("label", flat=True))
+        )
+
+
+class TestCatalogueCache(APITestCase):
+    fixtures = ["tags.json", "users.json"]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_reads(self):
+        for path, args in [
+            ("tags-list", []),
+            ("tags-detail", [1]),
+            ("tag-categories-list", []),
+            ("tag-categories-detail", [1]),
+        ]:
+            url = reverse(path, args=args)
+            with self.assertNumQueries(2 if path.startswith("tag-categories") else 1):
+                cold = self.client.get(url)
+            with self.assertNumQueries(0):
+                warm = self.client.get(url)
+            self.assertEqual(cold.json(), warm.json())
+
+    def test_cached_pages(self):
+        url = reverse("tags-list") + "?pageSize=5"
+        cold = self.client.get(url)
+        with self.assertNumQueries(0):
+            warm = self.client.get(url)
+        self.assertEqual(get_links(cold), get_links(warm))
+
+    def test_normalised_keys(self):
+        url = reverse("tags-list")
+        self.client.get(url + "?pageSize=5")
+        for query in ("?pageSize=5&unused=1", "?unused=2&pageSize=05"):
+            with self.assertNumQueries(0):
+                self.client.get(url + query)
+
+        # the default page size, however it is asked for
+        self.client.get(url)
+        for query in ("?pageSize=0", "?pageSize=a", "?format=json"):
+            with self.assertNumQueries(0):
+                self.client.get(url + query)
+
+    def test_invalidation(self):
+        url = reverse("tag-categories-list")
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.filter(pk=1).update(label="renamed")
+            Tag.objects.get(pk=1).save()
+        self.assertEqual(self.client.get(url).json()[0]["tags"][0]["label"], "renamed")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TagCategory.objects.get(pk=1).delete()
+        self.assertEqual(len(self.client.get(url).json()), 2)
@@ -1,5 +1,6 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
+from foodinfo.asyncviews import read_routes
 from tags.views import *
 
 router = DefaultRouter(trailing_slash=False)
@@ -7,5 +8,6 @@ router.register(r"tags", TagViewSet, "tags")
 router.register(r"tag-categories", TagCategoryViewsSet, "tag-categories")
 
 urlpatterns = [
-    path("", include(router.urls)),
+    # tag reads served async when ASYNC_READ_VIEWS is on
+    path("", include(read_routes(router.urls, {TagViewSet: AsyncTagViewSet}))),
 ]
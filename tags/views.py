@@ -1,17 +1,35 @@
 from django.db.models import Q
 from rest_framework import viewsets
 from culinary.permissions import IsStaffOrReadOnly
+from foodinfo.asyncviews import AsyncReadMixin
+from tags.cache import CachedCatalogueMixin
 from tags.models import Tag, TagCategory
 from tags.serializers import TagSerializer, TagCategorySerializer
 
 
-class TagViewSet(viewsets.ModelViewSet):
-    queryset = Tag.objects.all().order_by("label")
+class TagViewSet(CachedCatalogueMixin, viewsets.ModelViewSet):
+    queryset = Tag.objects.select_related("category").order_by("label")
     serializer_class = TagSerializer
     permission_classes = [IsStaffOrReadOnly]
+    ordering = ["label"]
 
 
-class TagCategoryViewsSet(viewsets.ModelViewSet):
-    queryset = TagCategory.objects.all().order_by("name")
+class AsyncTagViewSet(AsyncReadMixin, TagViewSet):
+    """TagViewSet reads on the async ORM and cache, see foodinfo.asyncviews"""
+
+    async def alist(self, request, *args, **kwargs):
+        if not self.use_async():
+            return await super().alist(request, *args, **kwargs)
+        return await self._acached(request, super().alist, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        if not self.use_async():
+            return await super().aretrieve(request, *args, **kwargs)
+        return await self._acached(request, super().aretrieve, *args, **kwargs)
+
+
+class TagCategoryViewsSet(CachedCatalogueMixin, viewsets.ModelViewSet):
+    queryset = TagCategory.objects.prefetch_related("tag_set").order_by("name")
     serializer_class = TagCategorySerializer
     permission_classes = [IsStaffOrReadOnly]
+    ordering = ["name"]
@@ -1,3 +1,4 @@
+import re
 from typing import Dict
 from django.urls import reverse
 from rest_framework import status
@@ -21,6 +22,12 @@ class TestUsers:
         return "Token 0c89620eb3cd951ae53c5eef7fb8f5a78a329156"
 
 
+def get_links(response) -> Dict[str, str]:
+    """Parse pagination links from the `Link` header of a response"""
+    header = response.get("Link", "")
+    return {rel: url for url, rel in re.findall(r'<([^>]*)>; rel="(\w+)"', header)}
+
+
 class GetVars:
     single_path_name: str
     list_path_name: str